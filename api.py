@@ -1,187 +1,524 @@
-import concurrent.futures
-import datetime
+import asyncio
 import json
+import math
 import os
-import uuid
-from threading import Semaphore
-from typing import Any, AsyncGenerator, Dict, List
-
-from fastapi import BackgroundTasks, FastAPI, HTTPException, Request, status
-from fastapi.responses import StreamingResponse
-from slowapi import Limiter
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
-from slowapi.util import get_remote_address
-
-from faker_data_generation_service import generate_fake_data
-from models.models import SchemaInput
-
-app = FastAPI()
-
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
-app.add_exception_handler(
-    RateLimitExceeded,
-    lambda request, exc: HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Rate limit exceeded"),
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, AsyncIterator, Generator, List, Optional
+
+from fastapi import Depends, FastAPI, File, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from faker_data_generation_service import generate_fake_data, get_compiled_schema, parse_schema, schema_format
+from generation_engine import generate_records, iter_record_batches, shutdown_generation_pool, start_generation_pool
+from job_outputs import OUTPUT_SWEEP_INTERVAL, select_output_variant
+from jobs import JobManager, JobQueueFullError
+from metrics import (
+    BATCH_GENERATION_SECONDS,
+    BATCH_SERIALIZATION_SECONDS,
+    JOB_QUEUE_DEPTH,
+    JOB_SLOTS_IN_USE,
+    JOB_SLOTS_TOTAL,
+    RECORDS_GENERATED,
+    RESPONSE_CACHE_BYTES,
+    RESPONSE_CACHE_REQUESTS,
+    MetricsMiddleware,
+    metrics_endpoint,
 )
-app.add_middleware(SlowAPIMiddleware)
+from models.models import DatasetInput, SchemaInput
+from rate_limiting import RateLimiter, client_address
+from relational import DatasetGenerator, expected_records
+from response_cache import etag_for, etag_matches, response_cache, response_key
+from scheduler import AsyncAdmission, SchedulerFullError, record_cost, scheduler
+from schema_registry import SchemaNotFoundError, schema_registry, validate_schema
+from serialization import OUTPUT_FORMATS, EnhancedJSONEncoder, FormatWriter, OutputFormat, get_output_format
+from uniqueness import check_unique_fields
 
-# Semaphore to limit the number of concurrent background tasks
-MAX_CONCURRENT_TASKS = 5
-background_task_semaphore = Semaphore(MAX_CONCURRENT_TASKS)
 
-# Store background task status
-task_status: Dict[str, str] = {}
+async def sweep_job_outputs(interval: float) -> None:
+    """
+    Apply the job output retention limits every ``interval`` seconds until cancelled.
 
+    Outputs also age out while no job completes, so the limits cannot rely on job completions alone.
 
-# Helper function to serialize data for JSON
-class EnhancedJSONEncoder(json.JSONEncoder):
-    def default(self, o: Any) -> Any:
-        if isinstance(o, (datetime.date, datetime.datetime)):
-            return o.isoformat()
-        return super().default(o)
+    Args:
+        interval (float): The seconds between sweeps.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(job_manager.enforce_retention)
+        except Exception as e:  # pylint: disable=broad-except
+            print(f"Failed to apply the job output retention limits: {e}")
 
 
-# Helper function to write large data to a file
-def write_large_data_to_file(data, output_file, task_id):
-    try:
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, cls=EnhancedJSONEncoder)
-        task_status[task_id] = "completed"
-        print(f"Data successfully written to {output_file}")
-    except (OSError, IOError) as e:
-        task_status[task_id] = "failed"
-        print(f"Failed to write data to {output_file}: {e}")
-    finally:
-        background_task_semaphore.release()
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # Pre-warm the generation workers so the first request does not pay for process startup
+    start_generation_pool()
+    # Outputs that expired while the app was down are deleted before any job adds to them
+    job_manager.enforce_retention()
+    sweep = asyncio.create_task(sweep_job_outputs(OUTPUT_SWEEP_INTERVAL)) if OUTPUT_SWEEP_INTERVAL > 0 else None
+    yield
+    if sweep is not None:
+        sweep.cancel()
+    job_manager.shutdown()
+    shutdown_generation_pool()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Token bucket limits per client, shared by all workers through the state backend
+limiter = RateLimiter()
+
+app.add_middleware(MetricsMiddleware)
+
+# Prometheus metrics, see metrics.py
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+# Requests above this many records are generated by a background job
+BACKGROUND_THRESHOLD = 1000
+
+# Background jobs, limited to a fixed number running at the same time
+job_manager = JobManager()
+JOB_SLOTS_IN_USE.set_function(job_manager.running_count)
+JOB_SLOTS_TOTAL.set_function(lambda: job_manager.max_concurrent)
+JOB_QUEUE_DEPTH.set_function(job_manager.queued_count)
+
+# Seeded responses, see response_cache.py
+RESPONSE_CACHE_BYTES.set_function(lambda: response_cache.nbytes)
+
+# Largest expected number of records of a dataset streamed by /generate-dataset
+MAX_DATASET_RECORDS = 100000
+
+# Number of records generated and sent per streamed chunk
+STREAM_CHUNK_SIZE = 100
+MAX_STREAM_CHUNK_SIZE = 10000
+
+# Largest page of /generate-paginated, which is generated and returned as one response
+MAX_PAGE_SIZE = 10000
 
 
 # Helper function to generate data in batches
-def generate_data_in_batches(schema: dict[str, Any], num_records: int, batch_size: int = 1000) -> List[dict]:
-    data: List[dict] = []
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        futures = []
-        for _ in range(0, num_records, batch_size):
-            records_to_generate = min(batch_size, num_records - len(data))
-            futures.append(executor.submit(generate_fake_data, schema, records_to_generate))
-        for future in concurrent.futures.as_completed(futures):
-            data.extend(future.result())
-    return data
+def generate_data_in_batches(
+    schema: dict[str, Any],
+    num_records: int,
+    batch_size: Optional[int] = None,
+    seed: Optional[int] = None,
+    start: int = 0,
+) -> List[dict]:
+    return generate_records(schema, num_records, batch_size, seed, start)
+
+
+# Enqueue a background job that writes the records to a file
+async def enqueue_generation_job(
+    request: Request,
+    schema_dict: dict[str, Any],
+    num_records: int,
+    output_format: OutputFormat,
+    seed: Optional[int] = None,
+) -> dict[str, Any]:
+    try:
+        job = await job_manager.backend.call(
+            job_manager.submit, schema_dict, num_records, output_format, seed, client_address(request)
+        )
+    except JobQueueFullError as error:
+        raise HTTPException(status_code=429, detail=str(error)) from error
+    return {
+        "message": f"Data generation for {num_records} records will be saved to '{job.output_file}'.",
+        "task_id": job.task_id,
+        "download_url": f"/task-output/{job.task_id}",
+    }
 
 
 # Stream data in smaller chunks
-async def stream_data_in_batches(schema_dict: dict[str, Any], num_records: int) -> AsyncGenerator[bytes, None]:
-    chunk_size = 100  # Define the number of records to generate per chunk
-    generated_records = 0
+async def stream_data_in_batches(
+    schema_dict: dict[str, Any],
+    num_records: int,
+    writer: FormatWriter,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    seed: Optional[int] = None,
+    admit: Optional[AsyncAdmission] = None,
+) -> AsyncGenerator[bytes, None]:
+    batches = iter_record_batches(schema_dict, num_records, chunk_size, seed)
+    remaining = num_records
+
+    def next_chunk() -> Optional[bytes]:
+        nonlocal remaining
+        started = time.perf_counter()
+        batch = next(batches, None)
+        if batch is None:
+            return None
+        remaining -= len(batch)
+        generated = time.perf_counter()
+        chunk = writer.write(batch)
+        BATCH_GENERATION_SECONDS.observe(generated - started, source="stream")
+        BATCH_SERIALIZATION_SECONDS.observe(time.perf_counter() - generated, source="stream")
+        return chunk
+
+    try:
+        yield writer.begin()
+        # Each chunk is generated and encoded in a worker thread, and the next one is only
+        # requested once the previous chunk has been sent to the client. Admission is awaited
+        # on the event loop, so a waiting stream does not hold a thread.
+        while True:
+            if admit is not None and remaining > 0:
+                async with admit(min(chunk_size, remaining)):
+                    chunk = await run_in_threadpool(next_chunk)
+            else:
+                chunk = await run_in_threadpool(next_chunk)
+            if chunk is None:
+                break
+            if chunk:
+                yield chunk
+        yield writer.end()
+    finally:
+        await run_in_threadpool(batches.close)
 
-    while generated_records < num_records:
-        batch_size = min(chunk_size, num_records - generated_records)
-        data_batch = generate_data_in_batches(schema_dict, batch_size)
-        yield json.dumps(data_batch, cls=EnhancedJSONEncoder).encode("utf-8")
-        generated_records += batch_size
 
+# Encode a relational dataset as one JSON object with an array per entity, entity by entity
+def dataset_json_chunks(generator: DatasetGenerator) -> Generator[bytes, None, None]:
+    yield b"{"
+    for index, (entity, batches) in enumerate(generator):
+        writer = OUTPUT_FORMATS["json"].writer(entity.output_schema())
+        yield (b"," if index else b"") + json.dumps(entity.name).encode("utf-8") + b":" + writer.begin()
+        for batch in batches:
+            chunk = writer.write(batch)
+            if chunk:
+                yield chunk
+        yield writer.end()
+    yield b"}"
 
-@app.post("/generate-single", response_model=None)
-@limiter.limit("5/minute")
-async def generate_single(request: Request) -> dict[str, Any]:
+
+# Stream a relational dataset; each chunk is generated and encoded in a worker thread once admitted
+async def stream_dataset(
+    generator: DatasetGenerator, admit: Optional[AsyncAdmission] = None, chunk_size: int = STREAM_CHUNK_SIZE
+) -> AsyncGenerator[bytes, None]:
+    chunks = dataset_json_chunks(generator)
     try:
-        # Parse incoming JSON request body
-        schema = await request.json()  # Parse JSON data from request body
-        if isinstance(schema, str):
-            schema = json.loads(schema)
+        while True:
+            if admit is not None:
+                async with admit(chunk_size):
+                    chunk = await run_in_threadpool(next, chunks, None)
+            else:
+                chunk = await run_in_threadpool(next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        await run_in_threadpool(chunks.close)
+
+
+# Admit the chunks of a stream one by one, so that other requests can run in between
+def stream_admission(request: Request, schema_dict: dict[str, Any]) -> AsyncAdmission:
+    scheduler.check_capacity()
+    return scheduler.async_batch_admission(schema_dict, client_address(request), "normal")
+
+
+# Too much work is queued; tell the client when the queue is expected to have drained
+def scheduler_unavailable(error: SchedulerFullError) -> HTTPException:
+    retry_after = max(1, math.ceil(scheduler.estimated_wait()))
+    return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": str(retry_after)})
+
+
+# Use the registered schema if an ID is given, so large schemas are not sent and parsed on every request
+def resolve_schema(schema: Optional[SchemaInput], schema_id: Optional[str]) -> dict[str, Any]:
+    if schema_id is not None:
+        try:
+            return schema_registry.get(schema_id)
+        except SchemaNotFoundError as error:
+            raise HTTPException(status_code=404, detail=str(error)) from error
+    if schema is None:
+        raise HTTPException(status_code=400, detail="Send a schema in the request body or pass a schema_id")
+    return schema.model_dump()
+
+
+# Read an uploaded JSON or YAML schema file
+async def read_schema_file(file: UploadFile) -> dict[str, Any]:
+    return parse_schema(await file.read(), schema_format(file.filename, file.content_type))
+
+
+# Seeded output is a pure function of the request, so it can be cached and revalidated with ETags
+def is_cacheable(schema: Any, seed: Optional[int]) -> bool:
+    # Pooled values are not reproducible with a seed
+    return seed is not None and isinstance(schema, dict) and not schema.get("pooled")
 
-        data = generate_fake_data(schema, 1)
-        return {"data": data[0]}
+
+# Answer from the response cache or with 304 Not Modified, or return None if the body has to be generated
+def cached_response(request: Request, key: str) -> Optional[Response]:
+    etag = etag_for(key)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        RESPONSE_CACHE_REQUESTS.inc(result="not_modified")
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    if not response_cache.enabled:
+        return None
+    cached = response_cache.get(key)
+    if cached is None:
+        RESPONSE_CACHE_REQUESTS.inc(result="miss")
+        return None
+    RESPONSE_CACHE_REQUESTS.inc(result="hit")
+    return Response(cached.body, media_type=cached.media_type, headers={"ETag": etag})
+
+
+# Serialize a seeded JSON payload, cache it and send it with its ETag
+def json_response(key: str, payload: Any) -> Response:
+    # Same encoding as FastAPI's default JSONResponse, plus support for dates
+    body = json.dumps(payload, cls=EnhancedJSONEncoder, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if response_cache.enabled:
+        response_cache.put(key, body, "application/json")
+    return Response(body, media_type="application/json", headers={"ETag": etag_for(key)})
+
+
+# Pass a seeded stream through and cache it once it is complete
+async def cache_stream(chunks: AsyncIterator[bytes], key: str, media_type: str) -> AsyncGenerator[bytes, None]:
+    parts: Optional[List[bytes]] = [] if response_cache.enabled else None
+    size = 0
+    async for chunk in chunks:
+        yield chunk
+        if parts is not None:
+            size += len(chunk)
+            # Stop collecting once the response is too large to be cached
+            parts = parts if size <= response_cache.max_entry_bytes else None
+            if parts is not None:
+                parts.append(chunk)
+    if parts is not None:
+        response_cache.put(key, b"".join(parts), media_type)
+
+
+@app.post("/generate-single", response_model=None, dependencies=[Depends(limiter.limit("5/minute"))])
+async def generate_single(
+    request: Request, seed: Optional[int] = Query(None, ge=0), schema_id: Optional[str] = None
+) -> Any:
+    try:
+        if schema_id is not None:
+            schema = resolve_schema(None, schema_id)
+        else:
+            # Parse incoming JSON request body
+            schema = await request.json()  # Parse JSON data from request body
+            if isinstance(schema, str):
+                schema = json.loads(schema)
+
+        admission = scheduler.admitted_async(record_cost(schema), client_address(request), "interactive")
+        if not is_cacheable(schema, seed):
+            async with admission:
+                data = generate_fake_data(schema, 1)
+            RECORDS_GENERATED.inc()
+            return {"data": data[0]}
+
+        key = response_key("single", schema, seed)
+        response = cached_response(request, key)
+        if response is None:
+            async with admission:
+                data = generate_fake_data(schema, 1, seed)
+            RECORDS_GENERATED.inc()
+            response = json_response(key, {"data": data[0]})
+        return response
     except ValueError as value_error:
         raise HTTPException(status_code=400, detail=str(value_error)) from value_error
+    except SchedulerFullError as error:
+        raise scheduler_unavailable(error) from error
 
 
 # Endpoint for generating batch fake data
-@app.post("/generate-batch", response_model=None)
-@limiter.limit("10/minute")
+@app.post("/generate-batch", response_model=None, dependencies=[Depends(limiter.limit("10/minute"))])
 async def generate_batch(
-    request: Request, schema: SchemaInput, background_tasks: BackgroundTasks, num_records: int = 10
-) -> StreamingResponse:
+    request: Request,
+    schema: Optional[SchemaInput] = None,
+    num_records: int = 10,
+    output_format: Optional[str] = Query(None, alias="format"),
+    chunk_size: int = Query(STREAM_CHUNK_SIZE, ge=1, le=MAX_STREAM_CHUNK_SIZE),
+    seed: Optional[int] = Query(None, ge=0),
+    schema_id: Optional[str] = None,
+) -> Response:
     try:
         # Convert SchemaInput to dict and generate records
-        schema_dict = schema.dict()
-        if num_records > 1000:
-            if not background_task_semaphore.acquire(blocking=False):
-                raise HTTPException(
-                    status_code=429, detail="Too many concurrent background tasks. Please try again later."
-                )
-
-            task_id = str(uuid.uuid4())
-            output_file = f"output/output_{task_id}.json"
-            if not os.path.exists("output"):
-                os.makedirs("output")
-            task_status[task_id] = "in_progress"
-            background_tasks.add_task(
-                write_large_data_to_file, generate_data_in_batches(schema_dict, num_records), output_file, task_id
-            )
-            return {
-                "message": f"Data generation for {num_records} records will be saved to '{output_file}'.",
-                "task_id": task_id,
-            }
+        schema_dict = resolve_schema(schema, schema_id)
+        selected_format = get_output_format(output_format, request.headers.get("accept"))
+        if num_records > BACKGROUND_THRESHOLD:
+            return await enqueue_generation_job(request, schema_dict, num_records, selected_format, seed)
 
         # Stream data for smaller number of records
-        return StreamingResponse(stream_data_in_batches(schema_dict, num_records), media_type="application/json")
+        writer = selected_format.writer(schema_dict)
+        # Invalid fields and unique fields without enough possible values fail before the response starts
+        get_compiled_schema(schema_dict)
+        check_unique_fields(schema_dict, num_records)
+        admit = stream_admission(request, schema_dict)
+        chunks = stream_data_in_batches(schema_dict, num_records, writer, chunk_size, seed, admit)
+        if not is_cacheable(schema_dict, seed):
+            return StreamingResponse(chunks, media_type=selected_format.media_type)
+
+        # Chunk boundaries can change the encoding (e.g. Arrow record batches), so they are part of the key
+        key = response_key(
+            "batch", schema_dict, seed, num_records=num_records, format=selected_format.name, chunk_size=chunk_size
+        )
+        response = cached_response(request, key)
+        if response is not None:
+            return response
+        return StreamingResponse(
+            cache_stream(chunks, key, selected_format.media_type),
+            media_type=selected_format.media_type,
+            headers={"ETag": etag_for(key)},
+        )
     except ValueError as value_error:
         raise HTTPException(status_code=400, detail=str(value_error)) from value_error
+    except SchedulerFullError as error:
+        raise scheduler_unavailable(error) from error
 
 
 # Endpoint for generating batch fake data from file
-@app.post("/generate-from-file", response_model=None)
-@limiter.limit("10/minute")
+@app.post("/generate-from-file", response_model=None, dependencies=[Depends(limiter.limit("10/minute"))])
 async def generate_from_file(
-    request: Request, file: bytes, background_tasks: BackgroundTasks, num_records: int = 10
+    request: Request,
+    file: UploadFile = File(...),
+    num_records: int = 10,
+    output_format: Optional[str] = Query(None, alias="format"),
+    chunk_size: int = Query(STREAM_CHUNK_SIZE, ge=1, le=MAX_STREAM_CHUNK_SIZE),
 ) -> StreamingResponse:
     try:
-        # Assume the file is JSON formatted
-        schema_dict = json.loads(file)
-        if num_records > 1000:
-            if not background_task_semaphore.acquire(blocking=False):
-                raise HTTPException(
-                    status_code=429, detail="Too many concurrent background tasks. Please try again later."
-                )
-
-            task_id = str(uuid.uuid4())
-            output_file = f"output/output_{task_id}.json"
-            if not os.path.exists("output"):
-                os.makedirs("output")
-            task_status[task_id] = "in_progress"
-            background_tasks.add_task(
-                write_large_data_to_file, generate_data_in_batches(schema_dict, num_records), output_file, task_id
-            )
-            return {
-                "message": f"Data generation for {num_records} records will be saved to '{output_file}'.",
-                "task_id": task_id,
-            }
+        # JSON or YAML, by file extension or content type
+        schema_dict = validate_schema(await read_schema_file(file))
+        selected_format = get_output_format(output_format, request.headers.get("accept"))
+        if num_records > BACKGROUND_THRESHOLD:
+            return await enqueue_generation_job(request, schema_dict, num_records, selected_format)
 
         # Stream data for smaller number of records
-        return StreamingResponse(stream_data_in_batches(schema_dict, num_records), media_type="application/json")
-    except (ValueError, json.JSONDecodeError) as error:
+        writer = selected_format.writer(schema_dict)
+        # Invalid fields and unique fields without enough possible values fail before the response starts
+        get_compiled_schema(schema_dict)
+        check_unique_fields(schema_dict, num_records)
+        admit = stream_admission(request, schema_dict)
+        return StreamingResponse(
+            stream_data_in_batches(schema_dict, num_records, writer, chunk_size, admit=admit),
+            media_type=selected_format.media_type,
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error)) from error
+    except SchedulerFullError as error:
+        raise scheduler_unavailable(error) from error
+
+
+# Endpoint for generating several related entities with foreign keys in one request
+@app.post("/generate-dataset", response_model=None, dependencies=[Depends(limiter.limit("10/minute"))])
+async def generate_dataset(
+    request: Request,
+    dataset: DatasetInput,
+    chunk_size: int = Query(STREAM_CHUNK_SIZE, ge=1, le=MAX_STREAM_CHUNK_SIZE),
+    seed: Optional[int] = Query(None, ge=0),
+) -> StreamingResponse:
+    try:
+        generator = DatasetGenerator(dataset.model_dump(), seed, chunk_size)
+        if expected_records(generator.entities) > MAX_DATASET_RECORDS:
+            raise ValueError(
+                f"Datasets of more than {MAX_DATASET_RECORDS} expected records must be generated with the fakeit-rest CLI"
+            )
+        for entity in generator.entities:
+            if entity.count is not None:
+                check_unique_fields(entity.schema, entity.count)
+        # Every chunk is charged like a chunk of the most expensive entity
+        widest = max((entity.schema for entity in generator.entities), key=record_cost)
+        admit = stream_admission(request, widest)
+        return StreamingResponse(stream_dataset(generator, admit, chunk_size), media_type="application/json")
+    except ValueError as error:
         raise HTTPException(status_code=400, detail=str(error)) from error
+    except SchedulerFullError as error:
+        raise scheduler_unavailable(error) from error
+
+
+# Endpoint to register a JSON or YAML schema, which can then be used by ID on every endpoint
+@app.post("/schemas", status_code=status.HTTP_201_CREATED, dependencies=[Depends(limiter.limit("10/minute"))])
+async def upload_schema(file: UploadFile = File(...)) -> dict[str, Any]:
+    try:
+        registered = await run_in_threadpool(schema_registry.register, await read_schema_file(file))
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error)) from error
+    return {"schema_id": registered.schema_id, "fields": len(registered["fields"])}
+
+
+# Endpoint to fetch a registered schema
+@app.get("/schemas/{schema_id}")
+async def get_schema(schema_id: str) -> dict[str, Any]:
+    return resolve_schema(None, schema_id)
 
 
 # Endpoint to check the status of background tasks
 @app.get("/task-status/{task_id}")
 async def get_task_status(task_id: str) -> dict[str, Any]:
-    status = task_status.get(task_id, "not_found")
-    return {"task_id": task_id, "status": status}
+    state = await job_manager.backend.call(job_manager.status, task_id)
+    if state is None:
+        return {"task_id": task_id, "status": "not_found"}
+    return state
+
+
+# Endpoint to download the output of a completed background task
+@app.api_route("/task-output/{task_id}", methods=["GET", "HEAD"], response_model=None)
+async def get_task_output(request: Request, task_id: str) -> FileResponse:
+    state = await job_manager.backend.call(job_manager.status, task_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Task '{task_id}' not found")
+    if state["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Task '{task_id}' is {state['status']}, not completed")
+    # A precompressed copy is sent as is when the client accepts its encoding
+    path, encoding = select_output_variant(state["output_file"], request.headers.get("accept-encoding"))
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError as error:
+        raise HTTPException(status_code=410, detail=f"The output of task '{task_id}' has been deleted") from error
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    # FileResponse answers Range requests and hands the file to servers that support ASGI pathsend
+    return FileResponse(
+        path,
+        headers=headers,
+        media_type=OUTPUT_FORMATS[state["format"]].media_type,
+        filename=os.path.basename(state["output_file"]),
+        stat_result=stat_result,
+    )
+
+
+# Endpoint to cancel a queued or running background task
+@app.post("/cancel-task/{task_id}")
+async def cancel_task(task_id: str) -> dict[str, Any]:
+    state = await job_manager.backend.call(job_manager.request_cancel, task_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Task '{task_id}' not found")
+    return state
 
 
 # Endpoint for paginated data response
-@app.get("/generate-paginated", response_model=None)
-@limiter.limit("10/minute")
+@app.get("/generate-paginated", response_model=None, dependencies=[Depends(limiter.limit("10/minute"))])
 async def generate_paginated(
-    request: Request, schema: SchemaInput, page: int = 1, page_size: int = 100
-) -> dict[str, Any]:
+    request: Request,
+    schema: Optional[SchemaInput] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    seed: Optional[int] = Query(None, ge=0),
+    schema_id: Optional[str] = None,
+) -> Any:
     try:
-        schema_dict = schema.dict()
-        total_records = page * page_size
-        data = generate_data_in_batches(schema_dict, total_records, batch_size=page_size)
-        paginated_data = data[(page - 1) * page_size : page * page_size]  # noqa: E203
-        return {"data": paginated_data, "page": page, "page_size": page_size}
+        schema_dict = resolve_schema(schema, schema_id)
+        cacheable = is_cacheable(schema_dict, seed)
+        if cacheable:
+            key = response_key("paginated", schema_dict, seed, page=page, page_size=page_size)
+            response = cached_response(request, key)
+            if response is not None:
+                return response
+
+        # Only the requested page is generated; with a seed it is the same page on every call
+        start = (page - 1) * page_size
+        async with scheduler.admitted_async(
+            record_cost(schema_dict) * page_size, client_address(request), "interactive"
+        ):
+            # Waiting for the generation workers must not block the event loop
+            paginated_data = await run_in_threadpool(
+                generate_data_in_batches, schema_dict, page_size, batch_size=page_size, seed=seed, start=start
+            )
+        payload = {"data": paginated_data, "page": page, "page_size": page_size, "seed": seed}
+        if not cacheable:
+            return payload
+        return json_response(key, payload)
     except ValueError as value_error:
         raise HTTPException(status_code=400, detail=str(value_error)) from value_error
+    except SchedulerFullError as error:
+        raise scheduler_unavailable(error) from error
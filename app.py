@@ -1,8 +1,9 @@
-import json
-
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from metrics import MetricsMiddleware, metrics_endpoint
+from websocket_handler import websocket_endpoint
+
 app = FastAPI()
 
 # Add CORS middleware to allow WebSocket connections
@@ -13,29 +14,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
+# Prometheus metrics of this process, see metrics.py
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
 
-@app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    try:
-        while True:
-            data = await websocket.receive_text()
-            try:
-                # Try parsing data as JSON
-                payload = json.loads(data)
-                if isinstance(payload, dict) and "name" in payload and "email" in payload:
-                    # Customize the response with additional data or information
-                    response = {
-                        "name": payload["name"],
-                        "email": payload["email"],
-                    }
-                    await websocket.send_json(response)
-                else:
-                    response = {"error": "Invalid payload structure"}
-                    await websocket.send_json(response)
-            except json.JSONDecodeError:
-                # If not JSON, consider it as an unknown command
-                await websocket.send_text(f"Unknown command: {data}")
-    except WebSocketDisconnect:
-        print("Client disconnected")
+# Subscription protocol that pushes generated records, see websocket_handler.websocket_endpoint
+app.add_api_websocket_route("/ws", websocket_endpoint)
@@ -0,0 +1,5 @@
+"""
+Benchmarks and load tests that run against an in-process server.
+
+Run ``python -m benchmarks --help`` from the repository root.
+"""
@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, List
+
+from benchmarks.suite import (
+    Metric,
+    bench_endpoints,
+    bench_generators,
+    bench_memory,
+    bench_replay,
+    bench_websocket,
+    compare_to_baseline,
+    machine_id,
+)
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+# Baselines are only comparable on the machine that recorded them, so each machine keeps its own
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baselines", f"{machine_id()}.json")
+DEFAULT_TRAFFIC = os.path.join(BENCHMARK_DIR, "traffic.jsonl")
+
+# Allowed relative regression against the baseline before a run fails
+DEFAULT_TOLERANCE = 0.3
+
+# Benchmarks by name, each run with the parsed command line arguments
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace], Dict[str, Metric]]] = {
+    "generators": lambda args: bench_generators(args.records),
+    "endpoints": lambda args: bench_endpoints(args.requests, args.concurrency),
+    "websocket": lambda args: bench_websocket(args.duration),
+    "memory": lambda args: bench_memory(args.job_records),
+    "replay": lambda args: bench_replay(args.traffic, args.concurrency),
+}
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run the benchmark suite.")
+    parser.add_argument("benchmarks", nargs="*", help=f"Benchmarks to run: {', '.join(BENCHMARKS)}. All by default.")
+    parser.add_argument("--records", type=int, default=20000, help="Records per generator measurement.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint.")
+    parser.add_argument("--concurrency", type=int, default=10, help="Requests in flight at the same time.")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds to receive WebSocket frames for.")
+    parser.add_argument("--job-records", type=int, default=200000, help="Records generated by the memory benchmark.")
+    parser.add_argument("--traffic", default=DEFAULT_TRAFFIC, help="Traffic file replayed by the replay benchmark.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file to compare against.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed relative regression.")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline.")
+    parser.add_argument("--output", help="Also write the results to this JSON file.")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    return args
+
+
+def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+    results: Dict[str, Metric] = {}
+    for name in args.benchmarks or BENCHMARKS:
+        print(f"Running {name} benchmark...", file=sys.stderr)
+        results.update(BENCHMARKS[name](args))
+
+    for name, result in results.items():
+        print(f"{name:<55} {result['value']:>14,.3f} {result['unit']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"metrics": results}, file, indent=2)
+
+    if args.save_baseline:
+        baseline: Dict[str, Any] = {"metrics": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as file:
+                baseline = json.load(file)
+        baseline["machine"] = machine_id()
+        baseline["metrics"].update(results)
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+            file.write("\n")
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.", file=sys.stderr)
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    if baseline.get("machine") != machine_id():
+        print(
+            f"Baseline {args.baseline} was recorded on {baseline.get('machine', 'an unknown machine')}, "
+            f"not on {machine_id()}; run with --save-baseline to record one for this machine.",
+            file=sys.stderr,
+        )
+        return 0
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nPERFORMANCE REGRESSION in {len(regressions)} metric(s):", file=sys.stderr)
+        for regression in regressions:
+            print(f"  {regression}", file=sys.stderr)
+        return 1
+    print("\nNo regressions against the baseline.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
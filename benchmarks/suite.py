@@ -0,0 +1,413 @@
+import asyncio
+import json
+import math
+import os
+import platform
+import re
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from faker_data_generation_service import FIELD_GENERATORS, generate_fake_data
+
+# A metric is a measured value with its unit and whether "higher" or "lower" values are better
+Metric = Dict[str, Any]
+
+# Number of fields of the same type in the per-type schemas
+FIELDS_PER_TYPE = 5
+
+# Extra options needed to compile a field of the given type
+FIELD_OPTIONS: Dict[str, Dict[str, Any]] = {
+    "choice": {"elements": ["red", "green", "blue"]},
+}
+
+FLAT_SCHEMA: Dict[str, Any] = {
+    "fields": [
+        {"name": "id", "type": "integer", "min": 1, "max": 1000000},
+        {"name": "first_name", "type": "string"},
+        {"name": "email", "type": "email"},
+        {"name": "street", "type": "street"},
+        {"name": "city", "type": "city"},
+        {"name": "zipcode", "type": "zipcode"},
+        {"name": "score", "type": "float"},
+        {"name": "active", "type": "boolean"},
+        {"name": "signup_date", "type": "date"},
+        {"name": "plan", "type": "choice", "elements": ["free", "pro", "enterprise"]},
+    ]
+}
+
+# The same fields as FLAT_SCHEMA, grouped into nested objects
+NESTED_SCHEMA: Dict[str, Any] = {
+    "fields": [
+        {"name": "id", "type": "integer", "min": 1, "max": 1000000},
+        {
+            "name": "profile",
+            "type": "object",
+            "children": [
+                {"name": "first_name", "type": "string"},
+                {"name": "email", "type": "email"},
+                {"name": "signup_date", "type": "date"},
+            ],
+        },
+        {
+            "name": "address",
+            "type": "object",
+            "children": [
+                {"name": "street", "type": "street"},
+                {"name": "city", "type": "city"},
+                {"name": "zipcode", "type": "zipcode"},
+            ],
+        },
+        {
+            "name": "account",
+            "type": "object",
+            "children": [
+                {"name": "score", "type": "float"},
+                {"name": "active", "type": "boolean"},
+                {"name": "plan", "type": "choice", "elements": ["free", "pro", "enterprise"]},
+            ],
+        },
+    ]
+}
+
+# Requests sent by the endpoint benchmark, in the same format as traffic files
+ENDPOINT_REQUESTS: Dict[str, Dict[str, Any]] = {
+    "generate-single": {"method": "POST", "path": "/generate-single", "json": FLAT_SCHEMA},
+    "generate-batch": {
+        "method": "POST",
+        "path": "/generate-batch",
+        "params": {"num_records": 100},
+        "json": FLAT_SCHEMA,
+    },
+    "generate-from-file": {
+        "method": "POST",
+        "path": "/generate-from-file",
+        "params": {"num_records": 100},
+        "files": {"file": ["schema.json", json.dumps(FLAT_SCHEMA)]},
+    },
+    "generate-paginated": {
+        "method": "GET",
+        "path": "/generate-paginated",
+        "params": {"page": 3, "page_size": 100, "seed": 42},
+        "json": FLAT_SCHEMA,
+    },
+    "task-status": {"method": "GET", "path": "/task-status/unknown"},
+}
+
+PERCENTILES = (50, 95, 99)
+
+
+def metric(value: float, unit: str, better: str) -> Metric:
+    return {"value": round(value, 3), "unit": unit, "better": better}
+
+
+def machine_id() -> str:
+    """
+    Identify the machine and interpreter that results are measured on.
+
+    ``FAKEIT_BENCHMARK_MACHINE`` overrides the host name, e.g. to share a baseline between
+    identical CI runners.
+
+    Returns:
+        str: A file name safe identifier such as ``ci-runner-x86_64-cpython-3.11``.
+    """
+    host = os.environ.get("FAKEIT_BENCHMARK_MACHINE") or platform.node() or "unknown"
+    python = f"{platform.python_implementation().lower()}-{'.'.join(platform.python_version_tuple()[:2])}"
+    return re.sub(r"[^A-Za-z0-9_.-]+", "-", f"{host}-{platform.machine()}-{python}")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Return the nearest-rank percentile of the values.
+
+    Args:
+        values (List[float]): The measured values.
+        pct (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The percentile, or 0.0 if there are no values.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(len(ordered) * pct / 100))
+    return ordered[rank - 1]
+
+
+def field_schema(field_type: str) -> Dict[str, Any]:
+    options = FIELD_OPTIONS.get(field_type, {})
+    return {
+        "fields": [{"name": f"{field_type}_{index}", "type": field_type, **options} for index in range(FIELDS_PER_TYPE)]
+    }
+
+
+def _records_per_second(schema: Dict[str, Any], num_records: int) -> float:
+    # Compile the plan and warm up the Faker providers before timing
+    generate_fake_data(schema, 10)
+    started = time.perf_counter()
+    generate_fake_data(schema, num_records)
+    return num_records / (time.perf_counter() - started)
+
+
+def bench_generators(num_records: int = 20000) -> Dict[str, Metric]:
+    """
+    Measure records per second of ``generate_fake_data`` per field type and per schema shape.
+
+    Args:
+        num_records (int): The number of records generated per measurement.
+
+    Returns:
+        Dict[str, Metric]: The measured metrics by name.
+    """
+    results = {}
+    for field_type in FIELD_GENERATORS:
+        rate = _records_per_second(field_schema(field_type), num_records)
+        results[f"generator.{field_type}.records_per_second"] = metric(rate, "records/s", "higher")
+    for shape, schema in (("flat", FLAT_SCHEMA), ("nested", NESTED_SCHEMA)):
+        rate = _records_per_second(schema, num_records)
+        results[f"generator.shape.{shape}.records_per_second"] = metric(rate, "records/s", "higher")
+    return results
+
+
+@contextmanager
+def unlimited_api() -> Iterator[Any]:
+    """
+    Yield the REST app with rate limiting disabled and the generation pool started.
+    """
+    import api  # pylint: disable=import-outside-toplevel
+    from generation_engine import (  # pylint: disable=import-outside-toplevel
+        shutdown_generation_pool,
+        start_generation_pool,
+    )
+
+    enabled = api.limiter.enabled
+    api.limiter.enabled = False
+    start_generation_pool()
+    try:
+        yield api.app
+    finally:
+        shutdown_generation_pool()
+        api.limiter.enabled = enabled
+
+
+async def _run_requests(
+    app: Any, requests: List[Dict[str, Any]], concurrency: int
+) -> Tuple[List[Tuple[str, float, int]], float]:
+    import httpx  # pylint: disable=import-outside-toplevel
+
+    results: List[Tuple[str, float, int]] = []
+    pending = iter(requests)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+
+        async def worker() -> None:
+            # Workers share the iterator, so each request is sent exactly once
+            for request in pending:
+                started = time.perf_counter()
+                response = await client.request(
+                    request.get("method", "GET"),
+                    request["path"],
+                    params=request.get("params"),
+                    json=request.get("json"),
+                    content=request.get("content"),
+                    files={name: tuple(upload) for name, upload in request.get("files", {}).items()} or None,
+                    headers=request.get("headers"),
+                )
+                results.append((request["path"], time.perf_counter() - started, response.status_code))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return results, elapsed
+
+
+def _latency_metrics(prefix: str, results: List[Tuple[str, float, int]], elapsed: float) -> Dict[str, Metric]:
+    latencies = [latency * 1000 for _, latency, _ in results]
+    metrics = {f"{prefix}.p{pct}_ms": metric(percentile(latencies, pct), "ms", "lower") for pct in PERCENTILES}
+    metrics[f"{prefix}.requests_per_second"] = metric(len(results) / elapsed, "requests/s", "higher")
+    metrics[f"{prefix}.errors"] = metric(sum(1 for _, _, code in results if code >= 400), "requests", "lower")
+    return metrics
+
+
+def bench_endpoints(num_requests: int = 200, concurrency: int = 10) -> Dict[str, Metric]:
+    """
+    Measure latency percentiles and throughput of each REST endpoint under concurrent load.
+
+    Args:
+        num_requests (int): The number of requests sent per endpoint.
+        concurrency (int): The number of requests in flight at the same time.
+
+    Returns:
+        Dict[str, Metric]: The measured metrics by name.
+    """
+    results = {}
+    with unlimited_api() as app:
+        for name, request in ENDPOINT_REQUESTS.items():
+            asyncio.run(_run_requests(app, [request] * concurrency, concurrency))
+            responses, elapsed = asyncio.run(_run_requests(app, [request] * num_requests, concurrency))
+            results.update(_latency_metrics(f"endpoint.{name}", responses, elapsed))
+    return results
+
+
+def bench_websocket(duration: float = 3.0, batch_size: int = 1000) -> Dict[str, Metric]:
+    """
+    Measure the frames and records per second a single /ws subscriber receives at the maximum rate.
+
+    Args:
+        duration (float): Seconds to receive frames for.
+        batch_size (int): The number of records per frame.
+
+    Returns:
+        Dict[str, Metric]: The measured metrics by name.
+    """
+    from fastapi.testclient import TestClient  # pylint: disable=import-outside-toplevel
+
+    from app import app  # pylint: disable=import-outside-toplevel
+    from websocket_handler import MAX_RECORDS_PER_SECOND  # pylint: disable=import-outside-toplevel
+
+    with TestClient(app) as client, client.websocket_connect("/ws") as websocket:
+        websocket.send_json(
+            {"action": "subscribe", "schema": FLAT_SCHEMA, "rate": MAX_RECORDS_PER_SECOND, "batch_size": batch_size}
+        )
+        websocket.receive_json()
+        frames = records = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < duration:
+            frame = websocket.receive_json()
+            frames += 1
+            records += len(frame["records"])
+        elapsed = time.perf_counter() - started
+        websocket.send_json({"action": "stop"})
+        while websocket.receive_json()["type"] != "stopped":
+            pass
+    return {
+        "websocket.frames_per_second": metric(frames / elapsed, "frames/s", "higher"),
+        "websocket.records_per_second": metric(records / elapsed, "records/s", "higher"),
+    }
+
+
+def bench_memory(num_records: int = 200000) -> Dict[str, Metric]:
+    """
+    Measure the peak memory of a large background job and of the same batch built in memory.
+
+    Generation runs in-process for this benchmark so that all allocations are traced.
+
+    Args:
+        num_records (int): The number of records generated.
+
+    Returns:
+        Dict[str, Metric]: The measured metrics by name.
+    """
+    import generation_engine  # pylint: disable=import-outside-toplevel
+    from jobs import JobManager  # pylint: disable=import-outside-toplevel
+
+    workers = generation_engine.GENERATION_WORKERS
+    generation_engine.GENERATION_WORKERS = 1
+    generate_fake_data(FLAT_SCHEMA, 10)
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            manager = JobManager(output_dir=output_dir)
+            tracemalloc.start()
+            try:
+                job = manager.submit(FLAT_SCHEMA, num_records)
+                while job.status in ("queued", "in_progress"):
+                    time.sleep(0.05)
+                if job.status != "completed":
+                    raise RuntimeError(f"Benchmark job {job.status}: {job.error}")
+                job_peak = tracemalloc.get_traced_memory()[1]
+
+                tracemalloc.reset_peak()
+                generation_engine.generate_records(FLAT_SCHEMA, num_records)
+                list_peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+                manager.shutdown()
+    finally:
+        generation_engine.GENERATION_WORKERS = workers
+    return {
+        "memory.job.peak_mib": metric(job_peak / 2**20, "MiB", "lower"),
+        "memory.in_memory_batch.peak_mib": metric(list_peak / 2**20, "MiB", "lower"),
+    }
+
+
+def load_traffic(path: str) -> List[Dict[str, Any]]:
+    """
+    Load a traffic file with one JSON request per line.
+
+    Each request has a ``path`` and optionally ``method`` (GET by default), ``params``, ``json``,
+    ``content``, ``headers`` and ``repeat``, the number of times the request is sent.
+
+    Args:
+        path (str): The path to the traffic file.
+
+    Returns:
+        List[Dict[str, Any]]: The requests to send, in order.
+
+    Raises:
+        ValueError: If a line is not a JSON object with a path.
+    """
+    requests = []
+    with open(path, "r", encoding="utf-8") as file:
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            if not isinstance(request, dict) or "path" not in request:
+                raise ValueError(f"{path}:{line_number}: each request must be a JSON object with a 'path'")
+            requests.extend([request] * int(request.get("repeat", 1)))
+    return requests
+
+
+def bench_replay(traffic_file: str, concurrency: int = 10) -> Dict[str, Metric]:
+    """
+    Replay a traffic file against the REST app and measure latency percentiles and throughput.
+
+    Args:
+        traffic_file (str): The path to the traffic file, see ``load_traffic``.
+        concurrency (int): The number of requests in flight at the same time.
+
+    Returns:
+        Dict[str, Metric]: The measured metrics by name.
+    """
+    requests = load_traffic(traffic_file)
+    with unlimited_api() as app:
+        responses, elapsed = asyncio.run(_run_requests(app, requests, concurrency))
+    return _latency_metrics("replay", responses, elapsed)
+
+
+def compare_to_baseline(results: Dict[str, Metric], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compare results against a baseline and describe every regression.
+
+    A metric regresses when it is worse than its baseline value by more than the tolerance, a
+    fraction of the baseline value. A ``tolerance`` stored with a baseline metric overrides the
+    default. Metrics missing from the baseline are ignored.
+
+    Args:
+        results (Dict[str, Metric]): The measured metrics by name.
+        baseline (Dict[str, Any]): The baseline, with metrics by name under "metrics".
+        tolerance (float): The default allowed relative regression.
+
+    Returns:
+        List[str]: One message per regressed metric.
+    """
+    regressions = []
+    for name, current in results.items():
+        expected: Optional[Metric] = baseline.get("metrics", {}).get(name)
+        if expected is None:
+            continue
+        allowed = expected.get("tolerance", tolerance)
+        if current["better"] == "higher":
+            limit = expected["value"] * (1 - allowed)
+            regressed = current["value"] < limit
+        else:
+            limit = expected["value"] * (1 + allowed)
+            regressed = current["value"] > limit
+        if regressed:
+            regressions.append(
+                f"{name}: {current['value']} {current['unit']} "
+                f"(baseline {expected['value']}, limit {round(limit, 3)})"
+            )
+    return regressions
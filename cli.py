@@ -0,0 +1,376 @@
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from columnar import take_rows
+from faker_data_generation_service import get_compiled_schema, load_schema, reset_generation_state, schema_hash
+from generation_engine import GENERATION_BATCH_SIZE, GENERATION_WORKERS, iter_record_batches, shutdown_generation_pool
+from relational import DatasetGenerator, validate_dataset
+from schema_registry import validate_schema
+from serialization import OUTPUT_FORMATS
+from uniqueness import check_unique_fields, unique_fields
+
+# Directory shards are written to unless --output-dir is given
+DEFAULT_OUTPUT_DIR = "output"
+
+# File name of the manifest written next to the shards
+MANIFEST_FILE = "manifest.json"
+
+# Bytes buffered per shard file before they are written to disk
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+def shard_ranges(num_records: int, shards: int) -> List[Tuple[int, int]]:
+    """
+    Split a record count into contiguous shards of nearly equal size.
+
+    Args:
+        num_records (int): The total number of records.
+        shards (int): The number of shards.
+
+    Returns:
+        List[Tuple[int, int]]: The index of the first record and the record count of each shard.
+    """
+    size, remainder = divmod(num_records, shards)
+    ranges = []
+    start = 0
+    for index in range(shards):
+        count = size + (1 if index < remainder else 0)
+        ranges.append((start, count))
+        start += count
+    return ranges
+
+
+def shard_file_name(prefix: str, index: int, shards: int, extension: str) -> str:
+    return f"{prefix}-{index:05d}-of-{shards:05d}.{extension}"
+
+
+def write_batches(
+    schema: Dict[str, Any],
+    format_name: str,
+    path: str,
+    start: int,
+    batches: Iterable[Sequence[Dict[str, Any]]],
+) -> Dict[str, Any]:
+    """
+    Stream batches of records to a shard file.
+
+    The file is written under a temporary name and renamed once it is complete.
+
+    Args:
+        schema (Dict[str, Any]): The schema definition as a dictionary.
+        format_name (str): The output format, a key of ``OUTPUT_FORMATS``.
+        path (str): The file to write.
+        start (int): The index of the first record of the shard in the dataset.
+        batches (Iterable[Sequence[Dict[str, Any]]]): The records of the shard.
+
+    Returns:
+        Dict[str, Any]: The manifest entry of the shard: file name, first record, record count, size and SHA-256.
+    """
+    writer = OUTPUT_FORMATS[format_name].writer(schema)
+    digest = hashlib.sha256()
+    size = 0
+    num_records = 0
+    partial_file = f"{path}.part"
+    with open(partial_file, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+
+        def emit(chunk: bytes) -> None:
+            nonlocal size
+            f.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+
+        emit(writer.begin())
+        for batch in batches:
+            emit(writer.write(batch))
+            num_records += len(batch)
+        emit(writer.end())
+    os.replace(partial_file, path)
+    return {
+        "file": os.path.basename(path),
+        "start": start,
+        "records": num_records,
+        "bytes": size,
+        "sha256": digest.hexdigest(),
+    }
+
+
+def write_shard(
+    schema: Dict[str, Any],
+    format_name: str,
+    path: str,
+    start: int,
+    num_records: int,
+    seed: Optional[int] = None,
+    batch_size: int = GENERATION_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """
+    Generate one shard and stream it to a file batch by batch.
+
+    Only one batch is held in memory at a time.
+
+    Args:
+        schema (Dict[str, Any]): The schema definition as a dictionary.
+        format_name (str): The output format, a key of ``OUTPUT_FORMATS``.
+        path (str): The file to write.
+        start (int): The index of the first record of the shard in the dataset.
+        num_records (int): The number of records in the shard.
+        seed (Optional[int]): The dataset seed, or None for random records.
+        batch_size (int): The number of records generated at a time.
+
+    Returns:
+        Dict[str, Any]: The manifest entry of the shard, see ``write_batches``.
+    """
+    compiled = get_compiled_schema(schema)
+    batches = (
+        compiled.generate_batch(min(batch_size, start + num_records - batch_start), seed, batch_start)
+        for batch_start in range(start, start + num_records, batch_size)
+    )
+    return write_batches(schema, format_name, path, start, batches)
+
+
+def take_records(
+    batches: Iterator[Sequence[Dict[str, Any]]], pending: List[Sequence[Dict[str, Any]]], num_records: int
+) -> Iterator[Sequence[Dict[str, Any]]]:
+    """
+    Yield exactly ``num_records`` records from a stream of batches.
+
+    The rest of a batch that is split is left in ``pending`` for the next call.
+    """
+    while num_records > 0:
+        batch = pending.pop() if pending else next(batches)
+        if len(batch) > num_records:
+            pending.append(take_rows(batch, range(num_records, len(batch))))
+            batch = take_rows(batch, range(num_records))
+        num_records -= len(batch)
+        yield batch
+
+
+def write_unique_shards(
+    schema: Dict[str, Any],
+    format_name: str,
+    tasks: List[Tuple[str, int, int]],
+    num_records: int,
+    seed: Optional[int] = None,
+    batch_size: int = GENERATION_BATCH_SIZE,
+) -> List[Dict[str, Any]]:
+    """
+    Generate a dataset with unique fields and write its shards one after the other.
+
+    Uniqueness has to hold across shards, so all records pass through the unique filter of this
+    process. Generation is still spread over the generation engine's worker processes
+    (``FAKEIT_GENERATION_WORKERS``).
+    """
+    batches = iter_record_batches(schema, num_records, batch_size, seed)
+    pending: List[Sequence[Dict[str, Any]]] = []
+    try:
+        return [
+            write_batches(schema, format_name, path, start, take_records(batches, pending, count))
+            for path, start, count in tasks
+        ]
+    finally:
+        batches.close()
+        shutdown_generation_pool()
+
+
+def generate_shards(
+    schema: Dict[str, Any],
+    num_records: int,
+    output_dir: str,
+    format_name: str = "ndjson",
+    shards: int = 1,
+    seed: Optional[int] = None,
+    workers: int = GENERATION_WORKERS,
+    batch_size: int = GENERATION_BATCH_SIZE,
+    prefix: str = "data",
+) -> List[Dict[str, Any]]:
+    """
+    Generate a dataset as shard files, in parallel across worker processes.
+
+    With a seed, record ``N`` is the same whatever the number of shards, so concatenating the
+    shards in order always gives the same dataset. Schemas with unique fields are generated
+    through the generation engine and written by this process, see ``write_unique_shards``.
+
+    Args:
+        schema (Dict[str, Any]): The schema definition as a dictionary.
+        num_records (int): The total number of records.
+        output_dir (str): The directory to write the shards to.
+        format_name (str): The output format, a key of ``OUTPUT_FORMATS``.
+        shards (int): The number of shard files.
+        seed (Optional[int]): The dataset seed, or None for random records.
+        workers (int): The number of worker processes. A value of 1 or less generates in-process.
+        batch_size (int): The number of records generated at a time.
+        prefix (str): The shard file name prefix.
+
+    Returns:
+        List[Dict[str, Any]]: The manifest entries of the shards, in order.
+
+    Raises:
+        ValueError: If the format is unknown or cannot represent the schema, or a unique field has
+            fewer possible values than ``num_records``.
+    """
+    if format_name not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported format '{format_name}'. Use one of: {', '.join(OUTPUT_FORMATS)}.")
+    # Create a writer up front so unsupported format and schema combinations fail before any work starts
+    OUTPUT_FORMATS[format_name].writer(schema)
+    get_compiled_schema(schema)
+    check_unique_fields(schema, num_records)
+    os.makedirs(output_dir, exist_ok=True)
+    extension = OUTPUT_FORMATS[format_name].extension
+    tasks = [
+        (os.path.join(output_dir, shard_file_name(prefix, index, shards, extension)), start, count)
+        for index, (start, count) in enumerate(shard_ranges(num_records, shards))
+    ]
+
+    if unique_fields(schema):
+        return write_unique_shards(schema, format_name, tasks, num_records, seed, batch_size)
+
+    if workers <= 1 or shards == 1:
+        return [write_shard(schema, format_name, path, start, count, seed, batch_size) for path, start, count in tasks]
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(workers, shards), initializer=reset_generation_state
+    ) as executor:
+        futures = [
+            executor.submit(write_shard, schema, format_name, path, start, count, seed, batch_size)
+            for path, start, count in tasks
+        ]
+        return [future.result() for future in futures]
+
+
+def generate_dataset_files(
+    schema: Dict[str, Any],
+    output_dir: str,
+    format_name: str = "ndjson",
+    seed: Optional[int] = None,
+    batch_size: int = GENERATION_BATCH_SIZE,
+) -> List[Dict[str, Any]]:
+    """
+    Generate a relational dataset into one file per entity, e.g. ``users.ndjson`` and ``orders.ndjson``.
+
+    Args:
+        schema (Dict[str, Any]): The dataset schema, see relational.py.
+        output_dir (str): The directory to write the files to.
+        format_name (str): The output format, a key of ``OUTPUT_FORMATS``.
+        seed (Optional[int]): The dataset seed, or None for random records.
+        batch_size (int): The number of records generated at a time.
+
+    Returns:
+        List[Dict[str, Any]]: The manifest entries of the entity files, in generation order.
+
+    Raises:
+        ValueError: If the schema or format is invalid.
+    """
+    if format_name not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported format '{format_name}'. Use one of: {', '.join(OUTPUT_FORMATS)}.")
+    generator = DatasetGenerator(schema, seed, batch_size)
+    for entity in generator.entities:
+        OUTPUT_FORMATS[format_name].writer(entity.output_schema())
+        if entity.count is not None:
+            check_unique_fields(entity.schema, entity.count)
+    os.makedirs(output_dir, exist_ok=True)
+    extension = OUTPUT_FORMATS[format_name].extension
+    try:
+        return [
+            {
+                "entity": entity.name,
+                **write_batches(
+                    entity.output_schema(),
+                    format_name,
+                    os.path.join(output_dir, f"{entity.name}.{extension}"),
+                    0,
+                    batches,
+                ),
+            }
+            for entity, batches in generator
+        ]
+    finally:
+        shutdown_generation_pool()
+
+
+def parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="fakeit-rest", description="Generate a dataset from a schema file into sharded output files."
+    )
+    parser.add_argument("schema", help="Schema file (.json, .yaml or .yml).")
+    parser.add_argument(
+        "-n", "--records", type=int, help="Total number of records. Datasets with entities set their own counts."
+    )
+    parser.add_argument("-s", "--shards", type=int, default=1, help="Number of output files.")
+    parser.add_argument("-f", "--format", default="ndjson", help=f"Output format: {', '.join(OUTPUT_FORMATS)}.")
+    parser.add_argument("--seed", type=int, help="Dataset seed; the output is reproducible when set.")
+    parser.add_argument("-o", "--output-dir", default=DEFAULT_OUTPUT_DIR, help="Directory to write the shards to.")
+    parser.add_argument("--prefix", default="data", help="Shard file name prefix.")
+    parser.add_argument("-w", "--workers", type=int, default=GENERATION_WORKERS, help="Worker processes.")
+    parser.add_argument("--batch-size", type=int, default=GENERATION_BATCH_SIZE, help="Records generated at a time.")
+    parser.add_argument("--manifest", action="store_true", help=f"Write {MANIFEST_FILE} with row counts and checksums.")
+    args = parser.parse_args(argv)
+    if args.records is not None and args.records < 0:
+        parser.error("--records must not be negative")
+    if args.shards < 1 or args.batch_size < 1:
+        parser.error("--shards and --batch-size must be at least 1")
+    if args.seed is not None and args.seed < 0:
+        parser.error("--seed must not be negative")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    started = time.perf_counter()
+    try:
+        schema = load_schema(args.schema)
+        if "entities" in schema:
+            if args.records is not None or args.shards != 1:
+                raise ValueError("--records and --shards do not apply to datasets with entities")
+            schema = validate_dataset(schema)
+            files = generate_dataset_files(schema, args.output_dir, args.format, args.seed, args.batch_size)
+        else:
+            if args.records is None:
+                raise ValueError("--records is required")
+            schema = validate_schema(schema)
+            files = generate_shards(
+                schema,
+                args.records,
+                args.output_dir,
+                args.format,
+                args.shards,
+                args.seed,
+                args.workers,
+                args.batch_size,
+                args.prefix,
+            )
+    except (OSError, ValueError) as error:
+        print(f"fakeit-rest: error: {error}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - started
+    records = sum(entry["records"] for entry in files)
+
+    if args.manifest:
+        manifest = {
+            "schema_id": schema_hash(schema),
+            "format": args.format,
+            "seed": args.seed,
+            "records": records,
+            "bytes": sum(entry["bytes"] for entry in files),
+            "entities" if "entities" in schema else "shards": files,
+        }
+        with open(os.path.join(args.output_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+            f.write("\n")
+
+    rate = records / elapsed if elapsed else 0.0
+    print(
+        f"Wrote {records} records in {len(files)} file(s) to {args.output_dir} "
+        f"in {elapsed:.1f}s ({rate:,.0f} records/s)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+import datetime
+import random
+from itertools import repeat
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union, overload
+
+# A column generator fills a whole column of ``n`` values from the given random instance
+ColumnGenerator = Callable[[random.Random, int], List[Any]]
+
+DEFAULT_INTEGER_RANGE = (1, 100)
+DEFAULT_FLOAT_RANGE = (0.0, 1000.0)
+DEFAULT_FLOAT_PRECISION = 2
+DEFAULT_DATE_RANGE_DAYS = 365 * 30
+# Default end of date ranges. It is fixed rather than today, so seeded dates do not change from day to day.
+DEFAULT_DATE_END = datetime.date(2025, 1, 1)
+DEFAULT_ARRAY_LENGTH = (1, 5)
+
+
+class ColumnBatch(Sequence[Dict[str, Any]]):
+    """
+    A batch of records stored column by column.
+
+    Columns are plain lists, which are cheap to build and to send between processes. Rows are
+    only assembled into dictionaries when the batch is iterated or indexed, typically while
+    serializing, so a batch can be used wherever a sequence of records is expected.
+
+    Sampled batches carry ``timings``, the seconds spent and number of columns generated per
+    field type, so the process that consumes the batch can record them.
+    """
+
+    __slots__ = ("names", "columns", "size", "timings")
+
+    def __init__(
+        self,
+        names: Tuple[str, ...],
+        columns: List[Sequence[Any]],
+        size: int,
+        timings: Optional[Dict[str, Tuple[float, int]]] = None,
+    ) -> None:
+        self.names = names
+        self.columns = columns
+        self.size = size
+        self.timings = timings
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if not self.columns:
+            # Batches without fields, such as objects without children, still hold one empty record per row
+            for _ in repeat(None, self.size):
+                yield {}
+            return
+        names = self.names
+        for values in zip(*self.columns):
+            yield dict(zip(names, values))
+
+    @overload
+    def __getitem__(self, index: int) -> Dict[str, Any]: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "ColumnBatch": ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, Any], "ColumnBatch"]:
+        if isinstance(index, slice):
+            return self.take(range(self.size)[index])
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("ColumnBatch index out of range")
+        return dict(zip(self.names, [column[index] for column in self.columns]))
+
+    def take(self, indices: Sequence[int]) -> "ColumnBatch":
+        """
+        Return a batch with only the given rows, in the given order.
+
+        The new batch carries no timings, since they were recorded for the whole batch.
+        """
+        columns: List[Sequence[Any]] = [
+            column.take(indices) if isinstance(column, ColumnBatch) else [column[i] for i in indices]
+            for column in self.columns
+        ]
+        return ColumnBatch(self.names, columns, len(indices))
+
+
+def take_rows(batch: Sequence[Dict[str, Any]], indices: Sequence[int]) -> Sequence[Dict[str, Any]]:
+    """
+    Select rows of a column batch or a list of records.
+
+    Args:
+        batch (Sequence[Dict[str, Any]]): The batch.
+        indices (Sequence[int]): The indices of the rows to keep.
+
+    Returns:
+        Sequence[Dict[str, Any]]: A batch of the same kind with only those rows.
+    """
+    if isinstance(batch, ColumnBatch):
+        return batch.take(indices)
+    return [batch[i] for i in indices]
+
+
+def integer_range(field: Dict[str, Any]) -> Tuple[int, int]:
+    low = int(field.get("min", DEFAULT_INTEGER_RANGE[0]))
+    high = int(field.get("max", DEFAULT_INTEGER_RANGE[1]))
+    if low > high:
+        raise ValueError(f"Field '{field.get('name')}': min must not be greater than max")
+    return low, high
+
+
+def float_range(field: Dict[str, Any]) -> Tuple[float, float, int]:
+    low = float(field.get("min", DEFAULT_FLOAT_RANGE[0]))
+    high = float(field.get("max", DEFAULT_FLOAT_RANGE[1]))
+    if low > high:
+        raise ValueError(f"Field '{field.get('name')}': min must not be greater than max")
+    return low, high, int(field.get("precision", DEFAULT_FLOAT_PRECISION))
+
+
+def choice_elements(field: Dict[str, Any]) -> Tuple[Tuple[Any, ...], Optional[Tuple[float, ...]]]:
+    elements = tuple(field.get("elements") or ())
+    if not elements:
+        raise ValueError(f"Field '{field.get('name')}': choice fields require a non-empty 'elements' list")
+    weights = field.get("weights")
+    if weights is None:
+        return elements, None
+    if len(weights) != len(elements):
+        raise ValueError(f"Field '{field.get('name')}': 'weights' must have one entry per element")
+    return elements, tuple(float(weight) for weight in weights)
+
+
+def date_range(field: Dict[str, Any]) -> Tuple[datetime.date, datetime.date]:
+    end = datetime.date.fromisoformat(field["end"]) if "end" in field else DEFAULT_DATE_END
+    if "start" in field:
+        start = datetime.date.fromisoformat(field["start"])
+    else:
+        start = end - datetime.timedelta(days=DEFAULT_DATE_RANGE_DAYS)
+    if start > end:
+        raise ValueError(f"Field '{field.get('name')}': start must not be after end")
+    return start, end
+
+
+def array_length(field: Dict[str, Any]) -> Tuple[int, int]:
+    if "length" in field:
+        low = high = int(field["length"])
+    else:
+        low = int(field.get("min_length", DEFAULT_ARRAY_LENGTH[0]))
+        high = int(field.get("max_length", max(low, DEFAULT_ARRAY_LENGTH[1])))
+    if not 0 <= low <= high:
+        raise ValueError(f"Field '{field.get('name')}': array lengths must satisfy 0 <= min_length <= max_length")
+    return low, high
+
+
+def boolean_probability(field: Dict[str, Any]) -> float:
+    probability = float(field.get("probability", 0.5))
+    if not 0.0 <= probability <= 1.0:
+        raise ValueError(f"Field '{field.get('name')}': probability must be between 0 and 1")
+    return probability
+
+
+def integer_column(field: Dict[str, Any]) -> ColumnGenerator:
+    low, high = integer_range(field)
+    population = range(low, high + 1)
+    return lambda rng, n: rng.choices(population, k=n)
+
+
+def float_column(field: Dict[str, Any]) -> ColumnGenerator:
+    low, high, precision = float_range(field)
+    span = high - low
+
+    def generate(rng: random.Random, n: int) -> List[float]:
+        uniform = rng.random
+        return [round(low + span * uniform(), precision) for _ in repeat(None, n)]
+
+    return generate
+
+
+def boolean_column(field: Dict[str, Any]) -> ColumnGenerator:
+    probability = boolean_probability(field)
+    return lambda rng, n: rng.choices((True, False), weights=(probability, 1.0 - probability), k=n)
+
+
+def choice_column(field: Dict[str, Any]) -> ColumnGenerator:
+    elements, weights = choice_elements(field)
+    if weights is None:
+        return lambda rng, n: rng.choices(elements, k=n)
+    return lambda rng, n: rng.choices(elements, weights=weights, k=n)
+
+
+def date_column(field: Dict[str, Any]) -> ColumnGenerator:
+    start, end = date_range(field)
+    ordinals = range(start.toordinal(), end.toordinal() + 1)
+    from_ordinal = datetime.date.fromordinal
+    return lambda rng, n: [from_ordinal(ordinal) for ordinal in rng.choices(ordinals, k=n)]
+
+
+# Field types that can be sampled a whole column at a time
+COLUMN_GENERATORS: Dict[str, Callable[[Dict[str, Any]], ColumnGenerator]] = {
+    "integer": integer_column,
+    "float": float_column,
+    "boolean": boolean_column,
+    "choice": choice_column,
+    "date": date_column,
+}
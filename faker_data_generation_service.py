@@ -1,27 +1,360 @@
+import datetime
+import hashlib
 import json
 import os
-from typing import Any, Dict, List, Union
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from itertools import count, repeat
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
 
-from faker import Faker
+import yaml
 
-fake = Faker()
+from columnar import (
+    COLUMN_GENERATORS,
+    ColumnBatch,
+    array_length,
+    boolean_probability,
+    choice_elements,
+    date_range,
+    float_range,
+    integer_range,
+)
+from faker_registry import DEFAULT_LOCALE, faker_registry
+from value_pools import ValuePool, value_pools
 
-FIELD_GENERATORS = {
-    "string": lambda _: fake.first_name(),
-    "integer": lambda _: fake.random_int(min=1, max=100),
-    "email": lambda _: fake.email(),
-    "street": lambda _: fake.street_name(),
-    "city": lambda _: fake.city(),
-    "zipcode": lambda _: fake.zipcode(),
+if TYPE_CHECKING:  # pragma: no cover
+    from faker import Faker
+
+
+def _integer_generator(faker: "Faker", field: Dict[str, Any]) -> Callable[[], int]:
+    low, high = integer_range(field)
+    return partial(faker.random_int, min=low, max=high)
+
+
+def _float_generator(faker: "Faker", field: Dict[str, Any]) -> Callable[[], float]:
+    low, high, precision = float_range(field)
+    span = high - low
+    return lambda: round(low + span * faker.random.random(), precision)
+
+
+def _boolean_generator(faker: "Faker", field: Dict[str, Any]) -> Callable[[], bool]:
+    probability = boolean_probability(field)
+    return lambda: faker.random.random() < probability
+
+
+def _choice_generator(faker: "Faker", field: Dict[str, Any]) -> Callable[[], Any]:
+    elements, weights = choice_elements(field)
+    return lambda: faker.random.choices(elements, weights)[0]
+
+
+def _date_generator(faker: "Faker", field: Dict[str, Any]) -> Callable[[], datetime.date]:
+    start, end = date_range(field)
+    low, high = start.toordinal(), end.toordinal()
+    return lambda: datetime.date.fromordinal(faker.random.randint(low, high))
+
+
+# Each entry receives the locale's Faker instance and the field definition at compile time and
+# returns a zero-argument callable that produces one value, so no per-record lookups are needed.
+FIELD_GENERATORS: Dict[str, Callable[["Faker", Dict[str, Any]], Callable[[], Any]]] = {
+    "string": lambda faker, _: faker.first_name,
+    "integer": _integer_generator,
+    "float": _float_generator,
+    "boolean": _boolean_generator,
+    "choice": _choice_generator,
+    "date": _date_generator,
+    "email": lambda faker, _: faker.email,
+    "street": lambda faker, _: faker.street_name,
+    "city": lambda faker, _: faker.city,
+    "zipcode": lambda faker, _: faker.postcode,
 }
 
+# Faker provider modules each field type needs. Only these are loaded into a locale's instance.
+FIELD_PROVIDERS: Dict[str, Tuple[str, ...]] = {
+    "string": ("faker.providers.person",),
+    "email": ("faker.providers.person", "faker.providers.internet"),
+    "street": ("faker.providers.person", "faker.providers.address"),
+    "city": ("faker.providers.person", "faker.providers.address"),
+    "zipcode": ("faker.providers.person", "faker.providers.address"),
+}
+
+# Faker providers behind the string field types. Schemas with ``"pooled": true`` sample these
+# types from pre-generated value pools instead of calling Faker for every value.
+POOLED_PROVIDERS: Dict[str, str] = {
+    "string": "first_name",
+    "email": "email",
+    "street": "street_name",
+    "city": "city",
+    "zipcode": "postcode",
+}
+
+# Arrays that can be longer than this are generated while they are serialized instead of as lists
+ARRAY_STREAM_THRESHOLD = int(os.environ.get("FAKEIT_ARRAY_STREAM_THRESHOLD", "1000"))
+
+# Number of items of a streamed array generated at a time
+ARRAY_STREAM_CHUNK_SIZE = 1000
+
+# Name of the single field that array items are compiled as
+ARRAY_ITEM_FIELD = "item"
+
+# Maximum number of compiled schema plans kept in memory
+PLAN_CACHE_SIZE = 128
+
+# Every Nth column batch records the time spent per field type; 0 disables the timings
+FIELD_TIMING_INTERVAL = int(os.environ.get("FAKEIT_FIELD_TIMING_INTERVAL", "10"))
+
+_column_batches = count()
+
+# Compiled plans share one Faker instance per locale, so generation is serialized to keep
+# seeded runs reproducible when requests are served from several threads.
+_generation_lock = threading.Lock()
+
+
+def record_seed(seed: int, index: int) -> int:
+    """
+    Derive the Faker seed for a single record.
+
+    Args:
+        seed (int): The dataset seed.
+        index (int): The zero-based position of the record in the dataset.
+
+    Returns:
+        int: A seed that is unique for the (seed, index) pair.
+    """
+    return (seed << 64) + index
+
+
+def _row_column(generator: Callable[[], Any]) -> Callable[[int], List[Any]]:
+    return lambda n: [generator() for _ in repeat(None, n)]
+
+
+def _sampled_column(faker: "Faker", column_generator: Callable[[Any, int], List[Any]]) -> Callable[[int], List[Any]]:
+    # The random instance is looked up on every call because seeding may replace it
+    return lambda n: column_generator(faker.random, n)
+
+
+def _pooled_generator(faker: "Faker", pool: ValuePool) -> Callable[[], Any]:
+    return lambda: pool.sample(faker.random)
+
+
+def _pooled_column(faker: "Faker", pool: ValuePool) -> Callable[[int], List[Any]]:
+    return lambda n: pool.sample_column(faker.random, n)
+
+
+class CompiledSchema:
+    """
+    A precompiled execution plan for a list of schema fields.
+
+    The plan is a flat tuple of ``(field_name, generator)`` pairs where every generator is a
+    bound zero-argument callable. Nested ``object`` fields are compiled into their own plan
+    whose ``generate_record`` method is bound as the generator.
+
+    Each field also has a column generator that produces values for many records at once.
+    Numeric and categorical types are sampled a whole column at a time; other types fall back
+    to calling their row generator.
+
+    Records can also be generated as compact rows, tuples of values in the order of ``names``
+    with nested objects as tuples of their own, which skips building a dictionary per record.
+    """
+
+    __slots__ = ("plan", "names", "types", "columns", "faker", "locale", "children", "row_generators")
+
+    def __init__(
+        self,
+        plan: Tuple[Tuple[str, Callable[[], Any]], ...],
+        columns: Tuple[Callable[[int], Sequence[Any]], ...],
+        faker: "Faker",
+        locale: Optional[str] = None,
+        types: Tuple[str, ...] = (),
+        children: Tuple[Tuple[int, "CompiledSchema"], ...] = (),
+    ) -> None:
+        self.plan = plan
+        self.names = tuple(name for name, _ in plan)
+        self.types = types
+        self.columns = columns
+        self.faker = faker
+        self.locale = locale
+        # The positions and plans of nested objects, which are generated as rows of their own
+        self.children = children
+        row_generators = [generator for _, generator in plan]
+        for index, child in children:
+            row_generators[index] = child.generate_row
+        self.row_generators = tuple(row_generators)
+
+    def generate_record(self) -> Dict[str, Any]:
+        return {name: generator() for name, generator in self.plan}
+
+    def generate_row(self) -> Tuple[Any, ...]:
+        return tuple([generator() for generator in self.row_generators])
+
+    def rows_to_columns(self, rows: Sequence[Tuple[Any, ...]]) -> ColumnBatch:
+        """
+        Transpose rows of this plan into a column batch, with nested objects as nested batches.
+        """
+        columns: List[Sequence[Any]] = [list(column) for column in zip(*rows)] if rows else [[] for _ in self.names]
+        for index, child in self.children:
+            columns[index] = child.rows_to_columns(columns[index])
+        return ColumnBatch(self.names, columns, len(rows))
+
+    def generate_columns(self, num_records: int) -> ColumnBatch:
+        return ColumnBatch(self.names, [column(num_records) for column in self.columns], num_records)
+
+    def generate_timed_columns(self, num_records: int) -> ColumnBatch:
+        # Same as generate_columns, but also records the time spent per field type
+        timings: Dict[str, Tuple[float, int]] = {}
+        values = []
+        clock = time.perf_counter
+        for field_type, column in zip(self.types, self.columns):
+            started = clock()
+            values.append(column(num_records))
+            seconds, columns = timings.get(field_type, (0.0, 0))
+            timings[field_type] = (seconds + clock() - started, columns + 1)
+        return ColumnBatch(self.names, values, num_records, timings)
+
+    def generate_seeded_columns(self, num_records: int, seed: int) -> ColumnBatch:
+        """
+        Generate a column batch from a seed, as one unit rather than record by record.
+        """
+        with _generation_lock:
+            state = self.faker.random.getstate()
+            try:
+                self.faker.seed_instance(seed)
+                return self.generate_columns(num_records)
+            finally:
+                self.faker.random.setstate(state)
+
+    def generate_batch(self, num_records: int, seed: Optional[int] = None, start: int = 0) -> Sequence[Dict[str, Any]]:
+        """
+        Generate a batch of records for streaming or sending between processes.
+
+        Batches are returned as a ``ColumnBatch``, which builds the record dictionaries lazily
+        when iterated. Unseeded batches are generated column by column, and every
+        ``FIELD_TIMING_INTERVAL``-th one also carries the time spent per field type. Seeded batches
+        are generated as rows so that each record stays a function of its index.
+
+        Args:
+            num_records (int): The number of records to generate.
+            seed (Optional[int]): The dataset seed, or None for random records.
+            start (int): The index of the first record, used in seeded mode.
+
+        Returns:
+            Sequence[Dict[str, Any]]: The generated batch.
+        """
+        if seed is not None:
+            return self.rows_to_columns(self.generate_rows(num_records, seed, start))
+        with _generation_lock:
+            if FIELD_TIMING_INTERVAL > 0 and next(_column_batches) % FIELD_TIMING_INTERVAL == 0:
+                return self.generate_timed_columns(num_records)
+            return self.generate_columns(num_records)
+
+    def generate(self, num_records: int, seed: Optional[int] = None, start: int = 0) -> List[Dict[str, Any]]:
+        """
+        Generate records from the plan.
+
+        When a seed is given, record ``N`` depends only on the schema, the seed and ``N``, so any
+        slice of the dataset can be produced directly by passing its ``start`` index.
+
+        Args:
+            num_records (int): The number of records to generate.
+            seed (Optional[int]): The dataset seed, or None for random records.
+            start (int): The index of the first record, used in seeded mode.
+
+        Returns:
+            List[Dict[str, Any]]: A list of generated records.
+        """
+        return self._generate(self.generate_record, num_records, seed, start)
+
+    def generate_rows(self, num_records: int, seed: Optional[int] = None, start: int = 0) -> List[Tuple[Any, ...]]:
+        """
+        Generate records as rows, with the same values ``generate`` returns as dictionaries.
+        """
+        return self._generate(self.generate_row, num_records, seed, start)
+
+    def _generate(self, make: Callable[[], Any], num_records: int, seed: Optional[int], start: int) -> List[Any]:
+        with _generation_lock:
+            if seed is None:
+                return [make() for _ in range(num_records)]
+
+            # Restore the random state afterwards so unseeded requests do not repeat each other
+            faker = self.faker
+            state = faker.random.getstate()
+            seed_instance = faker.seed_instance
+            try:
+                records = []
+                for index in range(start, start + num_records):
+                    seed_instance(record_seed(seed, index))
+                    records.append(make())
+                return records
+            finally:
+                faker.random.setstate(state)
+
+
+_plan_cache: "OrderedDict[str, CompiledSchema]" = OrderedDict()
+_plan_cache_lock = threading.Lock()
+
+
+def _load_yaml(content: Union[str, bytes]) -> Any:
+    # The C loader is much faster on large schemas, but only available if PyYAML was built with libyaml
+    return yaml.load(content, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+# Parsers for schema files by format
+SCHEMA_PARSERS: Dict[str, Callable[[Union[str, bytes]], Any]] = {"json": json.loads, "yaml": _load_yaml}
+
+# Schema file formats by file extension
+SCHEMA_EXTENSIONS = {".json": "json", ".yaml": "yaml", ".yml": "yaml"}
+
+
+def schema_format(file_name: Optional[str], content_type: Optional[str] = None) -> str:
+    """
+    Determine the format of a schema file from its name or media type.
+
+    Args:
+        file_name (Optional[str]): The file name, e.g. "schema.yaml".
+        content_type (Optional[str]): The media type, used if the file extension is not known.
+
+    Returns:
+        str: "json" or "yaml". Defaults to "json".
+    """
+    file_format = SCHEMA_EXTENSIONS.get(os.path.splitext(file_name or "")[-1].lower())
+    if file_format is None and content_type and "yaml" in content_type.lower():
+        file_format = "yaml"
+    return file_format or "json"
+
+
+def parse_schema(content: Union[str, bytes], file_format: str = "json") -> Dict[str, Any]:
+    """
+    Parse the contents of a schema file.
+
+    Args:
+        content (Union[str, bytes]): The file contents.
+        file_format (str): "json" or "yaml".
+
+    Returns:
+        Dict[str, Any]: The parsed schema.
+
+    Raises:
+        ValueError: If the format is not supported or the contents are not a valid schema document.
+    """
+    if file_format not in SCHEMA_PARSERS:
+        raise ValueError(f"Unsupported schema format '{file_format}'. Supported formats: json, yaml")
+    try:
+        schema = SCHEMA_PARSERS[file_format](content)
+    except yaml.YAMLError as error:
+        raise ValueError(f"Invalid YAML schema: {error}") from error
+    if not isinstance(schema, dict):
+        raise ValueError("A schema must be an object with a 'fields' list")
+    return schema
+
 
 def load_schema(file_path: str) -> Dict[str, Any]:
     """
     Load a schema from a file.
 
     This function reads a schema from a file and returns its contents as a dictionary.
-    It supports JSON (.json) file format.
+    It supports JSON (.json) and YAML (.yaml, .yml) files.
 
     Args:
         file_path (str): The path to the schema file.
@@ -33,47 +366,307 @@ def load_schema(file_path: str) -> Dict[str, Any]:
         ValueError: If the file format is not supported.
     """
     file_extension = os.path.splitext(file_path)[-1].lower()
-    with open(file_path, "r", encoding="utf-8") as file:
-        if file_extension == ".json":
-            return json.load(file)
-        raise ValueError("Unsupported file format. Please provide a .json file.")
+    if file_extension not in SCHEMA_EXTENSIONS:
+        raise ValueError("Unsupported file format. Please provide a .json, .yaml or .yml file.")
+    with open(file_path, "rb") as file:
+        return parse_schema(file.read(), SCHEMA_EXTENSIONS[file_extension])
 
 
-def generate_fake_data(schema: Dict[str, Any], num_records: int) -> List[Dict[str, Any]]:
+def schema_hash(schema: Dict[str, Any]) -> str:
     """
-    Generate fake data based on the given schema.
+    Compute a canonical hash for a schema.
+
+    Key order does not affect the hash, so equivalent schemas share a cache entry. Schemas from
+    the schema registry carry their hash as ``schema_id`` and are not serialized again.
 
     Args:
         schema (Dict[str, Any]): The schema definition as a dictionary.
-        num_records (int): The number of records to generate.
 
     Returns:
-        List[Dict[str, Any]]: A list of generated records.
+        str: The hex digest of the canonical schema representation.
     """
-    return [generate_record(schema["fields"]) for _ in range(num_records)]
+    schema_id = getattr(schema, "schema_id", None)
+    if schema_id is not None:
+        return schema_id
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
 
 
-def generate_record(fields: List[Dict[str, Any]]) -> Dict[str, Any]:
+def required_providers(fields: List[Dict[str, Any]]) -> Set[str]:
     """
-    Generate a record based on schema fields.
+    Collect the Faker provider modules needed to generate the given fields.
 
     Args:
         fields (List[Dict[str, Any]]): The schema fields.
 
     Returns:
-        Dict[str, Any]: A generated record.
+        Set[str]: The provider module names.
+    """
+    providers: Set[str] = set()
+    for field in fields:
+        providers.update(FIELD_PROVIDERS.get(field.get("type"), ()))
+        if field.get("children"):
+            providers.update(required_providers(field["children"]))
+        if isinstance(field.get("items"), dict):
+            providers.update(required_providers([field["items"]]))
+    return providers
+
+
+class ArrayStream:
+    """
+    A long array whose items are generated when it is iterated.
+
+    Only the item schema, the length and a seed are stored, so a record with thousands of
+    embedded items stays small until it is serialized, and the JSON writers encode the items
+    chunk by chunk without building the whole list. The seed is drawn when the record is
+    generated, so seeded records stay reproducible. Iterating twice yields the same items.
+    """
+
+    __slots__ = ("schema", "length", "seed")
+
+    def __init__(self, schema: Dict[str, Any], length: int, seed: int) -> None:
+        self.schema = schema
+        self.length = length
+        self.seed = seed
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[Any]:
+        for chunk in self.chunks():
+            yield from chunk
+
+    def chunks(self) -> Iterator[List[Any]]:
+        """
+        Generate the items ``ARRAY_STREAM_CHUNK_SIZE`` at a time.
+        """
+        compiled = get_compiled_schema(self.schema)
+        for chunk, chunk_start in enumerate(range(0, self.length, ARRAY_STREAM_CHUNK_SIZE)):
+            size = min(ARRAY_STREAM_CHUNK_SIZE, self.length - chunk_start)
+            yield list(compiled.generate_seeded_columns(size, record_seed(self.seed, chunk)).columns[0])
+
+    def streams_items(self) -> bool:
+        """
+        Return whether the items can contain streamed arrays themselves.
+        """
+        return streams_arrays(self.schema["fields"])
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ArrayStream):
+            return (self.schema, self.length, self.seed) == (other.schema, other.length, other.seed)
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ArrayStream(length={self.length}, seed={self.seed})"
+
+
+def streams_arrays(fields: List[Dict[str, Any]]) -> bool:
+    """
+    Return whether records of the given fields can contain an ``ArrayStream``.
     """
-    record: Dict[str, Any] = {}
+    for field in fields:
+        if field.get("type") == "array":
+            if array_length(field)[1] > ARRAY_STREAM_THRESHOLD:
+                return True
+            if isinstance(field.get("items"), dict) and streams_arrays([field["items"]]):
+                return True
+        elif field.get("children") and streams_arrays(field["children"]):
+            return True
+    return False
+
+
+def _split_column(values: Sequence[Any], lengths: List[int]) -> List[List[Any]]:
+    arrays = []
+    position = 0
+    for length in lengths:
+        arrays.append(list(values[position : position + length]))
+        position += length
+    return arrays
+
+
+def _compile_array(
+    faker: "Faker", field: Dict[str, Any], pooled: bool, locale: Optional[str]
+) -> Tuple[Callable[[], Any], Callable[[int], Sequence[Any]]]:
+    # Returns the row and column generators of an array field
+    low, high = array_length(field)
+    items = field.get("items")
+    if not isinstance(items, dict):
+        raise ValueError(f"Field '{field.get('name')}': array fields need an 'items' field definition")
+    item_field = {**items, "name": ARRAY_ITEM_FIELD}
+    item = compile_fields([item_field], pooled, locale, faker)
+    lengths = range(low, high + 1)
+
+    if high > ARRAY_STREAM_THRESHOLD:
+        item_schema = {"fields": [item_field], "pooled": pooled, "locale": locale}
+
+        def stream() -> ArrayStream:
+            return ArrayStream(item_schema, faker.random.choice(lengths), faker.random.getrandbits(64))
+
+        return stream, _row_column(stream)
+
+    item_value = item.plan[0][1]
+    item_column = item.columns[0]
+
+    def array() -> List[Any]:
+        return [item_value() for _ in repeat(None, faker.random.choice(lengths))]
+
+    def column(num_records: int) -> List[List[Any]]:
+        # Items of all arrays in the batch are generated as one column, then split
+        counts = faker.random.choices(lengths, k=num_records)
+        values = item_column(sum(counts))
+        return _split_column(list(values) if isinstance(values, ColumnBatch) else values, counts)
+
+    return array, column
+
+
+def compile_fields(
+    fields: List[Dict[str, Any]],
+    pooled: bool = False,
+    locale: Optional[str] = None,
+    faker: Optional["Faker"] = None,
+) -> CompiledSchema:
+    """
+    Compile schema fields into an execution plan.
+
+    Args:
+        fields (List[Dict[str, Any]]): The schema fields.
+        pooled (bool): Whether string fields sample from pre-generated value pools.
+        locale (Optional[str]): The Faker locale, e.g. "de_DE". Defaults to the registry default.
+        faker (Optional[Faker]): The instance to bind generators to. Looked up by locale if not given.
+
+    Returns:
+        CompiledSchema: The compiled plan for the fields.
+
+    Raises:
+        ValueError: If a field has an unknown type or invalid options.
+    """
+    if faker is None:
+        faker = faker_registry.get(locale, required_providers(fields))
+
+    plan: List[Tuple[str, Callable[[], Any]]] = []
+    columns: List[Callable[[int], Sequence[Any]]] = []
+    types: List[str] = []
+    nested: List[Tuple[int, CompiledSchema]] = []
     for field in fields:
         field_name = field.get("name")
         field_type = field.get("type")
         children: Union[None, List[Dict[str, Any]]] = field.get("children")
 
-        if field_type in FIELD_GENERATORS:
-            record[field_name] = FIELD_GENERATORS[field_type](field_name)
-        elif field_type == "object" and children:
-            record[field_name] = generate_record(children)
+        # Unique fields are never pooled, since a pool holds only a few thousand distinct values
+        if pooled and field_type in POOLED_PROVIDERS and not field.get("unique"):
+            pool = value_pools.get_pool(POOLED_PROVIDERS[field_type], locale, FIELD_PROVIDERS[field_type])
+            plan.append((field_name, _pooled_generator(faker, pool)))
+            columns.append(_pooled_column(faker, pool))
+            types.append(f"pooled_{field_type}")
+        elif field_type in FIELD_GENERATORS:
+            generator = FIELD_GENERATORS[field_type](faker, field)
+            plan.append((field_name, generator))
+            if field_type in COLUMN_GENERATORS:
+                columns.append(_sampled_column(faker, COLUMN_GENERATORS[field_type](field)))
+            else:
+                columns.append(_row_column(generator))
+            types.append(field_type)
+        elif field_type == "object":
+            compiled = compile_fields(children or [], pooled, locale, faker)
+            nested.append((len(plan), compiled))
+            plan.append((field_name, compiled.generate_record))
+            columns.append(compiled.generate_columns)
+            types.append("object")
+        elif field_type == "array":
+            generator, column = _compile_array(faker, field, pooled, locale)
+            plan.append((field_name, generator))
+            columns.append(column)
+            types.append("array")
         else:
-            record[field_name] = None  # Default value for unsupported types
+            supported = ", ".join([*FIELD_GENERATORS, "object", "array"])
+            raise ValueError(f"Field '{field_name}': unknown type '{field_type}'. Supported types: {supported}")
+
+    return CompiledSchema(tuple(plan), tuple(columns), faker, locale, tuple(types), tuple(nested))
+
+
+def get_compiled_schema(schema: Dict[str, Any]) -> CompiledSchema:
+    """
+    Return the compiled plan for a schema, compiling it on first use.
+
+    Plans are kept in a bounded LRU cache keyed by the canonical schema hash.
+
+    Args:
+        schema (Dict[str, Any]): The schema definition as a dictionary.
+
+    Returns:
+        CompiledSchema: The compiled plan for the schema.
+    """
+    key = schema_hash(schema)
+    with _plan_cache_lock:
+        compiled = _plan_cache.get(key)
+        if compiled is not None:
+            _plan_cache.move_to_end(key)
+            return compiled
+
+    compiled = compile_fields(schema["fields"], bool(schema.get("pooled")), schema.get("locale"))
+    with _plan_cache_lock:
+        _plan_cache[key] = compiled
+        _plan_cache.move_to_end(key)
+        while len(_plan_cache) > PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+    return compiled
+
+
+def _evict_locale_plans(locale: str) -> None:
+    # Drop plans bound to an evicted Faker instance so it can be garbage collected
+    with _plan_cache_lock:
+        for key in [key for key, compiled in _plan_cache.items() if (compiled.locale or DEFAULT_LOCALE) == locale]:
+            del _plan_cache[key]
+
+
+faker_registry.add_eviction_listener(_evict_locale_plans)
+
+
+def reset_generation_state() -> None:
+    """
+    Drop all compiled plans and Faker instances.
+
+    Worker processes call this on startup so they build their own, independently seeded
+    instances instead of reusing copies inherited from the parent process.
+    """
+    faker_registry.clear()
+    with _plan_cache_lock:
+        _plan_cache.clear()
+    # All Faker instances share one random generator, and a forked process inherits its state.
+    # Reseed it from the OS so workers do not generate the same unseeded records.
+    faker_generator = sys.modules.get("faker.generator")
+    if faker_generator is not None:
+        faker_generator.random.seed()
+
 
-    return record
+def generate_fake_data(
+    schema: Dict[str, Any], num_records: int, seed: Optional[int] = None, start: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Generate fake data based on the given schema.
+
+    Args:
+        schema (Dict[str, Any]): The schema definition as a dictionary.
+        num_records (int): The number of records to generate.
+        seed (Optional[int]): The dataset seed. When set, the output is reproducible.
+        start (int): The index of the first record in the seeded dataset.
+
+    Returns:
+        List[Dict[str, Any]]: A list of generated records.
+    """
+    return get_compiled_schema(schema).generate(num_records, seed, start)
+
+
+def generate_record(fields: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Generate a record based on schema fields.
+
+    Args:
+        fields (List[Dict[str, Any]]): The schema fields.
+
+    Returns:
+        Dict[str, Any]: A generated record.
+    """
+    return compile_fields(fields).generate_record()
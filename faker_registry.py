@@ -0,0 +1,128 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional
+
+if TYPE_CHECKING:  # pragma: no cover
+    from faker import Faker
+
+# Locale used when a schema does not specify one
+DEFAULT_LOCALE = os.environ.get("FAKEIT_DEFAULT_LOCALE", "en_US")
+
+# Maximum number of locales with a live Faker instance; the least recently used one is evicted
+FAKER_CACHE_SIZE = int(os.environ.get("FAKEIT_FAKER_CACHE_SIZE", "4"))
+
+
+def create_faker(locale: Optional[str] = None, providers: Iterable[str] = ()) -> "Faker":
+    """
+    Create a Faker instance that only loads the given provider modules.
+
+    Faker itself is imported on first use, so importing this module stays cheap.
+
+    Args:
+        locale (Optional[str]): The locale, e.g. "de_DE". Defaults to ``DEFAULT_LOCALE``.
+        providers (Iterable[str]): Provider modules to load, e.g. "faker.providers.person".
+
+    Returns:
+        Faker: The new instance.
+
+    Raises:
+        ValueError: If the locale is not supported by Faker.
+    """
+    from faker import Faker  # pylint: disable=import-outside-toplevel
+    from faker.providers import BaseProvider  # pylint: disable=import-outside-toplevel
+
+    try:
+        # "faker.providers" is skipped by the factory, so this creates an instance without providers
+        faker = Faker(locale or DEFAULT_LOCALE, providers=["faker.providers"])
+    except AttributeError as error:
+        raise ValueError(f"Unsupported locale '{locale}'") from error
+    faker.add_provider(BaseProvider)
+    ensure_providers(faker, providers)
+    return faker
+
+
+def ensure_providers(faker: "Faker", providers: Iterable[str]) -> None:
+    """
+    Load provider modules into a Faker instance if they are not loaded yet.
+
+    Args:
+        faker (Faker): The instance to extend.
+        providers (Iterable[str]): Provider modules to load.
+    """
+    from faker.factory import Factory  # pylint: disable=import-outside-toplevel
+
+    generator = faker.factories[0]
+    loaded = {getattr(provider, "__provider__", None) for provider in generator.providers}
+    for module in providers:
+        if module in loaded:
+            continue
+        # Resolve the locale-specific provider class the same way Faker's factory does
+        provider_class, lang_found, _ = Factory._find_provider_class(module, faker.locales[0])
+        provider = provider_class(generator)
+        provider.__provider__ = module
+        provider.__lang__ = lang_found
+        generator.add_provider(provider)
+        loaded.add(module)
+
+
+class FakerRegistry:
+    """
+    Hands out one lazily created Faker instance per locale.
+
+    Instances start without providers and only load the provider modules that compiled schemas
+    ask for. The registry lives in module state, so every worker process gets its own instances.
+    When more than ``max_locales`` locales are in use, the least recently used instance is dropped
+    and the eviction listeners are notified so cached plans bound to it can be released.
+    """
+
+    def __init__(self, max_locales: int = FAKER_CACHE_SIZE) -> None:
+        self.max_locales = max_locales
+        self._instances: "OrderedDict[str, Faker]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._eviction_listeners: List[Callable[[str], None]] = []
+
+    def add_eviction_listener(self, listener: Callable[[str], None]) -> None:
+        self._eviction_listeners.append(listener)
+
+    def locales(self) -> List[str]:
+        with self._lock:
+            return list(self._instances)
+
+    def get(self, locale: Optional[str] = None, providers: Iterable[str] = ()) -> "Faker":
+        """
+        Return the Faker instance for a locale with the given providers loaded.
+
+        Args:
+            locale (Optional[str]): The locale. Defaults to ``DEFAULT_LOCALE``.
+            providers (Iterable[str]): Provider modules the caller needs.
+
+        Returns:
+            Faker: The shared instance for the locale.
+        """
+        locale = locale or DEFAULT_LOCALE
+        evicted = []
+        with self._lock:
+            faker = self._instances.get(locale)
+            if faker is None:
+                faker = self._instances[locale] = create_faker(locale, providers)
+            else:
+                ensure_providers(faker, providers)
+            self._instances.move_to_end(locale)
+            while len(self._instances) > self.max_locales:
+                evicted.append(self._instances.popitem(last=False)[0])
+        for evicted_locale in evicted:
+            for listener in self._eviction_listeners:
+                listener(evicted_locale)
+        return faker
+
+    def clear(self) -> None:
+        with self._lock:
+            locales = list(self._instances)
+            self._instances.clear()
+        for locale in locales:
+            for listener in self._eviction_listeners:
+                listener(locale)
+
+
+faker_registry = FakerRegistry()
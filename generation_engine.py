@@ -0,0 +1,213 @@
+import concurrent.futures
+import os
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Generator, List, Optional, Sequence
+
+from faker_data_generation_service import get_compiled_schema, reset_generation_state
+from metrics import record_batch
+from uniqueness import unique_filter
+
+# Number of web server worker processes on the host, the variable read by uvicorn and gunicorn
+WEB_CONCURRENCY = max(int(os.environ.get("WEB_CONCURRENCY", "1")), 1)
+
+# Number of worker processes used for generation. A value of 1 or less generates in-process.
+# Every web server worker starts its own pool, so the CPUs are split between them by default.
+GENERATION_WORKERS = int(os.environ.get("FAKEIT_GENERATION_WORKERS", max((os.cpu_count() or 1) // WEB_CONCURRENCY, 1)))
+
+# Number of records generated by a single worker call
+GENERATION_BATCH_SIZE = int(os.environ.get("FAKEIT_GENERATION_BATCH_SIZE", "1000"))
+
+# Called with the size of each batch before it is generated. Returns a function that is called
+# once the batch has been generated, or None to stop generating.
+Admission = Callable[[int], Optional[Callable[[], None]]]
+
+_executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _init_worker() -> None:
+    # Forked workers inherit the parent's Faker instances and random state, so start from scratch
+    reset_generation_state()
+
+
+def _no_release() -> None:
+    return None
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+def _generate_batch(
+    schema: Dict[str, Any], num_records: int, seed: Optional[int], start: int
+) -> Sequence[Dict[str, Any]]:
+    return get_compiled_schema(schema).generate_batch(num_records, seed, start)
+
+
+def get_generation_pool() -> Optional[concurrent.futures.ProcessPoolExecutor]:
+    """
+    Return the shared process pool, creating it on first use.
+
+    Returns:
+        Optional[ProcessPoolExecutor]: The pool, or None when generation runs in-process.
+    """
+    global _executor
+    if GENERATION_WORKERS <= 1:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ProcessPoolExecutor(max_workers=GENERATION_WORKERS, initializer=_init_worker)
+        return _executor
+
+
+def start_generation_pool() -> None:
+    """
+    Start the shared process pool and make sure every worker is running.
+    """
+    executor = get_generation_pool()
+    if executor is None:
+        return
+    futures = [executor.submit(_warm_up) for _ in range(GENERATION_WORKERS)]
+    concurrent.futures.wait(futures)
+
+
+def shutdown_generation_pool() -> None:
+    """
+    Shut down the shared process pool, if it was started.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(cancel_futures=True)
+            _executor = None
+
+
+def iter_record_batches(
+    schema: Dict[str, Any],
+    num_records: int,
+    batch_size: Optional[int] = None,
+    seed: Optional[int] = None,
+    start: int = 0,
+    admit: Optional[Admission] = None,
+) -> Generator[Sequence[Dict[str, Any]], None, None]:
+    """
+    Generate records in batches, sharded across the worker processes.
+
+    Batches are yielded in submission order, and only a bounded number of batches is in
+    flight at any time, so memory use does not grow with ``num_records``. Unseeded batches are
+    column batches that build their records when iterated.
+
+    When the schema has unique fields, records repeating one of their values are dropped here, in
+    the consuming process, and replaced; batches may then be smaller than ``batch_size``.
+
+    Args:
+        schema (Dict[str, Any]): The schema definition as a dictionary.
+        num_records (int): The number of records to generate.
+        batch_size (Optional[int]): The number of records per batch.
+        seed (Optional[int]): The dataset seed. Seeded output does not depend on the sharding.
+        start (int): The index of the first record in the seeded dataset.
+        admit (Optional[Admission]): Waits for permission to generate each batch, see scheduler.py.
+            Generation stops early when it returns None.
+
+    Returns:
+        Generator[Sequence[Dict[str, Any]], None, None]: The generated batches, in order.
+
+    Raises:
+        ValueError: Right away if a unique field has fewer possible values than ``num_records``,
+            and while iterating if an unbounded unique field runs out of values.
+    """
+    uniqueness = unique_filter(schema, num_records)
+    if uniqueness is None:
+        return _iter_batches(schema, num_records, batch_size, seed, start, admit)
+    return uniqueness.apply(
+        lambda count, first, stream_seed: _iter_batches(schema, count, batch_size, stream_seed, first, admit),
+        num_records,
+        start,
+        seed,
+    )
+
+
+def _release_when_done(release: Callable[[], None]) -> Callable[[concurrent.futures.Future], None]:
+    def done(_: concurrent.futures.Future) -> None:
+        release()
+
+    return done
+
+
+def _iter_batches(
+    schema: Dict[str, Any],
+    num_records: int,
+    batch_size: Optional[int],
+    seed: Optional[int],
+    start: int,
+    admit: Optional[Admission],
+) -> Generator[Sequence[Dict[str, Any]], None, None]:
+    batch_size = batch_size or GENERATION_BATCH_SIZE
+    batches = (
+        (batch_start, min(batch_size, start + num_records - batch_start))
+        for batch_start in range(start, start + num_records, batch_size)
+    )
+
+    executor = get_generation_pool()
+    if executor is None:
+        for batch_start, size in batches:
+            release = admit(size) if admit is not None else _no_release
+            if release is None:
+                return
+            try:
+                batch = _generate_batch(schema, size, seed, batch_start)
+            finally:
+                release()
+            record_batch(batch)
+            yield batch
+        return
+
+    max_in_flight = GENERATION_WORKERS * 2
+    in_flight: Deque[concurrent.futures.Future] = deque()
+    try:
+        for batch_start, size in batches:
+            release = admit(size) if admit is not None else _no_release
+            if release is None:
+                break
+            future = executor.submit(_generate_batch, schema, size, seed, batch_start)
+            # Released when the worker is done, also if the batch is never consumed
+            future.add_done_callback(_release_when_done(release))
+            in_flight.append(future)
+            if len(in_flight) >= max_in_flight:
+                batch = in_flight.popleft().result()
+                record_batch(batch)
+                yield batch
+        while in_flight:
+            batch = in_flight.popleft().result()
+            record_batch(batch)
+            yield batch
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def generate_records(
+    schema: Dict[str, Any],
+    num_records: int,
+    batch_size: Optional[int] = None,
+    seed: Optional[int] = None,
+    start: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Generate records using the shared process pool.
+
+    Args:
+        schema (Dict[str, Any]): The schema definition as a dictionary.
+        num_records (int): The number of records to generate.
+        batch_size (Optional[int]): The number of records per batch.
+        seed (Optional[int]): The dataset seed, or None for random records.
+        start (int): The index of the first record in the seeded dataset.
+
+    Returns:
+        List[Dict[str, Any]]: The generated records, in order.
+    """
+    data: List[Dict[str, Any]] = []
+    for batch in iter_record_batches(schema, num_records, batch_size, seed, start):
+        data.extend(batch)
+    return data
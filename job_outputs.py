@@ -0,0 +1,257 @@
+import importlib
+import os
+import time
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Content encodings written next to every job output while it is generated, e.g. "gzip,zstd"
+OUTPUT_PRECOMPRESS = [
+    name.strip() for name in os.environ.get("FAKEIT_OUTPUT_PRECOMPRESS", "").split(",") if name.strip()
+]
+
+# Seconds a finished job output is kept. 0 keeps outputs regardless of their age.
+OUTPUT_MAX_AGE = float(os.environ.get("FAKEIT_OUTPUT_MAX_AGE", "0"))
+
+# Total size in bytes of the job outputs kept on disk; the oldest are deleted above it. 0 means no limit.
+OUTPUT_MAX_BYTES = int(os.environ.get("FAKEIT_OUTPUT_MAX_BYTES", "0"))
+
+# Seconds between sweeps that apply the retention limits while the app is running. 0 disables them.
+OUTPUT_SWEEP_INTERVAL = float(os.environ.get("FAKEIT_OUTPUT_SWEEP_INTERVAL", "3600"))
+
+# Compression levels of the precompressed outputs, chosen for throughput over ratio
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Job outputs are named output_{task_id}.{extension}[.{encoding extension}]
+OUTPUT_PREFIX = "output_"
+
+# Suffix of outputs that are still being written
+PARTIAL_SUFFIX = ".part"
+
+
+class Compressor(ABC):
+    """Compresses a stream of chunks; ``flush`` returns the remaining bytes once the stream ends."""
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes: ...
+
+    @abstractmethod
+    def flush(self) -> bytes: ...
+
+
+class GzipCompressor(Compressor):
+    def __init__(self) -> None:
+        # A window of 16 + 15 bits writes the gzip header and trailer
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+class ZstdCompressor(Compressor):
+    def __init__(self) -> None:
+        zstandard = _import_zstandard()
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+def _import_zstandard() -> Any:
+    # The zstd encoding is optional and imported on first use
+    try:
+        return importlib.import_module("zstandard")
+    except ImportError as error:
+        raise ValueError("The 'zstd' encoding requires the zstandard package to be installed.") from error
+
+
+@dataclass(frozen=True)
+class ContentEncoding:
+    name: str
+    extension: str
+    compressor: Callable[[], Compressor]
+
+
+# Supported content encodings, in order of preference when a client accepts several
+CONTENT_ENCODINGS: Dict[str, ContentEncoding] = {
+    "zstd": ContentEncoding("zstd", ".zst", ZstdCompressor),
+    "gzip": ContentEncoding("gzip", ".gz", GzipCompressor),
+}
+
+
+def get_content_encodings(names: Sequence[str]) -> List[ContentEncoding]:
+    """
+    Look up content encodings by name.
+
+    Args:
+        names (Sequence[str]): Names of content encodings, e.g. ``["gzip", "zstd"]``.
+
+    Returns:
+        List[ContentEncoding]: The encodings, without duplicates.
+
+    Raises:
+        ValueError: If an encoding is unknown or its package is not installed.
+    """
+    encodings: List[ContentEncoding] = []
+    for name in names:
+        encoding = CONTENT_ENCODINGS.get(name.lower())
+        if encoding is None:
+            raise ValueError(f"Unknown content encoding '{name}'. Supported encodings: {', '.join(CONTENT_ENCODINGS)}")
+        if encoding.name == "zstd":
+            _import_zstandard()
+        if encoding not in encodings:
+            encodings.append(encoding)
+    return encodings
+
+
+class OutputFile:
+    """
+    Writes a job output and its precompressed copies side by side.
+
+    Everything is written to partial files first. ``commit`` moves all of them into place once
+    the output is complete, and ``discard`` removes them, so a download never sees a partial file.
+    """
+
+    def __init__(self, path: str, encodings: Sequence[ContentEncoding] = ()) -> None:
+        self.path = path
+        self._targets: List[Tuple[str, Optional[Compressor]]] = [(path, None)]
+        self._targets.extend((path + encoding.extension, encoding.compressor()) for encoding in encodings)
+        self._files = [open(target + PARTIAL_SUFFIX, "wb") for target, _ in self._targets]
+
+    def write(self, data: bytes) -> None:
+        for f, (_, compressor) in zip(self._files, self._targets):
+            f.write(compressor.compress(data) if compressor is not None else data)
+
+    def commit(self) -> None:
+        for f, (_, compressor) in zip(self._files, self._targets):
+            if compressor is not None:
+                f.write(compressor.flush())
+        self._close()
+        for target, _ in self._targets:
+            os.replace(target + PARTIAL_SUFFIX, target)
+
+    def discard(self) -> None:
+        self._close()
+        for target, _ in self._targets:
+            if os.path.exists(target + PARTIAL_SUFFIX):
+                os.remove(target + PARTIAL_SUFFIX)
+
+    def _close(self) -> None:
+        for f in self._files:
+            f.close()
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """
+    Parse an ``Accept-Encoding`` header into the quality value of every listed encoding.
+    """
+    accepted: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def select_output_variant(path: str, accept_encoding: Optional[str]) -> Tuple[str, Optional[str]]:
+    """
+    Choose the file to send for a job output: the preferred precompressed copy the client accepts, or the output itself.
+
+    Args:
+        path (str): The path of the job output.
+        accept_encoding (Optional[str]): The ``Accept-Encoding`` header of the request.
+
+    Returns:
+        Tuple[str, Optional[str]]: The path to send and its content encoding, or None if it is not compressed.
+    """
+    accepted = parse_accept_encoding(accept_encoding)
+    candidates = [
+        encoding
+        for encoding in CONTENT_ENCODINGS.values()
+        if accepted.get(encoding.name, accepted.get("*", 0.0)) > 0 and os.path.exists(path + encoding.extension)
+    ]
+    if not candidates:
+        return path, None
+    # Highest quality first; equal qualities keep the order of CONTENT_ENCODINGS
+    best = max(candidates, key=lambda encoding: accepted.get(encoding.name, accepted.get("*", 0.0)))
+    return path + best.extension, best.name
+
+
+def apply_retention(
+    output_dir: str,
+    max_age: float = OUTPUT_MAX_AGE,
+    max_bytes: int = OUTPUT_MAX_BYTES,
+    now: Optional[float] = None,
+    keep: Sequence[str] = (),
+) -> List[str]:
+    """
+    Delete finished job outputs that are older than ``max_age`` seconds, then the oldest ones
+    until the rest fit into ``max_bytes``.
+
+    An output and its precompressed copies are deleted together. Outputs that are still being
+    written and other files in the directory are never touched.
+
+    Args:
+        output_dir (str): The directory of the job outputs.
+        max_age (float): The age in seconds after which outputs are deleted. 0 disables the limit.
+        max_bytes (int): The total size in bytes of the outputs kept. 0 disables the limit.
+        now (Optional[float]): The current time, for tests.
+        keep (Sequence[str]): Paths of outputs that are kept regardless of the limits, e.g. one that was just written.
+
+    Returns:
+        List[str]: The paths of the deleted files.
+    """
+    if not max_age and not max_bytes:
+        return []
+    now = time.time() if now is None else now
+    # Group the files of every output by task, dated by their newest file
+    outputs: Dict[str, List[Tuple[str, os.stat_result]]] = {}
+    try:
+        entries = list(os.scandir(output_dir))
+    except FileNotFoundError:
+        return []
+    for entry in entries:
+        if not entry.name.startswith(OUTPUT_PREFIX) or entry.name.endswith(PARTIAL_SUFFIX) or not entry.is_file():
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        outputs.setdefault(entry.name.split(".", 1)[0], []).append((entry.path, stat))
+
+    by_age = sorted(outputs.values(), key=lambda files: max(stat.st_mtime for _, stat in files))
+    total = sum(stat.st_size for files in by_age for _, stat in files)
+    kept = {os.path.basename(path).split(".", 1)[0] for path in keep}
+    removed: List[str] = []
+    for files in by_age:
+        if os.path.basename(files[0][0]).split(".", 1)[0] in kept:
+            continue
+        expired = max_age and now - max(stat.st_mtime for _, stat in files) > max_age
+        if not expired and not (max_bytes and total > max_bytes):
+            # Outputs are sorted oldest first, so every later output is newer and the budget is met
+            break
+        for path, stat in files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            removed.append(path)
+            total -= stat.st_size
+    return removed
@@ -0,0 +1,430 @@
+import concurrent.futures
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from faker_data_generation_service import get_compiled_schema
+from generation_engine import GENERATION_BATCH_SIZE, iter_record_batches
+from job_outputs import (
+    OUTPUT_MAX_AGE,
+    OUTPUT_MAX_BYTES,
+    OUTPUT_PRECOMPRESS,
+    OutputFile,
+    apply_retention,
+    get_content_encodings,
+)
+from metrics import BATCH_GENERATION_SECONDS, BATCH_SERIALIZATION_SECONDS, JOB_DURATION_SECONDS
+from scheduler import Scheduler, record_cost, scheduler
+from serialization import OUTPUT_FORMATS, FormatWriter, OutputFormat
+from state_backend import PENDING_STATUSES, StateBackend, get_state_backend
+from uniqueness import check_unique_fields
+
+# Maximum number of jobs generating at the same time
+MAX_CONCURRENT_TASKS = 5
+
+# Maximum number of jobs waiting for a free slot
+MAX_QUEUED_TASKS = 100
+
+# Directory where job outputs are written
+OUTPUT_DIR = "output"
+
+# Name of the global concurrency limit of running jobs in the state backend
+JOB_SLOTS = "jobs"
+
+# Seconds between attempts to take a job slot held by other workers
+SLOT_POLL_INTERVAL = 0.1
+
+# Seconds between progress updates of a running job in the state backend
+PROGRESS_INTERVAL = 0.5
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job cannot be enqueued because the queue is full."""
+
+
+# Jobs are compared by identity when they are looked up in the queue
+@dataclass(eq=False)
+class Job:
+    task_id: str
+    schema: Dict[str, Any]
+    num_records: int
+    output_file: str
+    output_format: OutputFormat = field(default_factory=lambda: OUTPUT_FORMATS["json"], repr=False)
+    writer: Optional[FormatWriter] = field(default=None, repr=False)
+    status: str = "queued"
+    records_generated: int = 0
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    seed: Optional[int] = None
+    client: str = "unknown"
+    cost: float = 0.0
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = 0.0
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "task_id": self.task_id,
+            "status": self.status,
+            "num_records": self.num_records,
+            "records_generated": self.records_generated,
+            "progress": self.records_generated / self.num_records if self.num_records else 1.0,
+            "elapsed_seconds": round(elapsed, 3),
+            "records_per_second": round(self.records_generated / elapsed, 1) if elapsed else 0.0,
+            "output_file": self.output_file,
+            "format": self.output_format.name,
+            "estimated_cost_seconds": round(self.cost, 3),
+            "error": self.error,
+        }
+
+    def remaining_cost(self) -> float:
+        if not self.num_records:
+            return 0.0
+        return self.cost * (1 - self.records_generated / self.num_records)
+
+
+def estimate_start_delay(running: List[float], ahead: List[float], slots: int, parallelism: int) -> float:
+    """
+    Estimate the seconds until a queued job starts.
+
+    Running jobs are assumed to share the generation workers equally, and a queued job starts
+    whenever a running one finishes.
+
+    Args:
+        running (List[float]): The remaining estimated cost of each running job.
+        ahead (List[float]): The estimated cost of each job that starts before this one, in order.
+        slots (int): The number of jobs that can run at once.
+        parallelism (int): The number of generation workers.
+
+    Returns:
+        float: The estimated delay in seconds.
+    """
+    active = sorted(running)
+    pending = list(ahead)
+    delay = 0.0
+    while True:
+        while pending and len(active) < slots:
+            active.append(pending.pop(0))
+            active.sort()
+        if len(active) < slots:
+            return delay
+        # The job with the least remaining work finishes first
+        finished = active.pop(0)
+        delay += finished * (len(active) + 1) / parallelism
+        active = [remaining - finished for remaining in active]
+
+
+class JobManager:
+    """
+    Runs large generation requests in the background.
+
+    Jobs are queued and executed by a fixed number of threads. Each job pulls batches from
+    the generation engine and appends them to its output file as they arrive, so memory use
+    stays bounded regardless of the record count.
+
+    Job statuses, cancellation requests and the concurrency limit are kept in the state
+    backend, so any worker sharing it can report on or cancel a job and the limits apply to
+    all workers together. A job is only kept in memory until it has finished; after that its
+    status is read from the state backend, which expires it after ``JOB_STATUS_TTL`` seconds.
+
+    Queued jobs are started round-robin by client, so one client queueing many jobs does not
+    hold back the jobs of others. Every batch of a running job is admitted by the scheduler at
+    background priority, which keeps large jobs from starving interactive requests.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT_TASKS,
+        max_queued: int = MAX_QUEUED_TASKS,
+        output_dir: str = OUTPUT_DIR,
+        backend: Optional[StateBackend] = None,
+        job_scheduler: Optional[Scheduler] = None,
+        precompress: Sequence[str] = tuple(OUTPUT_PRECOMPRESS),
+        max_output_age: float = OUTPUT_MAX_AGE,
+        max_output_bytes: int = OUTPUT_MAX_BYTES,
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.output_dir = output_dir
+        # Unknown encodings and missing compression packages fail at startup, not in the first job
+        self.encodings = get_content_encodings(precompress)
+        self.max_output_age = max_output_age
+        self.max_output_bytes = max_output_bytes
+        self._backend = backend
+        self.scheduler = job_scheduler or scheduler
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_concurrent, thread_name_prefix="fakeit-job"
+        )
+        self._jobs: Dict[str, Job] = {}
+        self._queue: List[Job] = []
+        self._active_clients: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self) -> StateBackend:
+        return self._backend or get_state_backend()
+
+    def running_count(self) -> int:
+        return self.backend.count_slots(JOB_SLOTS)
+
+    def queued_count(self) -> int:
+        return self.backend.count_jobs(["queued"])
+
+    def submit(
+        self,
+        schema: Dict[str, Any],
+        num_records: int,
+        output_format: Optional[OutputFormat] = None,
+        seed: Optional[int] = None,
+        client: str = "unknown",
+    ) -> Job:
+        """
+        Enqueue a generation job.
+
+        Args:
+            schema (Dict[str, Any]): The schema definition as a dictionary.
+            num_records (int): The number of records to generate.
+            output_format (Optional[OutputFormat]): The output format, JSON by default.
+            seed (Optional[int]): The dataset seed, or None for random records.
+            client (str): The client the job runs for, used to share job slots fairly.
+
+        Returns:
+            Job: The queued job.
+
+        Raises:
+            JobQueueFullError: If too many jobs are already pending.
+            ValueError: If the schema is invalid or cannot be written in the output format, or a
+                unique field has fewer possible values than ``num_records``.
+        """
+        output_format = output_format or OUTPUT_FORMATS["json"]
+        # Create the writer up front so unsupported format and schema combinations fail early
+        writer = output_format.writer(schema)
+        get_compiled_schema(schema)
+        check_unique_fields(schema, num_records)
+        os.makedirs(self.output_dir, exist_ok=True)
+        task_id = str(uuid.uuid4())
+        output_file = os.path.join(self.output_dir, f"output_{task_id}.{output_format.extension}")
+        job = Job(
+            task_id,
+            schema,
+            num_records,
+            output_file,
+            output_format,
+            writer,
+            seed=seed,
+            client=client,
+            cost=record_cost(schema) * num_records,
+        )
+        if not self.backend.add_job(task_id, job.to_dict(), self.max_concurrent + self.max_queued):
+            raise JobQueueFullError("Too many concurrent background tasks. Please try again later.")
+        with self._lock:
+            self._jobs[task_id] = job
+            self._queue.append(job)
+        # Each call starts whichever queued job is next in line, not necessarily this one
+        self._executor.submit(self._run_next)
+        return job
+
+    def get(self, task_id: str) -> Optional[Job]:
+        # Only jobs of this worker that have not finished yet are kept
+        with self._lock:
+            return self._jobs.get(task_id)
+
+    def status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the status of a job, which may be run by another worker.
+
+        Args:
+            task_id (str): The job identifier.
+
+        Returns:
+            Optional[Dict[str, Any]]: The job status, or None if the job does not exist.
+        """
+        job = self.get(task_id)
+        if job is None:
+            return self.backend.get_job(task_id)
+        if job.status in PENDING_STATUSES and self._cancel_requested(job):
+            self.cancel(task_id)
+        state = job.to_dict()
+        estimate = self.queue_estimate(job)
+        if estimate is not None:
+            state["queue_position"], delay = estimate
+            state["estimated_start_seconds"] = round(delay, 3)
+        return state
+
+    def queue_estimate(self, job: Job) -> Optional[Tuple[int, float]]:
+        """
+        Return the position of a queued job and the estimated seconds until it starts.
+
+        The estimate only covers jobs of this worker.
+
+        Args:
+            job (Job): A job of this worker.
+
+        Returns:
+            Optional[Tuple[int, float]]: The 1-based queue position and the delay, or None if the job is not waiting.
+        """
+        with self._lock:
+            if job not in self._queue or job.status != "queued":
+                return None
+            order = self._start_order()
+            running = [other.remaining_cost() for other in self._jobs.values() if other.status == "in_progress"]
+        position = order.index(job)
+        ahead = [other.cost for other in order[:position]]
+        delay = estimate_start_delay(running, ahead, self.max_concurrent, self.scheduler.parallelism)
+        return position + 1, delay
+
+    def cancel(self, task_id: str) -> Optional[Job]:
+        """
+        Request cancellation of a job run by this worker.
+
+        Queued jobs never start; running jobs stop after the current batch.
+
+        Args:
+            task_id (str): The job identifier.
+
+        Returns:
+            Optional[Job]: The job, or None if this worker does not run it.
+        """
+        job = self.get(task_id)
+        if job is not None and job.status in PENDING_STATUSES:
+            job.cancel_event.set()
+            if job.status == "queued":
+                job.status = "cancelled"
+            self.backend.put_job(task_id, job.to_dict())
+        return job
+
+    def request_cancel(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Request cancellation of a job, which may be run by another worker.
+
+        Args:
+            task_id (str): The job identifier.
+
+        Returns:
+            Optional[Dict[str, Any]]: The job status, or None if the job does not exist.
+        """
+        job = self.cancel(task_id)
+        if job is not None:
+            return job.to_dict()
+        return self.backend.request_cancel(task_id)
+
+    def enforce_retention(self, keep: Sequence[str] = ()) -> List[str]:
+        """
+        Delete the job outputs that are too old or exceed the disk budget, see ``job_outputs.apply_retention``.
+
+        Args:
+            keep (Sequence[str]): Paths of outputs that must not be deleted.
+
+        Returns:
+            List[str]: The paths of the deleted files.
+        """
+        return apply_retention(self.output_dir, self.max_output_age, self.max_output_bytes, keep=keep)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel_event.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _cancel_requested(self, job: Job) -> bool:
+        if not job.cancel_event.is_set() and self.backend.is_cancel_requested(job.task_id):
+            job.cancel_event.set()
+        return job.cancel_event.is_set()
+
+    def _wait_for_slot(self, job: Job) -> bool:
+        # The slots are shared by all workers, so a free thread may still have to wait
+        while not self.backend.acquire_slot(JOB_SLOTS, job.task_id, self.max_concurrent):
+            if self._cancel_requested(job):
+                return False
+            time.sleep(SLOT_POLL_INTERVAL)
+        return True
+
+    def _start_order(self) -> List[Job]:
+        # Called with the lock held: round-robin by client, then by submission time
+        waiting = [job for job in self._queue if job.status == "queued"]
+        seen: Counter = Counter()
+        rank = {}
+        for job in waiting:
+            rank[job.task_id] = self._active_clients[job.client] + seen[job.client]
+            seen[job.client] += 1
+        return sorted(waiting, key=lambda job: rank[job.task_id])
+
+    def _run_next(self) -> None:
+        with self._lock:
+            order = self._start_order()
+            job = order[0] if order else (self._queue[0] if self._queue else None)
+            if job is None:
+                return
+            self._queue.remove(job)
+            self._active_clients[job.client] += 1
+        try:
+            self._run(job)
+        finally:
+            with self._lock:
+                self._active_clients[job.client] -= 1
+                if not self._active_clients[job.client]:
+                    del self._active_clients[job.client]
+                # The final status is in the state backend; drop the schema, writer and job
+                del self._jobs[job.task_id]
+
+    def _run(self, job: Job) -> None:
+        if self._cancel_requested(job) or not self._wait_for_slot(job):
+            job.status = "cancelled"
+            self.backend.put_job(job.task_id, job.to_dict())
+            return
+
+        job.status = "in_progress"
+        job.started_at = time.time()
+        self.backend.put_job(job.task_id, job.to_dict())
+        admit = self.scheduler.batch_admission(job.schema, job.client, "background", job.cancel_event)
+        batches = iter_record_batches(job.schema, job.num_records, GENERATION_BATCH_SIZE, job.seed, admit=admit)
+        output: Optional[OutputFile] = None
+        try:
+            output = OutputFile(job.output_file, self.encodings)
+            output.write(job.writer.begin())
+            published = started = time.perf_counter()
+            for batch in batches:
+                if job.cancel_event.is_set():
+                    break
+                generated = time.perf_counter()
+                output.write(job.writer.write(batch))
+                job.records_generated += len(batch)
+                BATCH_GENERATION_SECONDS.observe(generated - started, source="job")
+                started = time.perf_counter()
+                BATCH_SERIALIZATION_SECONDS.observe(started - generated, source="job")
+                # Share progress and pick up cancellations from other workers at a bounded rate
+                if started - published >= PROGRESS_INTERVAL:
+                    published = started
+                    self._cancel_requested(job)
+                    self.backend.put_job(job.task_id, job.to_dict())
+            output.write(job.writer.end())
+
+            if job.cancel_event.is_set():
+                output.discard()
+                job.status = "cancelled"
+            else:
+                output.commit()
+                job.status = "completed"
+                print(f"Data successfully written to {job.output_file}")
+        except Exception as e:  # pylint: disable=broad-except
+            job.status = "failed"
+            job.error = str(e)
+            if output is not None:
+                output.discard()
+            print(f"Failed to write data to {job.output_file}: {e}")
+        finally:
+            batches.close()
+            job.finished_at = time.time()
+            self.backend.release_slot(JOB_SLOTS, job.task_id)
+            self.backend.put_job(job.task_id, job.to_dict())
+            JOB_DURATION_SECONDS.observe(job.finished_at - job.started_at, status=job.status)
+        if job.status == "completed":
+            self.enforce_retention(keep=[job.output_file])
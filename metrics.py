@@ -0,0 +1,388 @@
+import bisect
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter as StackCounter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Histogram buckets in seconds, used unless a histogram sets its own
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Requests with an X-Profile header are profiled when enabled
+PROFILING_ENABLED = os.environ.get("FAKEIT_PROFILING", "0").lower() in ("1", "true", "yes")
+
+# Seconds between two stack samples of the request profiler
+PROFILE_INTERVAL = float(os.environ.get("FAKEIT_PROFILE_INTERVAL", "0.005"))
+
+# Directory the default profile hook writes collapsed stacks to
+PROFILE_DIR = os.environ.get("FAKEIT_PROFILE_DIR", "profiles")
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+MetricT = TypeVar("MetricT", bound="Metric")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    """
+    Base class for metrics with an optional fixed set of label names.
+
+    Values are kept per combination of label values and updated under a lock, so metrics can
+    be shared between request handlers, worker threads and background jobs.
+    """
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"Metric '{self.name}' expects labels: {', '.join(self.labelnames) or 'none'}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, Sequence[str], Sequence[str], float]]:
+        with self._lock:
+            return [(self.name, self.labelnames, key, value) for key, value in self._values.items()]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for name, labelnames, labelvalues, value in self.samples():
+            lines.append(f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(Metric):
+    """A value that can go up and down, or is read from a function when the metrics are rendered."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Optional[Callable[[], float]]) -> None:
+        self._function = function
+
+    def get(self, **labels: Any) -> float:
+        if self._function is not None:
+            return float(self._function())
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[str, Sequence[str], Sequence[str], float]]:
+        if self._function is not None:
+            return [(self.name, (), (), float(self._function()))]
+        return super().samples()
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (the last one is +Inf), then the sum of all observations
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def count(self, **labels: Any) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return sum(state[0]) if state else 0
+
+    def sum(self, **labels: Any) -> float:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[1] if state else 0.0
+
+    def samples(self) -> List[Tuple[str, Sequence[str], Sequence[str], float]]:
+        samples: List[Tuple[str, Sequence[str], Sequence[str], float]] = []
+        labelnames = (*self.labelnames, "le")
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                cumulative = 0
+                for bound, count in zip((*self.buckets, float("inf")), counts):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", labelnames, (*key, _format_value(bound)), cumulative))
+                samples.append((f"{self.name}_sum", self.labelnames, key, total))
+                samples.append((f"{self.name}_count", self.labelnames, key, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: MetricT) -> MetricT:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+RECORDS_GENERATED = REGISTRY.register(Counter("fakeit_records_generated_total", "Number of records generated."))
+FIELD_GENERATION_SECONDS = REGISTRY.register(
+    Counter(
+        "fakeit_field_generation_seconds_total",
+        "Time spent generating field values, per field type, in sampled column batches.",
+        ["type"],
+    )
+)
+FIELD_VALUES_TIMED = REGISTRY.register(
+    Counter(
+        "fakeit_field_values_timed_total",
+        "Number of field values generated in sampled column batches, per field type.",
+        ["type"],
+    )
+)
+BATCH_GENERATION_SECONDS = REGISTRY.register(
+    Histogram(
+        "fakeit_batch_generation_seconds",
+        "Time spent waiting for a generated batch, including time spent in worker processes.",
+        ["source"],
+    )
+)
+BATCH_SERIALIZATION_SECONDS = REGISTRY.register(
+    Histogram("fakeit_batch_serialization_seconds", "Time spent encoding a generated batch.", ["source"])
+)
+REQUEST_DURATION_SECONDS = REGISTRY.register(
+    Histogram(
+        "fakeit_http_request_duration_seconds",
+        "HTTP request latency until the response body is sent.",
+        ["method", "route", "status"],
+    )
+)
+JOB_SLOTS_IN_USE = REGISTRY.register(Gauge("fakeit_job_slots_in_use", "Number of background jobs running."))
+JOB_SLOTS_TOTAL = REGISTRY.register(Gauge("fakeit_job_slots_total", "Number of background jobs that can run at once."))
+JOB_QUEUE_DEPTH = REGISTRY.register(Gauge("fakeit_job_queue_depth", "Number of background jobs waiting for a slot."))
+JOB_DURATION_SECONDS = REGISTRY.register(
+    Histogram(
+        "fakeit_job_duration_seconds",
+        "Background job run time by final status.",
+        ["status"],
+        buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0),
+    )
+)
+RESPONSE_CACHE_REQUESTS = REGISTRY.register(
+    Counter(
+        "fakeit_response_cache_requests_total",
+        "Seeded requests by cache result: hit, miss or not_modified.",
+        ["result"],
+    )
+)
+RESPONSE_CACHE_BYTES = REGISTRY.register(Gauge("fakeit_response_cache_bytes", "Size of the cached responses."))
+SCHEDULER_BUDGET_IN_USE = REGISTRY.register(
+    Gauge("fakeit_scheduler_budget_in_use_seconds", "Estimated cost of the generation work currently admitted.")
+)
+SCHEDULER_QUEUE_DEPTH = REGISTRY.register(
+    Gauge("fakeit_scheduler_queue_depth", "Number of units of generation work waiting for admission.")
+)
+SCHEDULER_WAIT_SECONDS = REGISTRY.register(
+    Histogram("fakeit_scheduler_wait_seconds", "Time generation work waited for admission.", ["priority"])
+)
+WEBSOCKET_SUBSCRIBERS = REGISTRY.register(Gauge("fakeit_websocket_subscribers", "Number of open /ws connections."))
+
+
+def record_batch(batch: Sequence[Any]) -> None:
+    """
+    Count a generated batch and collect the field timings it carries.
+
+    Batches are counted where they are consumed rather than where they are generated, because
+    worker processes have their own copy of the metrics. Column batches carry their field
+    timings with them for the same reason.
+
+    Args:
+        batch (Sequence[Any]): The generated batch.
+    """
+    RECORDS_GENERATED.inc(len(batch))
+    timings = getattr(batch, "timings", None)
+    if timings:
+        for field_type, (seconds, columns) in timings.items():
+            FIELD_GENERATION_SECONDS.inc(seconds, type=field_type)
+            FIELD_VALUES_TIMED.inc(len(batch) * columns, type=field_type)
+
+
+async def metrics_endpoint(_: Request) -> Response:
+    # Gauge functions may query the shared state backend, which can block
+    return Response(await run_in_threadpool(REGISTRY.render), media_type=PROMETHEUS_MEDIA_TYPE)
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of all threads of the process at a fixed interval.
+
+    The samples are aggregated as collapsed stacks ("outer;inner;leaf" with a count), the input
+    format of common flame graph tools. Work done in generation worker processes is not seen.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL) -> None:
+        self.interval = interval
+        self.stacks: StackCounter = StackCounter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fakeit-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Dict[str, int]:
+        self._stop.set()
+        self._thread.join()
+        return dict(self.stacks)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():  # pylint: disable=protected-access
+                if thread_id == own_id:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+
+
+def write_profile(method: str, path: str, stacks: Dict[str, int]) -> None:
+    """
+    Default profile hook: write the collapsed stacks of a request to ``PROFILE_DIR``.
+
+    Args:
+        method (str): The HTTP method of the profiled request.
+        path (str): The path of the profiled request.
+        stacks (Dict[str, int]): Sample counts by collapsed stack.
+    """
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile_file = os.path.join(PROFILE_DIR, f"profile_{int(time.time())}_{uuid.uuid4().hex[:8]}.txt")
+    with open(profile_file, "w", encoding="utf-8") as f:
+        f.write(f"# {method} {path}\n")
+        for stack, count in sorted(stacks.items(), key=lambda item: -item[1]):
+            f.write(f"{stack} {count}\n")
+    print(f"Profile for {method} {path} written to {profile_file}")
+
+
+# Called with the method, path and collapsed stacks of every profiled request
+profile_hook: Callable[[str, str, Dict[str, int]], None] = write_profile
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that records the latency of every HTTP request by route template.
+
+    When profiling is enabled, requests that carry an ``X-Profile`` header are sampled with a
+    ``SamplingProfiler`` and the result is passed to ``profile_hook``.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        profiler = None
+        if PROFILING_ENABLED and any(name == b"x-profile" for name, _ in scope.get("headers", ())):
+            profiler = SamplingProfiler()
+            profiler.start()
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Unmatched paths are grouped so arbitrary URLs cannot create new label values
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_DURATION_SECONDS.observe(
+                time.perf_counter() - started, method=scope["method"], route=route, status=status_code
+            )
+            if profiler is not None:
+                profile_hook(scope["method"], scope["path"], profiler.stop())
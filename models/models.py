@@ -10,7 +10,17 @@ class Field(BaseModel):
     name: str
     type: str
     children: Optional[List[Field]] = None  # Allow nested fields
+    items: Optional[Dict[str, Any]] = None  # Item definition of array fields
+    unique: bool = False  # No two generated records share a value of this field
 
 
 class SchemaInput(BaseModel):
     fields: List[Dict[str, Any]]
+    pooled: bool = False  # Sample string fields from pre-generated value pools
+    locale: Optional[str] = None  # Faker locale, e.g. "de_DE"
+
+
+class DatasetInput(BaseModel):
+    entities: List[Dict[str, Any]]  # Related entities, see relational.py
+    pooled: bool = False
+    locale: Optional[str] = None
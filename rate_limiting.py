@@ -0,0 +1,89 @@
+import math
+from typing import Awaitable, Callable, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from state_backend import StateBackend, get_state_backend
+
+# Seconds per unit of a rate limit string such as "10/minute"
+RATE_UNITS = {"second": 1.0, "minute": 60.0, "hour": 3600.0, "day": 86400.0}
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """
+    Parse a rate limit string such as "10/minute".
+
+    Args:
+        rate (str): The number of requests and the period, separated by a slash.
+
+    Returns:
+        Tuple[int, float]: The number of requests and the period in seconds.
+
+    Raises:
+        ValueError: If the string is not a valid rate.
+    """
+    amount, _, unit = rate.partition("/")
+    unit = unit.strip().lower().removesuffix("s")
+    if not amount.strip().isdigit() or int(amount) < 1 or unit not in RATE_UNITS:
+        raise ValueError(f"Invalid rate limit '{rate}'. Use e.g. '10/minute'.")
+    return int(amount), RATE_UNITS[unit]
+
+
+def client_address(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimiter:
+    """
+    Token bucket rate limits per route and client, kept in the shared state backend.
+
+    Each limit is a FastAPI dependency. A client can burst up to the full amount of a limit,
+    after which tokens are refilled evenly over the period. Because the buckets live in the
+    state backend, the limit holds across all workers that share it.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[StateBackend] = None,
+        key_func: Callable[[Request], str] = client_address,
+    ) -> None:
+        self._backend = backend
+        self.key_func = key_func
+        self.enabled = True
+
+    @property
+    def backend(self) -> StateBackend:
+        return self._backend or get_state_backend()
+
+    def limit(self, rate: str) -> Callable[[Request], Awaitable[None]]:
+        """
+        Create a dependency that enforces a rate limit.
+
+        Args:
+            rate (str): The limit, e.g. "10/minute".
+
+        Returns:
+            Callable[[Request], Awaitable[None]]: The dependency; it raises a 429 error when the limit is exceeded.
+        """
+        capacity, period = parse_rate(rate)
+        refill_rate = capacity / period
+
+        # A plain coroutine, so in-memory checks run on the event loop; a backend that can block,
+        # such as SQLite waiting for another worker's write, is called from a worker thread
+        async def check_rate_limit(request: Request) -> None:
+            if not self.enabled:
+                return
+            backend = self.backend
+            key = f"{getattr(request.scope.get('route'), 'path', request.url.path)}:{self.key_func(request)}"
+            retry_after = await backend.call(backend.consume_token, key, capacity, refill_rate)
+            if retry_after > 0:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Rate limit exceeded",
+                    headers={"Retry-After": str(math.ceil(retry_after))},
+                )
+
+        return check_rate_limit
+
+    def reset(self) -> None:
+        self.backend.reset_rate_limits()
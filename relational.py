@@ -0,0 +1,310 @@
+import hashlib
+import random
+from dataclasses import dataclass, field
+from itertools import chain, islice, repeat
+from typing import Any, Callable, Dict, Generator, Iterator, List, Optional, Sequence, Set, Tuple
+
+from columnar import ColumnBatch
+from faker_data_generation_service import get_compiled_schema, record_seed, schema_hash
+from generation_engine import Admission, iter_record_batches
+from models.models import DatasetInput
+from schema_registry import RegisteredSchema
+
+# Field type of a foreign key to the primary key of another entity
+REFERENCE_TYPE = "reference"
+
+# Name of the primary key every entity gets unless it sets "primary_key"
+DEFAULT_PRIMARY_KEY = "id"
+
+# Number of parent records whose child counts are drawn at a time
+CHILD_COUNT_CHUNK = 1024
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix(value: int) -> int:
+    # SplitMix64 finalizer: a cheap, well distributed hash of a 64-bit integer
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+@dataclass
+class Entity:
+    """
+    One table of a relational dataset.
+
+    Records are keyed by a dense integer primary key from 1 to the number of records, so a
+    reference to an entity only needs its record count to be valid and never a lookup of its data.
+    """
+
+    name: str
+    position: int
+    schema: RegisteredSchema
+    output_fields: List[Dict[str, Any]]
+    primary_key: str
+    references: Dict[str, str]
+    count: Optional[int] = None
+    parent: Optional[str] = None
+    per_min: int = 0
+    per_max: int = 0
+    parent_reference: Optional[str] = None
+    depends_on: List[str] = field(default_factory=list)
+
+    def output_schema(self) -> Dict[str, Any]:
+        """
+        Return the schema of the generated records, with keys and references as integer fields.
+        """
+        return {"fields": self.output_fields}
+
+    def expected_records(self, parent_records: float = 0.0) -> float:
+        if self.parent is None:
+            return float(self.count or 0)
+        return parent_records * (self.per_min + self.per_max) / 2
+
+
+def _compile_entity(definition: Dict[str, Any], position: int, pooled: bool, locale: Optional[str]) -> Entity:
+    name = definition.get("name")
+    if not isinstance(name, str) or not name:
+        raise ValueError("Every entity needs a name")
+    fields = definition.get("fields")
+    if not isinstance(fields, list):
+        raise ValueError(f"Entity '{name}': fields must be a list")
+    primary_key = definition.get("primary_key", DEFAULT_PRIMARY_KEY)
+
+    references: Dict[str, str] = {}
+    generated: List[Dict[str, Any]] = []
+    output_fields: List[Dict[str, Any]] = [{"name": primary_key, "type": "integer"}]
+    for item in fields:
+        field_name = item.get("name")
+        if field_name == primary_key:
+            raise ValueError(f"Entity '{name}': field '{field_name}' clashes with the primary key")
+        if item.get("type") == REFERENCE_TYPE:
+            target = item.get("entity")
+            if not isinstance(target, str):
+                raise ValueError(f"Entity '{name}': reference '{field_name}' needs the entity it refers to")
+            references[field_name] = target
+            output_fields.append({"name": field_name, "type": "integer"})
+        else:
+            generated.append(item)
+            output_fields.append(item)
+
+    entity_schema = {"fields": generated, "pooled": pooled, "locale": locale}
+    # Compiling reports unknown field types and invalid options before anything is generated
+    get_compiled_schema(entity_schema)
+    entity = Entity(
+        name,
+        position,
+        RegisteredSchema(entity_schema, schema_hash(entity_schema)),
+        output_fields,
+        primary_key,
+        references,
+    )
+
+    per = definition.get("per")
+    if (per is None) == (definition.get("count") is None):
+        raise ValueError(f"Entity '{name}': set either count or per")
+    if per is None:
+        entity.count = int(definition["count"])
+        if entity.count < 0:
+            raise ValueError(f"Entity '{name}': count must not be negative")
+    else:
+        if not isinstance(per, dict) or "entity" not in per or "max" not in per:
+            raise ValueError(f"Entity '{name}': per needs an entity and a max number of records per parent")
+        entity.parent = per["entity"]
+        entity.per_min, entity.per_max = int(per.get("min", 0)), int(per["max"])
+        if not 0 <= entity.per_min <= entity.per_max:
+            raise ValueError(f"Entity '{name}': per needs 0 <= min <= max")
+        parent_references = [field_name for field_name, target in references.items() if target == entity.parent]
+        if not parent_references:
+            raise ValueError(f"Entity '{name}': needs a reference field to its parent '{entity.parent}'")
+        entity.parent_reference = parent_references[0]
+
+    entity.depends_on = sorted(set(references.values()))
+    return entity
+
+
+def compile_dataset(schema: Dict[str, Any]) -> List[Entity]:
+    """
+    Validate a dataset schema and order its entities so that every entity comes after the ones it refers to.
+
+    Args:
+        schema (Dict[str, Any]): The dataset schema, with a list of ``entities``.
+
+    Returns:
+        List[Entity]: The entities in generation order.
+
+    Raises:
+        ValueError: If the schema is invalid, refers to unknown entities or has circular references.
+    """
+    definitions = schema.get("entities")
+    if not isinstance(definitions, list) or not definitions:
+        raise ValueError("A dataset schema needs a non-empty list of entities")
+    pooled, locale = bool(schema.get("pooled")), schema.get("locale")
+    entities = [
+        _compile_entity(definition, position, pooled, locale) for position, definition in enumerate(definitions)
+    ]
+
+    by_name = {entity.name: entity for entity in entities}
+    if len(by_name) != len(entities):
+        raise ValueError("Entity names must be unique")
+    for entity in entities:
+        for target in entity.depends_on:
+            if target not in by_name:
+                raise ValueError(f"Entity '{entity.name}': refers to unknown entity '{target}'")
+
+    # Repeatedly take the first listed entity whose references have all been generated
+    ordered: List[Entity] = []
+    done: Set[str] = set()
+    remaining = list(entities)
+    while remaining:
+        ready = next((entity for entity in remaining if set(entity.depends_on) <= done), None)
+        if ready is None:
+            raise ValueError(f"Circular references between entities: {', '.join(entity.name for entity in remaining)}")
+        ordered.append(ready)
+        done.add(ready.name)
+        remaining.remove(ready)
+    return ordered
+
+
+def validate_dataset(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate a dataset schema and bring it into its canonical form.
+
+    Args:
+        schema (Dict[str, Any]): The parsed dataset schema.
+
+    Returns:
+        Dict[str, Any]: The schema with all top-level options set.
+
+    Raises:
+        ValueError: If the schema is invalid.
+    """
+    validated = DatasetInput.model_validate(schema).model_dump()
+    compile_dataset(validated)
+    return validated
+
+
+def expected_records(entities: List[Entity]) -> float:
+    """
+    Return the expected total number of records of a dataset, with average child counts.
+    """
+    totals: Dict[str, float] = {}
+    for entity in entities:
+        totals[entity.name] = entity.expected_records(totals.get(entity.parent or "", 0.0))
+    return sum(totals.values())
+
+
+class DatasetGenerator:
+    """
+    Generates the entities of a relational dataset in one pass, one entity after the other.
+
+    Only the record count of each generated entity is kept. Because primary keys are dense, a
+    reference is drawn from ``1..count`` of its target and is always valid; no parent data has
+    to be kept or scanned. Entities with ``per`` are generated grouped by parent, with a random
+    number of records between ``min`` and ``max`` for every parent record.
+
+    With a seed, the whole dataset is reproducible and does not depend on the batch size.
+    """
+
+    def __init__(
+        self,
+        schema: Dict[str, Any],
+        seed: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        admission: Optional[Callable[[Dict[str, Any]], Admission]] = None,
+    ) -> None:
+        self.entities = compile_dataset(schema)
+        self.seed = seed
+        self.batch_size = batch_size
+        self.admission = admission
+        self.record_counts: Dict[str, int] = {}
+        self._rng = random.Random()
+
+    def __iter__(self) -> Iterator[Tuple[Entity, Generator[ColumnBatch, None, None]]]:
+        """
+        Yield every entity with an iterator over its batches.
+
+        The batches of an entity must be consumed before the next entity is requested, since its
+        references depend on the record counts of the entities before it.
+        """
+        for entity in self.entities:
+            yield entity, self.iter_batches(entity)
+
+    def iter_batches(self, entity: Entity) -> Generator[ColumnBatch, None, None]:
+        """
+        Generate the records of one entity as column batches.
+
+        Args:
+            entity (Entity): An entity whose references have all been generated.
+
+        Yields:
+            ColumnBatch: The records, with primary key and reference columns.
+
+        Raises:
+            ValueError: If the entity refers to an entity without records.
+        """
+        seed = None if self.seed is None else record_seed(self.seed, entity.position)
+        parent_keys: Optional[Iterator[int]] = None
+        if entity.parent is None:
+            total = entity.count or 0
+        else:
+            # The counts are drawn from a seeded stream twice: once for the total, once to assign parents
+            count_seed = seed if seed is not None else self._rng.getrandbits(64)
+            parents = self.record_counts[entity.parent]
+            total = sum(self._child_counts(entity, parents, count_seed))
+            parent_keys = chain.from_iterable(
+                repeat(key, count) for key, count in enumerate(self._child_counts(entity, parents, count_seed), 1)
+            )
+
+        for target in entity.depends_on:
+            if total and not self.record_counts[target]:
+                raise ValueError(f"Entity '{entity.name}': cannot refer to '{target}', which has no records")
+
+        admit = self.admission(entity.schema) if self.admission is not None else None
+        names = tuple(item["name"] for item in entity.output_fields)
+        position = 0
+        batches = iter_record_batches(entity.schema, total, self.batch_size, seed, admit=admit)
+        try:
+            for batch in batches:
+                size = len(batch)
+                values = self._columns(batch)
+                columns: List[Sequence[Any]] = []
+                for name in names:
+                    if name == entity.primary_key:
+                        columns.append(list(range(position + 1, position + size + 1)))
+                    elif name == entity.parent_reference and parent_keys is not None:
+                        columns.append(list(islice(parent_keys, size)))
+                    elif name in entity.references:
+                        columns.append(self._reference_column(entity, name, seed, position, size))
+                    else:
+                        columns.append(values[name])
+                position += size
+                yield ColumnBatch(names, columns, size)
+        finally:
+            batches.close()
+        self.record_counts[entity.name] = total
+
+    def _child_counts(self, entity: Entity, parents: int, count_seed: int) -> Iterator[int]:
+        rng = random.Random(count_seed)
+        population = range(entity.per_min, entity.per_max + 1)
+        for chunk_start in range(0, parents, CHILD_COUNT_CHUNK):
+            yield from rng.choices(population, k=min(CHILD_COUNT_CHUNK, parents - chunk_start))
+
+    def _reference_column(self, entity: Entity, name: str, seed: Optional[int], position: int, size: int) -> List[int]:
+        targets = self.record_counts[entity.references[name]]
+        if seed is None:
+            return self._rng.choices(range(1, targets + 1), k=size)
+        # Seeded references are a hash of the record index, so they do not depend on the batching.
+        # The field seed hashes the whole entity seed, which is wider than 64 bits.
+        digest = hashlib.blake2b(f"{seed}:{name}".encode(), digest_size=8).digest()
+        field_seed = int.from_bytes(digest, "little")
+        return [_mix(field_seed ^ index) % targets + 1 for index in range(position, position + size)]
+
+    @staticmethod
+    def _columns(batch: Sequence[Dict[str, Any]]) -> Dict[str, Sequence[Any]]:
+        if isinstance(batch, ColumnBatch):
+            return dict(zip(batch.names, batch.columns))
+        names = list(batch[0]) if batch else []
+        return {name: [record[name] for record in batch] for name in names}
@@ -0,0 +1,131 @@
+import hashlib
+import importlib.metadata
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from faker_data_generation_service import schema_hash
+
+# Memory budget of the response cache in bytes; 0 disables caching (ETags are still sent)
+RESPONSE_CACHE_SIZE = int(os.environ.get("FAKEIT_RESPONSE_CACHE_SIZE", "0"))
+
+# Largest single response kept in the cache, in bytes
+RESPONSE_CACHE_MAX_ENTRY = int(os.environ.get("FAKEIT_RESPONSE_CACHE_MAX_ENTRY", str(8 * 1024 * 1024)))
+
+# Seeded output depends on the generator code and the Faker release, so both are part of every ETag.
+# Bump the generator version whenever a change alters the records produced for a seed.
+GENERATOR_VERSION = "1"
+_ETAG_PREFIX = f"{GENERATOR_VERSION}:{importlib.metadata.version('faker')}:"
+
+
+class CachedResponse:
+    __slots__ = ("body", "media_type")
+
+    def __init__(self, body: bytes, media_type: str) -> None:
+        self.body = body
+        self.media_type = media_type
+
+
+class ResponseCache:
+    """
+    A least recently used cache of serialized responses, bounded by their total size in bytes.
+
+    Only responses that are a pure function of their key may be stored, i.e. seeded requests.
+    """
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_SIZE, max_entry_bytes: int = RESPONSE_CACHE_MAX_ENTRY) -> None:
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.nbytes = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, body: bytes, media_type: str) -> bool:
+        """
+        Store a serialized response, evicting the least recently used ones to stay in budget.
+
+        Args:
+            key (str): The cache key, see ``response_key``.
+            body (bytes): The serialized response body.
+            media_type (str): The media type of the body.
+
+        Returns:
+            bool: Whether the response was stored; responses above the entry limit are not.
+        """
+        if len(body) > self.max_entry_bytes:
+            return False
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= len(previous.body)
+            self._entries[key] = CachedResponse(body, media_type)
+            self.nbytes += len(body)
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= len(evicted.body)
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+def response_key(endpoint: str, schema: Dict[str, Any], seed: int, **params: Any) -> str:
+    """
+    Build the cache key of a seeded response.
+
+    Args:
+        endpoint (str): The endpoint name.
+        schema (Dict[str, Any]): The schema definition as a dictionary.
+        seed (int): The dataset seed.
+        **params: Everything else that affects the response body, e.g. the record count or format.
+
+    Returns:
+        str: The cache key.
+    """
+    parts = [endpoint, schema_hash(schema), str(seed)]
+    parts.extend(f"{name}={params[name]}" for name in sorted(params))
+    return ":".join(parts)
+
+
+def etag_for(key: str) -> str:
+    return '"' + hashlib.sha256((_ETAG_PREFIX + key).encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag, using the weak comparison required for GET.
+
+    Args:
+        if_none_match (Optional[str]): The header value.
+        etag (str): The current ETag.
+
+    Returns:
+        bool: Whether the client's copy is current.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,377 @@
+import asyncio
+import concurrent.futures
+import heapq
+import os
+import threading
+import time
+from contextlib import AbstractAsyncContextManager, asynccontextmanager, contextmanager
+from functools import partial
+from itertools import count
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from columnar import array_length
+from faker_data_generation_service import POOLED_PROVIDERS
+from generation_engine import GENERATION_WORKERS, Admission
+from metrics import (
+    FIELD_GENERATION_SECONDS,
+    FIELD_VALUES_TIMED,
+    SCHEDULER_BUDGET_IN_USE,
+    SCHEDULER_QUEUE_DEPTH,
+    SCHEDULER_WAIT_SECONDS,
+)
+
+# Admission hook of a stream that waits on the event loop: it is entered with the number of
+# records of the next chunk and holds the budget while the chunk is generated
+AsyncAdmission = Callable[[int], AbstractAsyncContextManager[Any]]
+
+# Estimated seconds of generation work admitted at the same time, per generation worker
+SCHEDULER_BUDGET = float(os.environ.get("FAKEIT_SCHEDULER_BUDGET", "0.1"))
+
+# Maximum number of work items waiting for admission
+SCHEDULER_MAX_QUEUED = int(os.environ.get("FAKEIT_SCHEDULER_MAX_QUEUED", "10000"))
+
+# Share of the budget each priority receives while work of several priorities is waiting
+PRIORITY_WEIGHTS: Dict[str, float] = {"interactive": 8.0, "normal": 2.0, "background": 1.0}
+
+# Estimated seconds per generated value, used until enough values of a type have been timed
+FIELD_COSTS: Dict[str, float] = {
+    "string": 1.5e-6,
+    "integer": 0.2e-6,
+    "float": 0.5e-6,
+    "boolean": 0.2e-6,
+    "choice": 0.2e-6,
+    "date": 0.5e-6,
+    "email": 20e-6,
+    "street": 10e-6,
+    "city": 12e-6,
+    "zipcode": 1.5e-6,
+}
+DEFAULT_FIELD_COST = 5e-6
+POOLED_FIELD_COST = 0.5e-6
+
+# Number of timed values of a field type before the measured cost replaces the default
+MIN_TIMED_VALUES = 1000
+
+# Seconds between checks for cancellation while a job waits for admission
+ADMISSION_POLL_INTERVAL = 0.1
+
+# Idle flows are forgotten once more than this many are tracked
+MAX_IDLE_FLOWS = 1024
+
+
+class SchedulerFullError(Exception):
+    """Raised when work cannot be queued because too much work is already waiting."""
+
+
+def field_cost(field_type: str) -> float:
+    """
+    Return the estimated seconds to generate one value of a field type.
+
+    The cost is measured from the field timings of sampled column batches (see metrics.py) once
+    ``MIN_TIMED_VALUES`` values have been timed, and taken from ``FIELD_COSTS`` until then.
+
+    Args:
+        field_type (str): The field type as labelled in the field timings, e.g. "email" or "pooled_city".
+
+    Returns:
+        float: The estimated cost in seconds.
+    """
+    values = FIELD_VALUES_TIMED.get(type=field_type)
+    if values >= MIN_TIMED_VALUES:
+        return FIELD_GENERATION_SECONDS.get(type=field_type) / values
+    if field_type.startswith("pooled_"):
+        return POOLED_FIELD_COST
+    return FIELD_COSTS.get(field_type, DEFAULT_FIELD_COST)
+
+
+def record_cost(schema: Dict[str, Any]) -> float:
+    """
+    Estimate the seconds it takes to generate one record of a schema.
+
+    Args:
+        schema (Dict[str, Any]): The schema definition as a dictionary.
+
+    Returns:
+        float: The sum of the estimated costs of all fields, including nested ones.
+    """
+    pooled = bool(schema.get("pooled"))
+
+    def fields_cost(fields: List[Dict[str, Any]]) -> float:
+        total = 0.0
+        for field in fields:
+            field_type = field.get("type")
+            if field_type == "object" and field.get("children"):
+                total += fields_cost(field["children"])
+            elif field_type == "array" and isinstance(field.get("items"), dict):
+                low, high = array_length(field)
+                total += (low + high) / 2 * fields_cost([field["items"]])
+            elif pooled and field_type in POOLED_PROVIDERS and not field.get("unique"):
+                total += field_cost(f"pooled_{field_type}")
+            else:
+                total += field_cost(str(field_type))
+        return total
+
+    return fields_cost(schema.get("fields") or [])
+
+
+class Ticket:
+    """A unit of generation work that is waiting for, or holding, part of the scheduler budget."""
+
+    __slots__ = ("cost", "charge", "client", "priority", "start_tag", "finish_tag", "state", "future", "queued_at")
+
+    def __init__(self, cost: float, charge: float, client: str, priority: str) -> None:
+        self.cost = cost
+        self.charge = charge
+        self.client = client
+        self.priority = priority
+        self.start_tag = 0.0
+        self.finish_tag = 0.0
+        self.state = "queued"
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.queued_at = time.perf_counter()
+
+
+class Scheduler:
+    """
+    Admits generation work against a global budget of estimated CPU time.
+
+    Each unit of work, e.g. a single record, a page or one batch of a stream or background job, is
+    charged its estimated cost while it runs. Work that does not fit into the budget waits in a
+    weighted fair queue: every client and priority pair is a flow, and the waiting unit with the
+    lowest virtual finish time is admitted next. A client's share of the budget therefore does not
+    grow with the amount of work it submits, and interactive requests get a larger share than
+    background jobs without starving them.
+
+    Costs are in estimated seconds of generation time, so the time until queued work can start is
+    roughly the admitted and queued cost divided by the number of generation workers.
+    """
+
+    def __init__(
+        self,
+        budget: Optional[float] = None,
+        parallelism: Optional[int] = None,
+        max_queued: int = SCHEDULER_MAX_QUEUED,
+    ) -> None:
+        self.parallelism = parallelism or max(GENERATION_WORKERS, 1)
+        self.budget = budget if budget is not None else SCHEDULER_BUDGET * self.parallelism
+        self.max_queued = max_queued
+        self.in_use = 0.0
+        self._queue: List[Tuple[float, int, Ticket]] = []
+        self._queued = 0
+        self._queued_cost = 0.0
+        self._sequence = count()
+        self._virtual_time = 0.0
+        self._flow_finish: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def queued_count(self) -> int:
+        return self._queued
+
+    def estimated_wait(self) -> float:
+        """
+        Estimate the seconds until newly submitted work would be admitted.
+
+        Returns:
+            float: The admitted and queued cost divided by the number of generation workers.
+        """
+        with self._lock:
+            return (self.in_use + self._queued_cost) / self.parallelism
+
+    def check_capacity(self) -> None:
+        """
+        Raise SchedulerFullError if no more work can be queued.
+        """
+        if self._queued >= self.max_queued:
+            raise SchedulerFullError("Too much generation work is queued. Please try again later.")
+
+    def submit(self, cost: float, client: str, priority: str = "normal") -> Ticket:
+        """
+        Queue a unit of work and admit it right away if the budget allows.
+
+        Args:
+            cost (float): The estimated cost of the work in seconds.
+            client (str): The client the work is done for.
+            priority (str): One of the keys of ``PRIORITY_WEIGHTS``.
+
+        Returns:
+            Ticket: The ticket; its future completes once the work is admitted.
+
+        Raises:
+            SchedulerFullError: If ``max_queued`` units of work are already waiting.
+            ValueError: If the priority is unknown.
+        """
+        if priority not in PRIORITY_WEIGHTS:
+            raise ValueError(f"Unknown priority '{priority}'. Supported priorities: {', '.join(PRIORITY_WEIGHTS)}")
+        # Work larger than the whole budget is charged the budget, so it can run once nothing else does
+        ticket = Ticket(cost, min(cost, self.budget), client, priority)
+        flow = (client, priority)
+        with self._lock:
+            self.check_capacity()
+            ticket.start_tag = max(self._virtual_time, self._flow_finish.get(flow, 0.0))
+            ticket.finish_tag = ticket.start_tag + cost / PRIORITY_WEIGHTS[priority]
+            self._flow_finish[flow] = ticket.finish_tag
+            heapq.heappush(self._queue, (ticket.finish_tag, next(self._sequence), ticket))
+            self._queued += 1
+            self._queued_cost += ticket.charge
+            self._dispatch()
+        return ticket
+
+    def wait(self, ticket: Ticket, cancel_event: Optional[threading.Event] = None) -> bool:
+        """
+        Block until a ticket is admitted.
+
+        Args:
+            ticket (Ticket): The ticket returned by ``submit``.
+            cancel_event (Optional[threading.Event]): Gives up waiting once set.
+
+        Returns:
+            bool: True if the ticket was admitted, False if waiting was cancelled.
+        """
+        timeout = None if cancel_event is None else ADMISSION_POLL_INTERVAL
+        while True:
+            try:
+                ticket.future.result(timeout)
+                return True
+            except concurrent.futures.TimeoutError:
+                if cancel_event is not None and cancel_event.is_set():
+                    self.release(ticket)
+                    return False
+            except concurrent.futures.CancelledError:
+                return False
+
+    def release(self, ticket: Ticket) -> None:
+        """
+        Return the budget held by an admitted ticket, or withdraw a waiting one.
+
+        Args:
+            ticket (Ticket): The ticket returned by ``submit``. Releasing it again has no effect.
+        """
+        with self._lock:
+            if ticket.state == "queued":
+                self._dequeue(ticket)
+                ticket.future.cancel()
+            elif ticket.state == "admitted":
+                ticket.state = "released"
+                self.in_use = max(self.in_use - ticket.charge, 0.0)
+                self._dispatch()
+
+    @contextmanager
+    def admitted(self, cost: float, client: str, priority: str = "normal") -> Iterator[Ticket]:
+        """
+        Hold part of the budget for the duration of a block, waiting for it if needed.
+
+        Args:
+            cost (float): The estimated cost of the work in seconds.
+            client (str): The client the work is done for.
+            priority (str): One of the keys of ``PRIORITY_WEIGHTS``.
+
+        Yields:
+            Ticket: The admitted ticket.
+        """
+        ticket = self.submit(cost, client, priority)
+        try:
+            self.wait(ticket)
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    @asynccontextmanager
+    async def admitted_async(self, cost: float, client: str, priority: str = "normal") -> AsyncIterator[Ticket]:
+        """
+        Same as ``admitted``, but waits without blocking the event loop.
+        """
+        ticket = self.submit(cost, client, priority)
+        try:
+            await asyncio.wrap_future(ticket.future)
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def batch_admission(
+        self,
+        schema: Dict[str, Any],
+        client: str,
+        priority: str = "normal",
+        cancel_event: Optional[threading.Event] = None,
+    ) -> Admission:
+        """
+        Create an admission hook for ``iter_record_batches`` that schedules every batch separately.
+
+        Scheduling batch by batch lets interactive requests run between the batches of a large job.
+
+        Args:
+            schema (Dict[str, Any]): The schema definition as a dictionary.
+            client (str): The client the work is done for.
+            priority (str): One of the keys of ``PRIORITY_WEIGHTS``.
+            cancel_event (Optional[threading.Event]): Stops generation when set while a batch waits.
+
+        Returns:
+            Admission: The hook.
+        """
+        cost_per_record = record_cost(schema)
+
+        def admit(num_records: int) -> Optional[Callable[[], None]]:
+            ticket = self.submit(cost_per_record * num_records, client, priority)
+            if not self.wait(ticket, cancel_event):
+                return None
+            return partial(self.release, ticket)
+
+        return admit
+
+    def async_batch_admission(self, schema: Dict[str, Any], client: str, priority: str = "normal") -> AsyncAdmission:
+        """
+        Create an admission hook for streams that waits for every chunk on the event loop.
+
+        Unlike ``batch_admission``, no worker thread is blocked while a chunk waits, so waiting
+        streams cannot take the threads that admitted work needs to run. A cancelled wait, e.g.
+        when the client disconnects, withdraws the chunk from the queue.
+
+        Args:
+            schema (Dict[str, Any]): The schema definition as a dictionary.
+            client (str): The client the work is done for.
+            priority (str): One of the keys of ``PRIORITY_WEIGHTS``.
+
+        Returns:
+            AsyncAdmission: The hook.
+        """
+        cost_per_record = record_cost(schema)
+        return lambda num_records: self.admitted_async(cost_per_record * num_records, client, priority)
+
+    def _dequeue(self, ticket: Ticket) -> None:
+        # Waiting tickets are removed from the heap lazily by _dispatch
+        ticket.state = "withdrawn"
+        self._queued -= 1
+        self._queued_cost = max(self._queued_cost - ticket.charge, 0.0)
+
+    def _dispatch(self) -> None:
+        # Called with the lock held: admit waiting work in finish tag order while it fits
+        while self._queue:
+            ticket = self._queue[0][2]
+            if ticket.state == "queued" and self.in_use > 0 and self.in_use + ticket.charge > self.budget:
+                break
+            heapq.heappop(self._queue)
+            if ticket.state != "queued":
+                continue
+            self._dequeue(ticket)
+            # The future is cancelled when an awaiting request went away
+            if not ticket.future.set_running_or_notify_cancel():
+                continue
+            ticket.state = "admitted"
+            self.in_use += ticket.charge
+            self._virtual_time = max(self._virtual_time, ticket.start_tag)
+            SCHEDULER_WAIT_SECONDS.observe(time.perf_counter() - ticket.queued_at, priority=ticket.priority)
+            ticket.future.set_result(None)
+
+        if not self._queue:
+            self._flow_finish.clear()
+        elif len(self._flow_finish) > MAX_IDLE_FLOWS:
+            # A flow whose last finish tag is behind the virtual time starts from the virtual time anyway
+            self._flow_finish = {
+                flow: finish for flow, finish in self._flow_finish.items() if finish > self._virtual_time
+            }
+
+
+# Generation work of this worker process
+scheduler = Scheduler()
+SCHEDULER_BUDGET_IN_USE.set_function(lambda: scheduler.in_use)
+SCHEDULER_QUEUE_DEPTH.set_function(scheduler.queued_count)
@@ -0,0 +1,143 @@
+import json
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict
+
+from faker_data_generation_service import get_compiled_schema, schema_hash
+from models.models import Field, SchemaInput
+
+# Directory registered schemas are stored in; workers sharing it can use each other's schemas
+SCHEMA_DIR = os.environ.get("FAKEIT_SCHEMA_DIR", "schemas")
+
+# Number of registered schemas kept parsed in memory per worker
+SCHEMA_REGISTRY_SIZE = int(os.environ.get("FAKEIT_SCHEMA_REGISTRY_SIZE", "256"))
+
+_SCHEMA_ID = re.compile(r"^[0-9a-f]{64}$")
+
+
+class SchemaNotFoundError(Exception):
+    """Raised when no schema is registered under an ID."""
+
+
+class RegisteredSchema(dict):
+    """
+    A validated schema from the registry.
+
+    It carries its content hash as ``schema_id``, so plan and response caches can use it
+    without serializing the schema again. Registered schemas must not be modified.
+    """
+
+    def __init__(self, schema: Dict[str, Any], schema_id: str) -> None:
+        super().__init__(schema)
+        self.schema_id = schema_id
+
+
+def validate_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate a schema and bring it into its canonical form.
+
+    Args:
+        schema (Dict[str, Any]): The parsed schema.
+
+    Returns:
+        Dict[str, Any]: The schema with all top-level options set.
+
+    Raises:
+        ValueError: If the schema or one of its fields is invalid.
+    """
+    validated = SchemaInput.model_validate(schema).model_dump()
+    for field in validated["fields"]:
+        Field.model_validate(field)
+    return validated
+
+
+class SchemaRegistry:
+    """
+    Stores validated schemas under the hash of their contents.
+
+    Registering the same schema twice returns the same ID. Schemas are written to ``directory`` as
+    canonical JSON and kept parsed in a bounded LRU cache; their compiled plans live in the plan
+    cache under the same hash, so generating from a registered schema skips parsing, validation,
+    hashing and compilation.
+    """
+
+    def __init__(self, directory: str = SCHEMA_DIR, max_size: int = SCHEMA_REGISTRY_SIZE) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self._schemas: "OrderedDict[str, RegisteredSchema]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, schema: Dict[str, Any]) -> RegisteredSchema:
+        """
+        Validate, compile and store a schema.
+
+        Args:
+            schema (Dict[str, Any]): The parsed schema.
+
+        Returns:
+            RegisteredSchema: The registered schema; its ``schema_id`` is the content hash.
+
+        Raises:
+            ValueError: If the schema is invalid or cannot be compiled.
+        """
+        validated = validate_schema(schema)
+        registered = RegisteredSchema(validated, schema_hash(validated))
+        # Compiling reports invalid field options now and leaves the plan in the plan cache
+        get_compiled_schema(registered)
+
+        path = self._path(registered.schema_id)
+        if not os.path.exists(path):
+            os.makedirs(self.directory, exist_ok=True)
+            partial_file = f"{path}.{uuid.uuid4().hex}.part"
+            with open(partial_file, "w", encoding="utf-8") as f:
+                json.dump(validated, f, sort_keys=True, separators=(",", ":"))
+            os.replace(partial_file, path)
+        self._remember(registered)
+        return registered
+
+    def get(self, schema_id: str) -> RegisteredSchema:
+        """
+        Return a registered schema.
+
+        Args:
+            schema_id (str): The ID returned when the schema was registered.
+
+        Returns:
+            RegisteredSchema: The schema.
+
+        Raises:
+            SchemaNotFoundError: If no schema is registered under the ID.
+        """
+        with self._lock:
+            registered = self._schemas.get(schema_id)
+            if registered is not None:
+                self._schemas.move_to_end(schema_id)
+                return registered
+
+        if not _SCHEMA_ID.match(schema_id) or not os.path.exists(self._path(schema_id)):
+            raise SchemaNotFoundError(f"Schema '{schema_id}' not found")
+        with open(self._path(schema_id), "r", encoding="utf-8") as f:
+            registered = RegisteredSchema(json.load(f), schema_id)
+        self._remember(registered)
+        return registered
+
+    def clear(self) -> None:
+        with self._lock:
+            self._schemas.clear()
+
+    def _path(self, schema_id: str) -> str:
+        return os.path.join(self.directory, f"{schema_id}.json")
+
+    def _remember(self, registered: RegisteredSchema) -> None:
+        with self._lock:
+            self._schemas[registered.schema_id] = registered
+            self._schemas.move_to_end(registered.schema_id)
+            while len(self._schemas) > self.max_size:
+                self._schemas.popitem(last=False)
+
+
+# Registered schemas of this worker process
+schema_registry = SchemaRegistry()
@@ -0,0 +1,434 @@
+import csv
+import datetime
+import importlib
+import io
+import json
+import math
+from abc import ABC, abstractmethod
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Type
+
+from columnar import ColumnBatch
+from faker_data_generation_service import ArrayStream, streams_arrays
+
+
+def _import_optional(module: str, format_name: str, package: str) -> ModuleType:
+    # Optional dependencies are imported on first use to keep startup fast
+    try:
+        return importlib.import_module(module)
+    except ImportError as error:
+        raise ValueError(f"The '{format_name}' format requires the {package} package to be installed.") from error
+
+
+# Helper function to serialize data for JSON
+class EnhancedJSONEncoder(json.JSONEncoder):
+    def default(self, o: Any) -> Any:
+        if isinstance(o, (datetime.date, datetime.datetime)):
+            return o.isoformat()
+        if isinstance(o, ArrayStream):
+            return list(o)
+        return super().default(o)
+
+
+def iter_json(value: Any) -> Iterator[str]:
+    """
+    Encode a value as JSON piece by piece.
+
+    Streamed arrays are encoded item by item while they are generated, so their items never
+    exist as one list.
+
+    Args:
+        value (Any): The value, typically a record.
+
+    Yields:
+        str: Consecutive pieces of the JSON document.
+    """
+    # Same separators as json.dumps, so both encoders produce the same documents
+    if isinstance(value, dict):
+        separator = "{"
+        for key, item in value.items():
+            yield separator + json.dumps(str(key)) + ": "
+            yield from iter_json(item)
+            separator = ", "
+        yield "}" if separator == ", " else "{}"
+    elif isinstance(value, ArrayStream) and not value.streams_items():
+        # Items without streamed arrays of their own are encoded a chunk at a time
+        separator = "["
+        for chunk in value.chunks():
+            yield separator + json.dumps(chunk, cls=EnhancedJSONEncoder)[1:-1]
+            separator = ", "
+        yield "]" if separator == ", " else "[]"
+    elif isinstance(value, (list, ArrayStream)):
+        separator = "["
+        for item in value:
+            yield separator
+            yield from iter_json(item)
+            separator = ", "
+        yield "]" if separator == ", " else "[]"
+    else:
+        yield json.dumps(value, cls=EnhancedJSONEncoder)
+
+
+def materialize(value: Any) -> Any:
+    """
+    Replace the streamed arrays in a value by lists, for formats that cannot encode them incrementally.
+    """
+    if isinstance(value, dict):
+        return {key: materialize(item) for key, item in value.items()}
+    if isinstance(value, (list, ArrayStream)):
+        return [materialize(item) for item in value]
+    return value
+
+
+class FormatWriter(ABC):
+    """
+    Encodes a stream of record batches into one output document.
+
+    ``begin`` and ``end`` return the bytes that open and close the document, and ``write``
+    returns the encoded bytes for a single batch, so the same writer can feed an HTTP stream
+    or a file.
+    """
+
+    def __init__(self, schema: Dict[str, Any]) -> None:
+        self.schema = schema
+
+    def begin(self) -> bytes:
+        return b""
+
+    @abstractmethod
+    def write(self, batch: Sequence[Dict[str, Any]]) -> bytes: ...
+
+    def end(self) -> bytes:
+        return b""
+
+
+def _encode_json(value: Any) -> str:
+    return json.dumps(value, cls=EnhancedJSONEncoder)
+
+
+def _encode_streamed_record(record: Dict[str, Any]) -> str:
+    return "".join(iter_json(record))
+
+
+# Formats one value as JSON text
+ValueFormatter = Callable[[Any], str]
+
+# The C string encoder behind json.dumps with its default ensure_ascii=True
+_encode_string: ValueFormatter = json.encoder.encode_basestring_ascii  # type: ignore[attr-defined]
+
+_BOOLEANS = {True: "true", False: "false"}
+
+
+def _encode_date(value: datetime.date) -> str:
+    return '"' + value.isoformat() + '"'
+
+
+def _float_formatter(field: Dict[str, Any]) -> ValueFormatter:
+    # json.dumps writes finite floats with repr; infinite ranges keep its NaN and Infinity spellings
+    finite = all(math.isfinite(float(field.get(option, 0.0))) for option in ("min", "max"))
+    return float.__repr__ if finite else _encode_json
+
+
+def _choice_formatter(field: Dict[str, Any]) -> ValueFormatter:
+    elements = field.get("elements") or ()
+    try:
+        # Equal elements of different types, such as 1 and True, would share one table entry
+        if len({(type(element), element) for element in elements}) != len(set(elements)):
+            return _encode_json
+    except TypeError:
+        # Unhashable elements such as lists are encoded one by one
+        return _encode_json
+    return {element: _encode_json(element) for element in elements}.__getitem__
+
+
+def _array_formatter(field: Dict[str, Any]) -> ValueFormatter:
+    encode_item = _value_formatter(field.get("items") or {})
+
+    def encode(value: Any) -> str:
+        if not isinstance(value, list):
+            return _encode_json(value)
+        return "[" + ", ".join(map(encode_item, value)) + "]"
+
+    return encode
+
+
+# Each entry receives the field definition and returns a function that formats one value of the
+# field exactly as json.dumps with EnhancedJSONEncoder would. Other field types use json.dumps.
+VALUE_FORMATTERS: Dict[str, Callable[[Dict[str, Any]], ValueFormatter]] = {
+    "string": lambda _: _encode_string,
+    "email": lambda _: _encode_string,
+    "street": lambda _: _encode_string,
+    "city": lambda _: _encode_string,
+    "zipcode": lambda _: _encode_string,
+    "integer": lambda _: int.__repr__,
+    "float": _float_formatter,
+    "boolean": lambda _: _BOOLEANS.__getitem__,
+    "choice": _choice_formatter,
+    "date": lambda _: _encode_date,
+    "object": lambda field: RecordEncoder(field.get("children") or []).encode_record,
+    "array": _array_formatter,
+}
+
+
+def _value_formatter(field: Dict[str, Any]) -> ValueFormatter:
+    factory = VALUE_FORMATTERS.get(field.get("type") or "")
+    return factory(field) if factory is not None else _encode_json
+
+
+class RecordEncoder:
+    """
+    Encodes the records of one schema as JSON, with the same output as ``json.dumps`` and
+    ``EnhancedJSONEncoder``.
+
+    The keys are escaped once into a ``%``-template of the whole record, and every field gets a
+    formatter specialized for its type. Column batches are encoded a column at a time and the
+    fragments of each row are filled into the template, so no record dictionary is built and no
+    value goes through the generic encoder. Records given as dictionaries are encoded the same way.
+    """
+
+    __slots__ = ("names", "template", "formatters", "children")
+
+    def __init__(self, fields: List[Dict[str, Any]]) -> None:
+        self.names = tuple(field.get("name") for field in fields)
+        keys = ", ".join(json.dumps(str(name)).replace("%", "%%") + ": %s" for name in self.names)
+        self.template = "{" + keys + "}"
+        self.formatters = tuple(_value_formatter(field) for field in fields)
+        # Nested objects encode their column batches with their own template
+        self.children = tuple(
+            RecordEncoder(field.get("children") or []) if field.get("type") == "object" else None for field in fields
+        )
+
+    def encode_record(self, record: Dict[str, Any]) -> str:
+        if not isinstance(record, dict) or tuple(record) != self.names:
+            # Records that do not follow the schema are encoded generically
+            return _encode_json(record)
+        return self.template % tuple([encode(value) for encode, value in zip(self.formatters, record.values())])
+
+    def encode_column(self, index: int, column: Sequence[Any]) -> List[str]:
+        child = self.children[index]
+        if child is not None and isinstance(column, ColumnBatch):
+            return child.encode_batch(column)
+        return list(map(self.formatters[index], column))
+
+    def encode_batch(self, batch: Sequence[Dict[str, Any]]) -> List[str]:
+        """
+        Encode every record of a batch.
+
+        Args:
+            batch (Sequence[Dict[str, Any]]): A column batch or a list of records.
+
+        Returns:
+            List[str]: The JSON text of every record.
+        """
+        if not isinstance(batch, ColumnBatch) or batch.names != self.names:
+            return [self.encode_record(record) for record in batch]
+        if not self.names:
+            return ["{}"] * len(batch)
+        template = self.template
+        columns = [self.encode_column(index, column) for index, column in enumerate(batch.columns)]
+        return [template % row for row in zip(*columns)]
+
+
+def _batch_encoder(schema: Dict[str, Any]) -> Callable[[Sequence[Dict[str, Any]]], Iterable[str]]:
+    fields = schema.get("fields") or []
+    if streams_arrays(fields):
+        # Streamed arrays are encoded while they are generated, one record at a time
+        return lambda batch: map(_encode_streamed_record, batch)
+    return RecordEncoder(fields).encode_batch
+
+
+class JSONWriter(FormatWriter):
+    """Writes a single JSON array; chunks are pieces of that array."""
+
+    def __init__(self, schema: Dict[str, Any]) -> None:
+        super().__init__(schema)
+        self._first = True
+        self._encode_batch = _batch_encoder(schema)
+
+    def begin(self) -> bytes:
+        return b"["
+
+    def write(self, batch: Sequence[Dict[str, Any]]) -> bytes:
+        if not batch:
+            return b""
+        encoded = ",".join(self._encode_batch(batch))
+        # Only the first chunk omits the leading separator
+        separator = "" if self._first else ","
+        self._first = False
+        return (separator + encoded).encode("utf-8")
+
+    def end(self) -> bytes:
+        return b"]"
+
+
+class NDJSONWriter(FormatWriter):
+    """Writes one JSON document per line."""
+
+    def __init__(self, schema: Dict[str, Any]) -> None:
+        super().__init__(schema)
+        self._encode_batch = _batch_encoder(schema)
+
+    def write(self, batch: Sequence[Dict[str, Any]]) -> bytes:
+        if not batch:
+            return b""
+        return ("\n".join(self._encode_batch(batch)) + "\n").encode("utf-8")
+
+
+class CSVWriter(FormatWriter):
+    """Writes a header row followed by one row per record. Only flat schemas are supported."""
+
+    def __init__(self, schema: Dict[str, Any]) -> None:
+        super().__init__(schema)
+        nested = [field.get("name") for field in schema["fields"] if field.get("type") in ("object", "array")]
+        if nested:
+            raise ValueError(f"CSV output requires a flat schema; nested fields: {', '.join(nested)}")
+        self.names = [field.get("name") for field in schema["fields"]]
+
+    def _encode_rows(self, rows: Iterable[Iterable[Any]]) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+
+    def begin(self) -> bytes:
+        return self._encode_rows([self.names])
+
+    def write(self, batch: Sequence[Dict[str, Any]]) -> bytes:
+        if isinstance(batch, ColumnBatch):
+            return self._encode_rows(zip(*batch.columns))
+        names = self.names
+        return self._encode_rows([record.get(name) for name in names] for record in batch)
+
+
+def _msgpack_default(o: Any) -> Any:
+    if isinstance(o, (datetime.date, datetime.datetime)):
+        return o.isoformat()
+    if isinstance(o, ArrayStream):
+        return list(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not MessagePack serializable")
+
+
+class MessagePackWriter(FormatWriter):
+    """Writes a stream of concatenated MessagePack maps, one per record."""
+
+    def __init__(self, schema: Dict[str, Any]) -> None:
+        super().__init__(schema)
+        msgpack = _import_optional("msgpack", "msgpack", "msgpack")
+        self._packer = msgpack.Packer(default=_msgpack_default)
+
+    def write(self, batch: Sequence[Dict[str, Any]]) -> bytes:
+        pack = self._packer.pack
+        return b"".join(pack(record) for record in batch)
+
+
+class ArrowWriter(FormatWriter):
+    """
+    Writes an Arrow IPC stream with one record batch per chunk.
+
+    The Arrow schema is inferred from the first batch and used for all following batches.
+    """
+
+    def __init__(self, schema: Dict[str, Any]) -> None:
+        super().__init__(schema)
+        self._pyarrow = _import_optional("pyarrow", "arrow", "pyarrow")
+        self._ipc = _import_optional("pyarrow.ipc", "arrow", "pyarrow")
+        self._sink = io.BytesIO()
+        self._writer: Optional[Any] = None
+        self._arrow_schema: Optional[Any] = None
+        self._streams_arrays = streams_arrays(schema.get("fields") or [])
+
+    def _drain(self) -> bytes:
+        data = self._sink.getvalue()
+        self._sink.seek(0)
+        self._sink.truncate()
+        return data
+
+    def _record_batch(self, batch: Sequence[Dict[str, Any]]) -> Any:
+        arrow_schema = self._arrow_schema
+        if self._streams_arrays:
+            return self._pyarrow.RecordBatch.from_pylist([materialize(record) for record in batch], schema=arrow_schema)
+        if isinstance(batch, ColumnBatch):
+            # Flat columns are converted directly without building the records
+            columns = {
+                name: list(column) if isinstance(column, ColumnBatch) else column
+                for name, column in zip(batch.names, batch.columns)
+            }
+            return self._pyarrow.RecordBatch.from_pydict(columns, schema=arrow_schema)
+        return self._pyarrow.RecordBatch.from_pylist(list(batch), schema=arrow_schema)
+
+    def write(self, batch: Sequence[Dict[str, Any]]) -> bytes:
+        if not batch:
+            return b""
+        record_batch = self._record_batch(batch)
+        if self._writer is None:
+            self._arrow_schema = record_batch.schema
+            self._writer = self._ipc.new_stream(self._sink, record_batch.schema)
+        self._writer.write_batch(record_batch)
+        return self._drain()
+
+    def end(self) -> bytes:
+        if self._writer is None:
+            return b""
+        self._writer.close()
+        return self._drain()
+
+
+class OutputFormat:
+    def __init__(self, name: str, media_types: List[str], extension: str, writer: Type[FormatWriter]) -> None:
+        self.name = name
+        self.media_types = media_types
+        self.extension = extension
+        self.writer = writer
+
+    @property
+    def media_type(self) -> str:
+        return self.media_types[0]
+
+
+# Output formats available to the streaming endpoints and background jobs, by name
+OUTPUT_FORMATS: Dict[str, OutputFormat] = {}
+
+
+def register_output_format(output_format: OutputFormat) -> None:
+    """
+    Register an output format so it can be selected by name or media type.
+
+    Args:
+        output_format (OutputFormat): The output format to register.
+    """
+    OUTPUT_FORMATS[output_format.name] = output_format
+
+
+register_output_format(OutputFormat("json", ["application/json"], "json", JSONWriter))
+register_output_format(OutputFormat("ndjson", ["application/x-ndjson", "application/jsonl"], "ndjson", NDJSONWriter))
+register_output_format(OutputFormat("csv", ["text/csv"], "csv", CSVWriter))
+register_output_format(
+    OutputFormat("msgpack", ["application/x-msgpack", "application/msgpack"], "msgpack", MessagePackWriter)
+)
+register_output_format(OutputFormat("arrow", ["application/vnd.apache.arrow.stream"], "arrow", ArrowWriter))
+
+
+def get_output_format(name: Optional[str] = None, accept: Optional[str] = None) -> OutputFormat:
+    """
+    Select an output format by name, falling back to the Accept header and then to JSON.
+
+    Args:
+        name (Optional[str]): The format name, e.g. from a query parameter.
+        accept (Optional[str]): The value of the Accept header.
+
+    Returns:
+        OutputFormat: The selected output format.
+
+    Raises:
+        ValueError: If the named format does not exist.
+    """
+    if name is not None:
+        if name not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported format '{name}'. Use one of: {', '.join(OUTPUT_FORMATS)}.")
+        return OUTPUT_FORMATS[name]
+    if accept:
+        for media_type in accept.split(","):
+            media_type = media_type.split(";")[0].strip()
+            for output_format in OUTPUT_FORMATS.values():
+                if media_type in output_format.media_types:
+                    return output_format
+    return OUTPUT_FORMATS["json"]
@@ -0,0 +1,489 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from itertools import count
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple, TypeVar
+
+from starlette.concurrency import run_in_threadpool
+
+# State backend shared by the workers on a host: "memory" (single worker) or "sqlite"
+STATE_BACKEND = os.environ.get("FAKEIT_STATE_BACKEND", "memory")
+
+# Database file of the SQLite backend; every worker on the host must use the same path
+STATE_PATH = os.environ.get("FAKEIT_STATE_PATH", "fakeit_state.db")
+
+# Seconds finished job statuses are kept
+JOB_STATUS_TTL = float(os.environ.get("FAKEIT_JOB_STATUS_TTL", "86400"))
+
+# Seconds a SQLite operation waits for another worker's write to finish
+SQLITE_TIMEOUT = 5.0
+
+# Rate limit buckets untouched for this many seconds are full again and can be dropped
+_BUCKET_IDLE_SECONDS = 86400
+
+# Prune idle buckets once every this many rate limit checks per process
+_BUCKET_PRUNE_INTERVAL = 10000
+
+PENDING_STATUSES = ("queued", "in_progress")
+
+T = TypeVar("T")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_started(pid: int) -> Optional[str]:
+    # The boot ID and the start time in clock ticks since boot identify a process even after its
+    # PID is reused. Only available on Linux; None elsewhere or if the process is gone.
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as boot_id, open(f"/proc/{pid}/stat") as stat:
+            # Fields after the parenthesised command name start at field 3; the start time is field 22
+            return f"{boot_id.read().strip()}:{stat.read().rsplit(')', 1)[1].split()[19]}"
+    except (OSError, IndexError):
+        return None
+
+
+_owners: Dict[int, Optional[str]] = {}
+
+
+def _current_owner() -> Tuple[int, Optional[str]]:
+    pid = os.getpid()
+    if pid not in _owners:
+        _owners[pid] = _process_started(pid)
+    return pid, _owners[pid]
+
+
+def _owner_alive(pid: int, started: Optional[str]) -> bool:
+    # Backends are shared by the workers of one host, so owners can be checked by process ID.
+    # The start time tells a reused PID apart from the owner; without one only the PID is checked.
+    if not _pid_alive(pid):
+        return False
+    current = _current_owner()[1] if pid == os.getpid() else _process_started(pid)
+    return started is None or current is None or current == started
+
+
+def _job_view(state: Dict[str, Any], status: str, owner_pid: int, owner_started: Optional[str]) -> Dict[str, Any]:
+    state = dict(state, status=status)
+    if status in PENDING_STATUSES and not _owner_alive(owner_pid, owner_started):
+        state.update(status="failed", error="The worker running the job exited.")
+    return state
+
+
+def _refill(tokens: float, updated_at: float, now: float, capacity: int, refill_rate: float) -> float:
+    return min(float(capacity), tokens + (now - updated_at) * refill_rate)
+
+
+class StateBackend(ABC):
+    """
+    State shared by all workers: job statuses, job slots and rate limit buckets.
+
+    Every operation is atomic across the workers using the backend. Jobs and slots record the
+    process that owns them and when it started, so entries left behind by a worker that exited
+    are ignored even once its process ID is reused.
+    Finished jobs are dropped ``JOB_STATUS_TTL`` seconds after their last update.
+    """
+
+    # Whether operations can block on I/O or on other processes, so callers on the event loop
+    # should run them in a worker thread
+    blocking = False
+
+    async def call(self, function: Callable[..., T], *args: Any) -> T:
+        """
+        Call a function that uses the backend from the event loop.
+
+        Args:
+            function (Callable[..., T]): The function, e.g. a backend operation or a JobManager method.
+            *args (Any): Its arguments.
+
+        Returns:
+            T: Its result. Functions of a blocking backend run in a worker thread.
+        """
+        if self.blocking:
+            return await run_in_threadpool(function, *args)
+        return function(*args)
+
+    @abstractmethod
+    def add_job(self, task_id: str, state: Dict[str, Any], max_pending: int) -> bool:
+        """
+        Add a job unless ``max_pending`` jobs are already queued or running.
+
+        Args:
+            task_id (str): The job identifier.
+            state (Dict[str, Any]): The job status as returned by the status endpoint.
+            max_pending (int): The maximum number of queued and running jobs.
+
+        Returns:
+            bool: Whether the job was added.
+        """
+
+    @abstractmethod
+    def put_job(self, task_id: str, state: Dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    def get_job(self, task_id: str) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def count_jobs(self, statuses: Iterable[str]) -> int: ...
+
+    @abstractmethod
+    def request_cancel(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Flag a job for cancellation. Queued jobs are marked as cancelled right away.
+
+        Args:
+            task_id (str): The job identifier.
+
+        Returns:
+            Optional[Dict[str, Any]]: The job status, or None if the job does not exist.
+        """
+
+    @abstractmethod
+    def is_cancel_requested(self, task_id: str) -> bool: ...
+
+    @abstractmethod
+    def acquire_slot(self, name: str, holder: str, limit: int) -> bool:
+        """
+        Take one of ``limit`` slots of a global concurrency limit.
+
+        Args:
+            name (str): The name of the limit.
+            holder (str): A unique identifier of the holder, e.g. a job ID.
+            limit (int): The number of slots.
+
+        Returns:
+            bool: Whether a slot was taken.
+        """
+
+    @abstractmethod
+    def release_slot(self, name: str, holder: str) -> None: ...
+
+    @abstractmethod
+    def count_slots(self, name: str) -> int: ...
+
+    @abstractmethod
+    def consume_token(self, key: str, capacity: int, refill_rate: float) -> float:
+        """
+        Take a token from a token bucket.
+
+        Args:
+            key (str): The bucket, e.g. a route and client address.
+            capacity (int): The maximum number of tokens; new buckets start full.
+            refill_rate (float): Tokens added per second.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds until one is available.
+        """
+
+    @abstractmethod
+    def reset_rate_limits(self) -> None: ...
+
+
+class MemoryStateBackend(StateBackend):
+    """Keeps the state in the current process. Only suitable for a single worker."""
+
+    def __init__(self) -> None:
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._slots: Dict[str, Dict[str, Tuple[int, Optional[str]]]] = {}
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def add_job(self, task_id: str, state: Dict[str, Any], max_pending: int) -> bool:
+        now = time.time()
+        with self._lock:
+            expired = [
+                other
+                for other, entry in self._jobs.items()
+                if entry["updated_at"] < now - JOB_STATUS_TTL and entry["state"]["status"] not in PENDING_STATUSES
+            ]
+            for other in expired:
+                del self._jobs[other]
+            if self._count_jobs(PENDING_STATUSES) >= max_pending:
+                return False
+            self._jobs[task_id] = {"state": state, "owner": _current_owner(), "cancel": False, "updated_at": now}
+            return True
+
+    def put_job(self, task_id: str, state: Dict[str, Any]) -> None:
+        with self._lock:
+            entry = self._jobs.setdefault(task_id, {"cancel": False})
+            entry.update(state=state, owner=_current_owner(), updated_at=time.time())
+
+    def get_job(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._jobs.get(task_id)
+            if entry is None:
+                return None
+            return _job_view(entry["state"], entry["state"]["status"], *entry["owner"])
+
+    def _count_jobs(self, statuses: Iterable[str]) -> int:
+        statuses = tuple(statuses)
+        return sum(
+            1 for entry in self._jobs.values() if entry["state"]["status"] in statuses and _owner_alive(*entry["owner"])
+        )
+
+    def count_jobs(self, statuses: Iterable[str]) -> int:
+        with self._lock:
+            return self._count_jobs(statuses)
+
+    def request_cancel(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._jobs.get(task_id)
+            if entry is None:
+                return None
+            status = entry["state"]["status"]
+            if status in PENDING_STATUSES:
+                entry["cancel"] = True
+                if status == "queued":
+                    entry["state"] = dict(entry["state"], status="cancelled")
+            return _job_view(entry["state"], entry["state"]["status"], *entry["owner"])
+
+    def is_cancel_requested(self, task_id: str) -> bool:
+        with self._lock:
+            entry = self._jobs.get(task_id)
+            return bool(entry and entry["cancel"])
+
+    def acquire_slot(self, name: str, holder: str, limit: int) -> bool:
+        with self._lock:
+            holders = self._slots.setdefault(name, {})
+            for other, owner in list(holders.items()):
+                if not _owner_alive(*owner):
+                    del holders[other]
+            if holder not in holders and len(holders) >= limit:
+                return False
+            holders[holder] = _current_owner()
+            return True
+
+    def release_slot(self, name: str, holder: str) -> None:
+        with self._lock:
+            self._slots.get(name, {}).pop(holder, None)
+
+    def count_slots(self, name: str) -> int:
+        with self._lock:
+            return len(self._slots.get(name, {}))
+
+    def consume_token(self, key: str, capacity: int, refill_rate: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (float(capacity), now))
+            tokens = _refill(tokens, updated_at, now, capacity, refill_rate)
+            if tokens < 1.0:
+                self._buckets[key] = (tokens, now)
+                return (1.0 - tokens) / refill_rate
+            self._buckets[key] = (tokens - 1.0, now)
+            return 0.0
+
+    def reset_rate_limits(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    Keeps the state in a SQLite database in WAL mode, shared by all workers on a host.
+
+    Every operation is a single short transaction. Writes take the database lock up front with
+    ``BEGIN IMMEDIATE``, so read-modify-write operations such as taking a token are atomic.
+    """
+
+    # Operations wait up to SQLITE_TIMEOUT seconds for other workers' writes
+    blocking = True
+
+    def __init__(self, path: str = STATE_PATH) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._checks = count()
+        # executescript commits on its own; every statement is idempotent
+        self._connection().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                task_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                owner_pid INTEGER NOT NULL,
+                owner_started TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                state TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+            CREATE TABLE IF NOT EXISTS slots (
+                name TEXT NOT NULL,
+                holder TEXT NOT NULL,
+                owner_pid INTEGER NOT NULL,
+                owner_started TEXT,
+                PRIMARY KEY (name, holder)
+            );
+            CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            """
+        )
+        # Databases created before owner start times were recorded
+        for table in ("jobs", "slots"):
+            columns = {row[1] for row in self._connection().execute(f"PRAGMA table_info({table})")}
+            if "owner_started" not in columns:
+                self._connection().execute(f"ALTER TABLE {table} ADD COLUMN owner_started TEXT")
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections are per thread and cannot be shared with forked processes
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    @staticmethod
+    def _count_jobs(connection: sqlite3.Connection, statuses: Iterable[str]) -> int:
+        statuses = tuple(statuses)
+        rows = connection.execute(
+            f"SELECT owner_pid, owner_started, COUNT(*) FROM jobs WHERE status IN ({','.join('?' * len(statuses))}) "
+            "GROUP BY owner_pid, owner_started",
+            statuses,
+        )
+        return sum(jobs for pid, started, jobs in rows if _owner_alive(pid, started))
+
+    def add_job(self, task_id: str, state: Dict[str, Any], max_pending: int) -> bool:
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                "DELETE FROM jobs WHERE updated_at < ? AND status NOT IN (?, ?)",
+                (now - JOB_STATUS_TTL, *PENDING_STATUSES),
+            )
+            if self._count_jobs(connection, PENDING_STATUSES) >= max_pending:
+                return False
+            connection.execute(
+                "INSERT INTO jobs (task_id, status, owner_pid, owner_started, updated_at, state) VALUES (?, ?, ?, ?, ?, ?)",
+                (task_id, state["status"], *_current_owner(), now, json.dumps(state)),
+            )
+        return True
+
+    def put_job(self, task_id: str, state: Dict[str, Any]) -> None:
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO jobs (task_id, status, owner_pid, owner_started, updated_at, state) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (task_id) DO UPDATE SET status = excluded.status, owner_pid = excluded.owner_pid, "
+                "owner_started = excluded.owner_started, updated_at = excluded.updated_at, state = excluded.state",
+                (task_id, state["status"], *_current_owner(), time.time(), json.dumps(state)),
+            )
+
+    def get_job(self, task_id: str) -> Optional[Dict[str, Any]]:
+        row = (
+            self._connection()
+            .execute("SELECT state, status, owner_pid, owner_started FROM jobs WHERE task_id = ?", (task_id,))
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return _job_view(json.loads(row[0]), row[1], row[2], row[3])
+
+    def count_jobs(self, statuses: Iterable[str]) -> int:
+        return self._count_jobs(self._connection(), statuses)
+
+    def request_cancel(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET cancel_requested = 1, "
+                "status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END "
+                "WHERE task_id = ? AND status IN (?, ?)",
+                (task_id, *PENDING_STATUSES),
+            )
+        return self.get_job(task_id)
+
+    def is_cancel_requested(self, task_id: str) -> bool:
+        row = self._connection().execute("SELECT cancel_requested FROM jobs WHERE task_id = ?", (task_id,)).fetchone()
+        return bool(row and row[0])
+
+    def acquire_slot(self, name: str, holder: str, limit: int) -> bool:
+        with self._transaction() as connection:
+            holders = connection.execute(
+                "SELECT holder, owner_pid, owner_started FROM slots WHERE name = ?", (name,)
+            ).fetchall()
+            dead = [(name, other) for other, pid, started in holders if not _owner_alive(pid, started)]
+            connection.executemany("DELETE FROM slots WHERE name = ? AND holder = ?", dead)
+            if holder not in {other for other, _, _ in holders} and len(holders) - len(dead) >= limit:
+                return False
+            connection.execute(
+                "INSERT OR REPLACE INTO slots (name, holder, owner_pid, owner_started) VALUES (?, ?, ?, ?)",
+                (name, holder, *_current_owner()),
+            )
+        return True
+
+    def release_slot(self, name: str, holder: str) -> None:
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM slots WHERE name = ? AND holder = ?", (name, holder))
+
+    def count_slots(self, name: str) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM slots WHERE name = ?", (name,)).fetchone()[0]
+
+    def consume_token(self, key: str, capacity: int, refill_rate: float) -> float:
+        # Wall-clock time, because monotonic clocks are not comparable between processes
+        now = time.time()
+        with self._transaction() as connection:
+            if next(self._checks) % _BUCKET_PRUNE_INTERVAL == 0:
+                connection.execute("DELETE FROM buckets WHERE updated_at < ?", (now - _BUCKET_IDLE_SECONDS,))
+            row = connection.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = float(capacity) if row is None else _refill(row[0], row[1], now, capacity, refill_rate)
+            wait = 0.0 if tokens >= 1.0 else (1.0 - tokens) / refill_rate
+            connection.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                (key, tokens - 1.0 if wait == 0.0 else tokens, now),
+            )
+        return wait
+
+    def reset_rate_limits(self) -> None:
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM buckets")
+
+
+# State backends by name, selected with FAKEIT_STATE_BACKEND
+STATE_BACKENDS: Dict[str, Callable[[], StateBackend]] = {
+    "memory": MemoryStateBackend,
+    "sqlite": SQLiteStateBackend,
+}
+
+_state_backend: Optional[StateBackend] = None
+_state_backend_lock = threading.Lock()
+
+
+def get_state_backend() -> StateBackend:
+    """
+    Return the configured state backend, creating it on first use.
+
+    Returns:
+        StateBackend: The backend shared by this process.
+
+    Raises:
+        ValueError: If ``FAKEIT_STATE_BACKEND`` names an unknown backend.
+    """
+    global _state_backend
+    with _state_backend_lock:
+        if _state_backend is None:
+            if STATE_BACKEND not in STATE_BACKENDS:
+                raise ValueError(f"Unknown state backend '{STATE_BACKEND}'. Use one of: {', '.join(STATE_BACKENDS)}.")
+            _state_backend = STATE_BACKENDS[STATE_BACKEND]()
+        return _state_backend
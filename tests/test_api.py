@@ -0,0 +1,69 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import generation_engine
+
+SCHEMA = {"fields": [{"name": "name", "type": "string"}, {"name": "email", "type": "email"}]}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(generation_engine, "GENERATION_WORKERS", 1)
+    api.limiter.reset()
+    with TestClient(api.app) as test_client:
+        yield test_client
+
+
+def test_generate_batch_streams_valid_json_array(client):
+    response = client.post("/generate-batch", params={"num_records": 25, "chunk_size": 10}, json=SCHEMA)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    data = json.loads(response.text)
+    assert len(data) == 25
+    assert all(set(record) == {"name", "email"} for record in data)
+
+
+def test_generate_batch_streams_ndjson(client):
+    response = client.post(
+        "/generate-batch",
+        params={"num_records": 25, "chunk_size": 10},
+        json=SCHEMA,
+        headers={"Accept": "application/x-ndjson"},
+    )
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert len(lines) == 25
+    assert all(set(json.loads(line)) == {"name", "email"} for line in lines)
+
+
+def test_generate_batch_streams_csv(client):
+    response = client.post("/generate-batch", params={"num_records": 5, "format": "csv"}, json=SCHEMA)
+
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines()[0] == "name,email"
+    assert len(response.text.splitlines()) == 6
+
+
+def test_generate_batch_rejects_unsupported_format(client):
+    response = client.post("/generate-batch", params={"num_records": 5, "format": "xml"}, json=SCHEMA)
+
+    assert response.status_code == 400
+
+
+def test_generate_paginated_returns_the_requested_page(client):
+    response = client.request("GET", "/generate-paginated", params={"page": 3, "page_size": 4, "seed": 1}, json=SCHEMA)
+
+    assert response.status_code == 200
+    assert response.json()["page"] == 3
+    assert len(response.json()["data"]) == 4
+
+
+def test_generate_paginated_rejects_pages_above_the_size_limit(client):
+    response = client.request("GET", "/generate-paginated", params={"page_size": api.MAX_PAGE_SIZE + 1}, json=SCHEMA)
+
+    assert response.status_code == 422
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+import benchmarks.__main__ as cli
+import generation_engine
+from benchmarks.suite import bench_replay, compare_to_baseline, load_traffic, machine_id, metric, percentile
+
+BASELINE = {
+    "metrics": {
+        "generator.string.records_per_second": metric(1000, "records/s", "higher"),
+        "endpoint.generate-batch.p99_ms": metric(100, "ms", "lower"),
+    }
+}
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) == 0.0
+
+
+def test_compare_to_baseline_reports_regressions_in_both_directions():
+    results = {
+        "generator.string.records_per_second": metric(600, "records/s", "higher"),
+        "endpoint.generate-batch.p99_ms": metric(150, "ms", "lower"),
+        "generator.new.records_per_second": metric(1, "records/s", "higher"),
+    }
+
+    regressions = compare_to_baseline(results, BASELINE, tolerance=0.3)
+
+    assert len(regressions) == 2
+    assert regressions[0].startswith("generator.string.records_per_second")
+    assert regressions[1].startswith("endpoint.generate-batch.p99_ms")
+
+
+def test_compare_to_baseline_allows_changes_within_tolerance():
+    results = {
+        "generator.string.records_per_second": metric(800, "records/s", "higher"),
+        "endpoint.generate-batch.p99_ms": metric(120, "ms", "lower"),
+    }
+
+    assert compare_to_baseline(results, BASELINE, tolerance=0.3) == []
+
+
+def test_compare_to_baseline_honours_per_metric_tolerance():
+    baseline = {"metrics": {"replay.p99_ms": {**metric(100, "ms", "lower"), "tolerance": 1.0}}}
+
+    assert compare_to_baseline({"replay.p99_ms": metric(190, "ms", "lower")}, baseline, tolerance=0.1) == []
+
+
+def test_load_traffic_expands_repeats(tmp_path):
+    traffic = tmp_path / "traffic.jsonl"
+    traffic.write_text(
+        json.dumps({"path": "/task-status/a", "repeat": 3}) + "\n\n" + json.dumps({"path": "/task-status/b"}) + "\n"
+    )
+
+    assert [request["path"] for request in load_traffic(str(traffic))] == ["/task-status/a"] * 3 + ["/task-status/b"]
+
+
+def test_load_traffic_rejects_requests_without_path(tmp_path):
+    traffic = tmp_path / "traffic.jsonl"
+    traffic.write_text(json.dumps({"method": "GET"}) + "\n")
+
+    with pytest.raises(ValueError, match="traffic.jsonl:1"):
+        load_traffic(str(traffic))
+
+
+def test_bench_replay_measures_every_request(tmp_path, monkeypatch):
+    monkeypatch.setattr(generation_engine, "GENERATION_WORKERS", 1)
+    traffic = tmp_path / "traffic.jsonl"
+    schema = {"fields": [{"name": "id", "type": "integer"}]}
+    requests = [
+        {"method": "POST", "path": "/generate-batch", "params": {"num_records": 5}, "json": schema},
+        {"path": "/task-status/unknown", "repeat": 4},
+    ]
+    traffic.write_text("".join(json.dumps(request) + "\n" for request in requests))
+
+    results = bench_replay(str(traffic), concurrency=2)
+
+    assert results["replay.errors"]["value"] == 0
+    assert results["replay.requests_per_second"]["value"] > 0
+    assert results["replay.p50_ms"]["value"] <= results["replay.p99_ms"]["value"]
+
+
+def test_machine_id_is_a_safe_file_name(monkeypatch):
+    monkeypatch.setenv("FAKEIT_BENCHMARK_MACHINE", "ci runner/1")
+
+    assert machine_id().startswith("ci-runner-1-")
+    assert "/" not in machine_id() and " " not in machine_id()
+
+
+def test_baselines_of_other_machines_are_not_compared(monkeypatch, tmp_path):
+    monkeypatch.setitem(cli.BENCHMARKS, "fake", lambda args: {"fake.p99_ms": metric(1000, "ms", "lower")})
+    baseline = tmp_path / "baselines" / "machine.json"
+    argv = ["fake", "--baseline", str(baseline)]
+
+    assert cli.main(argv + ["--save-baseline"]) == 0
+    assert json.loads(baseline.read_text())["machine"] == machine_id()
+    baseline.write_text(json.dumps({"machine": machine_id(), "metrics": {"fake.p99_ms": metric(10, "ms", "lower")}}))
+    assert cli.main(argv) == 1
+
+    baseline.write_text(json.dumps({"machine": "other", "metrics": {"fake.p99_ms": metric(10, "ms", "lower")}}))
+    assert cli.main(argv) == 0
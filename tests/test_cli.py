@@ -0,0 +1,69 @@
+import hashlib
+import json
+
+import pytest
+
+import cli
+
+SCHEMA = {"fields": [{"name": "id", "type": "integer", "max": 10**12}, {"name": "name", "type": "string"}]}
+
+
+@pytest.fixture
+def schema_file(tmp_path):
+    path = tmp_path / "schema.json"
+    path.write_text(json.dumps(SCHEMA))
+    return str(path)
+
+
+def read_ndjson(paths):
+    return [json.loads(line) for path in paths for line in path.read_text().splitlines()]
+
+
+def test_shard_ranges_cover_all_records():
+    assert cli.shard_ranges(10, 3) == [(0, 4), (4, 3), (7, 3)]
+    assert cli.shard_ranges(2, 3) == [(0, 1), (1, 1), (2, 0)]
+
+
+def test_cli_writes_shards_and_manifest(tmp_path, schema_file):
+    output_dir = tmp_path / "out"
+
+    exit_code = cli.main(
+        [schema_file, "-n", "25", "-s", "3", "-o", str(output_dir), "-w", "2", "--batch-size", "4", "--manifest"]
+    )
+
+    manifest = json.loads((output_dir / "manifest.json").read_text())
+    files = [output_dir / shard["file"] for shard in manifest["shards"]]
+    records = read_ndjson(files)
+    assert exit_code == 0
+    assert [shard["records"] for shard in manifest["shards"]] == [9, 8, 8]
+    assert manifest["records"] == len(records) == 25
+    assert all(
+        hashlib.sha256(path.read_bytes()).hexdigest() == shard["sha256"]
+        for path, shard in zip(files, manifest["shards"])
+    )
+    # Forked workers must not repeat each other's random records
+    assert len({record["id"] for record in records}) == 25
+
+
+def test_seeded_output_does_not_depend_on_sharding(tmp_path, schema_file):
+    cli.main([schema_file, "-n", "20", "--seed", "5", "-s", "1", "-o", str(tmp_path / "one"), "-w", "1"])
+    cli.main([schema_file, "-n", "20", "--seed", "5", "-s", "4", "-o", str(tmp_path / "four"), "-w", "2"])
+
+    one = read_ndjson(sorted((tmp_path / "one").glob("*.ndjson")))
+    four = read_ndjson(sorted((tmp_path / "four").glob("*.ndjson")))
+
+    assert one == four
+
+
+def test_cli_writes_csv_shards_with_headers(tmp_path, schema_file):
+    cli.main([schema_file, "-n", "4", "-s", "2", "-f", "csv", "-o", str(tmp_path), "-w", "1", "--prefix", "users"])
+
+    lines = (tmp_path / "users-00001-of-00002.csv").read_text().splitlines()
+    assert lines[0] == "id,name"
+    assert len(lines) == 3
+
+
+def test_cli_reports_errors(tmp_path, schema_file, capsys):
+    assert cli.main([schema_file, "-n", "5", "-f", "xml", "-o", str(tmp_path)]) == 1
+    assert "Unsupported format 'xml'" in capsys.readouterr().err
+    assert cli.main([str(tmp_path / "missing.yaml"), "-n", "5", "-o", str(tmp_path)]) == 1
@@ -0,0 +1,102 @@
+import datetime
+import random
+
+import pytest
+
+from columnar import COLUMN_GENERATORS, ColumnBatch
+from faker_data_generation_service import compile_fields, generate_fake_data, get_compiled_schema
+
+SCHEMA = {
+    "fields": [
+        {"name": "age", "type": "integer", "min": 18, "max": 30},
+        {"name": "score", "type": "float", "min": 1.0, "max": 2.0, "precision": 1},
+        {"name": "active", "type": "boolean", "probability": 1.0},
+        {"name": "tier", "type": "choice", "elements": ["gold", "silver"], "weights": [0, 1]},
+        {"name": "joined", "type": "date", "start": "2024-01-01", "end": "2024-01-31"},
+        {"name": "name", "type": "string"},
+        {"name": "profile", "type": "object", "children": [{"name": "level", "type": "integer", "max": 3}]},
+    ]
+}
+
+
+def assert_valid(record):
+    assert 18 <= record["age"] <= 30
+    assert 1.0 <= record["score"] <= 2.0
+    assert record["active"] is True
+    assert record["tier"] == "silver"
+    assert datetime.date(2024, 1, 1) <= record["joined"] <= datetime.date(2024, 1, 31)
+    assert isinstance(record["name"], str)
+    assert 1 <= record["profile"]["level"] <= 3
+
+
+def test_column_generators_fill_whole_columns():
+    rng = random.Random(0)
+    column = COLUMN_GENERATORS["integer"]({"min": 5, "max": 6})(rng, 1000)
+
+    assert len(column) == 1000
+    assert set(column) == {5, 6}
+
+
+def test_generate_batch_is_columnar():
+    batch = get_compiled_schema(SCHEMA).generate_batch(50)
+
+    assert isinstance(batch, ColumnBatch)
+    assert len(batch) == 50
+    records = list(batch)
+    assert len(records) == 50
+    for record in records:
+        assert_valid(record)
+
+
+def test_seeded_batches_are_columnar_rows():
+    compiled = get_compiled_schema(SCHEMA)
+    batch = compiled.generate_batch(20, seed=4, start=10)
+
+    assert isinstance(batch, ColumnBatch)
+    assert isinstance(batch.columns[-1], ColumnBatch)
+    assert list(batch) == compiled.generate(20, seed=4, start=10)
+    assert compiled.generate_rows(1, seed=4, start=10)[0][-1] == (batch.columns[-1].columns[0][0],)
+
+
+def test_default_date_range_does_not_depend_on_today(monkeypatch):
+    schema = [{"name": "day", "type": "date"}]
+    before = compile_fields(schema).generate(5, seed=1)
+
+    class Tomorrow(datetime.date):
+        @classmethod
+        def today(cls):
+            return datetime.date(2099, 1, 1)
+
+    monkeypatch.setattr(datetime, "date", Tomorrow)
+
+    assert compile_fields(schema).generate(5, seed=1) == before
+
+
+def test_column_batch_is_a_sequence_of_records():
+    batch = get_compiled_schema(SCHEMA).generate_batch(5)
+    records = list(batch)
+
+    assert batch[0] == records[0]
+    assert batch[-1] == records[-1]
+    assert list(batch[1:3]) == records[1:3]
+    with pytest.raises(IndexError):
+        batch[5]
+
+
+def test_row_generators_match_column_semantics():
+    for record in generate_fake_data(SCHEMA, 20) + generate_fake_data(SCHEMA, 20, seed=3):
+        assert_valid(record)
+
+
+@pytest.mark.parametrize(
+    "field",
+    [
+        {"name": "bad", "type": "integer", "min": 10, "max": 1},
+        {"name": "bad", "type": "choice", "elements": []},
+        {"name": "bad", "type": "choice", "elements": ["a"], "weights": [1, 2]},
+        {"name": "bad", "type": "boolean", "probability": 2},
+    ],
+)
+def test_invalid_field_options(field):
+    with pytest.raises(ValueError):
+        compile_fields([field])
@@ -1,8 +1,19 @@
 import json
+import pickle
 
 import pytest
 
-from faker_data_generation_service import generate_fake_data, load_schema
+import faker_data_generation_service
+from faker_data_generation_service import (
+    ArrayStream,
+    compile_fields,
+    generate_fake_data,
+    generate_record,
+    get_compiled_schema,
+    load_schema,
+    parse_schema,
+    schema_hash,
+)
 
 
 def test_load_schema_json(tmp_path):
@@ -24,6 +35,20 @@ def test_load_schema_json(tmp_path):
     assert loaded_schema == schema_content
 
 
+def test_load_schema_yaml(tmp_path):
+    schema_file = tmp_path / "schema.yml"
+    schema_file.write_text("fields:\n  - name: name\n    type: string\n  - name: age\n    type: integer\n")
+
+    assert load_schema(str(schema_file)) == {
+        "fields": [{"name": "name", "type": "string"}, {"name": "age", "type": "integer"}]
+    }
+
+
+def test_parse_schema_rejects_documents_that_are_not_objects():
+    with pytest.raises(ValueError, match="must be an object"):
+        parse_schema("- name: name", "yaml")
+
+
 def test_load_schema_unsupported_format(tmp_path):
     # Create a temporary unsupported schema file
     schema_file = tmp_path / "schema.txt"
@@ -69,3 +94,122 @@ def test_generate_fake_data():
         assert "street" in record["address"] and isinstance(record["address"]["street"], str)
         assert "city" in record["address"] and isinstance(record["address"]["city"], str)
         assert "zipcode" in record["address"] and isinstance(record["address"]["zipcode"], str)
+
+
+def test_schema_hash_ignores_key_order():
+    schema_a = {"fields": [{"name": "name", "type": "string"}]}
+    schema_b = {"fields": [{"type": "string", "name": "name"}]}
+
+    assert schema_hash(schema_a) == schema_hash(schema_b)
+    assert schema_hash(schema_a) != schema_hash({"fields": [{"name": "name", "type": "email"}]})
+
+
+def test_get_compiled_schema_is_cached():
+    schema = {"fields": [{"name": "name", "type": "string"}, {"name": "age", "type": "integer"}]}
+
+    compiled = get_compiled_schema(schema)
+
+    # Equivalent schemas reuse the same compiled plan
+    assert get_compiled_schema({"fields": [dict(field) for field in schema["fields"]]}) is compiled
+    assert [name for name, _ in compiled.plan] == ["name", "age"]
+
+
+def test_compile_rejects_unknown_types():
+    with pytest.raises(ValueError, match="Field 'unknown': unknown type 'not_a_type'"):
+        generate_record([{"name": "unknown", "type": "not_a_type"}])
+    with pytest.raises(ValueError, match="Field 'nested': unknown type 'reference'"):
+        generate_record(
+            [
+                {
+                    "name": "tags",
+                    "type": "array",
+                    "items": {"type": "object", "children": [{"name": "nested", "type": "reference"}]},
+                }
+            ]
+        )
+
+    assert generate_record([{"name": "empty", "type": "object", "children": []}]) == {"empty": {}}
+
+
+def test_generate_fake_data_seeded_is_random_access():
+    schema = {"fields": [{"name": "name", "type": "string"}, {"name": "age", "type": "integer"}]}
+
+    full = generate_fake_data(schema, 20, seed=42)
+
+    # Any slice of a seeded dataset can be generated directly
+    assert generate_fake_data(schema, 5, seed=42, start=10) == full[10:15]
+    assert generate_fake_data(schema, 20, seed=42) == full
+    assert generate_fake_data(schema, 20, seed=43) != full
+
+
+def test_generate_fake_data_seeded_does_not_affect_unseeded():
+    schema = {"fields": [{"name": "name", "type": "string"}, {"name": "age", "type": "integer"}]}
+
+    generate_fake_data(schema, 5, seed=1)
+    first = generate_fake_data(schema, 20)
+    generate_fake_data(schema, 5, seed=1)
+    second = generate_fake_data(schema, 20)
+
+    assert first != second
+
+
+ARRAY_FIELDS = [
+    {"name": "tags", "type": "array", "items": {"type": "choice", "elements": ["a", "b"]}, "length": 3},
+    {
+        "name": "lines",
+        "type": "array",
+        "min_length": 0,
+        "max_length": 4,
+        "items": {"type": "object", "children": [{"name": "sku", "type": "integer"}, {"name": "city", "type": "city"}]},
+    },
+    {
+        "name": "matrix",
+        "type": "array",
+        "length": 2,
+        "items": {"type": "array", "length": 2, "items": {"type": "float"}},
+    },
+]
+
+
+def assert_arrays(record):
+    assert len(record["tags"]) == 3 and set(record["tags"]) <= {"a", "b"}
+    assert 0 <= len(record["lines"]) <= 4
+    assert all(set(line) == {"sku", "city"} for line in record["lines"])
+    assert [len(row) for row in record["matrix"]] == [2, 2]
+
+
+def test_array_fields_by_record_and_by_column():
+    compiled = compile_fields(ARRAY_FIELDS)
+
+    for record in [compiled.generate_record(), *compiled.generate_columns(20)]:
+        assert_arrays(record)
+    assert {len(record["lines"]) for record in compiled.generate_columns(200)} == {0, 1, 2, 3, 4}
+
+
+@pytest.mark.parametrize(
+    "field, message",
+    [
+        ({"name": "tags", "type": "array"}, "need an 'items' field definition"),
+        ({"name": "tags", "type": "array", "items": {"type": "city"}, "min_length": 3, "max_length": 2}, "lengths"),
+        ({"name": "tags", "type": "array", "items": {"type": "colour"}}, "unknown type 'colour'"),
+    ],
+)
+def test_invalid_array_fields(field, message):
+    with pytest.raises(ValueError, match=message):
+        compile_fields([field])
+
+
+def test_long_arrays_are_streamed(monkeypatch):
+    monkeypatch.setattr(faker_data_generation_service, "ARRAY_STREAM_THRESHOLD", 10)
+    monkeypatch.setattr(faker_data_generation_service, "ARRAY_STREAM_CHUNK_SIZE", 7)
+    schema = {"fields": [{"name": "events", "type": "array", "length": 25, "items": {"type": "email"}}]}
+
+    records = generate_fake_data(schema, 2, seed=9)
+    events = records[0]["events"]
+
+    assert isinstance(events, ArrayStream)
+    assert len(list(events)) == 25 and all("@" in email for email in events)
+    # Items are generated from the stream's seed, so iterating again or in another process gives the same items
+    assert list(events) == list(pickle.loads(pickle.dumps(events)))
+    assert records == generate_fake_data(schema, 2, seed=9)
+    assert list(records[1]["events"]) != list(events)
@@ -0,0 +1,54 @@
+import pytest
+
+import faker_data_generation_service
+from faker_data_generation_service import generate_fake_data, get_compiled_schema
+from faker_registry import FakerRegistry, create_faker
+
+
+def test_create_faker_loads_only_requested_providers():
+    faker = create_faker("en_US", ["faker.providers.person"])
+
+    assert isinstance(faker.first_name(), str)
+    assert isinstance(faker.random_int(), int)
+    with pytest.raises(AttributeError):
+        faker.city()
+
+
+def test_create_faker_rejects_unknown_locale():
+    with pytest.raises(ValueError, match="Unsupported locale"):
+        create_faker("xx_XX")
+
+
+def test_registry_reuses_and_evicts_instances():
+    registry = FakerRegistry(max_locales=1)
+    evicted = []
+    registry.add_eviction_listener(evicted.append)
+
+    faker = registry.get("en_US", ["faker.providers.person"])
+    assert registry.get("en_US", ["faker.providers.address"]) is faker
+    assert isinstance(faker.city(), str)
+
+    registry.get("de_DE")
+    assert registry.locales() == ["de_DE"]
+    assert evicted == ["en_US"]
+
+
+def test_schema_locale():
+    schema = {"fields": [{"name": "city", "type": "city"}], "locale": "ja_JP"}
+
+    compiled = get_compiled_schema(schema)
+
+    assert compiled.faker.locales == ["ja_JP"]
+    assert generate_fake_data(schema, 5, seed=1) == generate_fake_data(schema, 5, seed=1)
+
+
+def test_evicted_locale_drops_compiled_plans(monkeypatch):
+    registry = FakerRegistry(max_locales=1)
+    registry.add_eviction_listener(faker_data_generation_service._evict_locale_plans)
+    monkeypatch.setattr(faker_data_generation_service, "faker_registry", registry)
+    schema = {"fields": [{"name": "name", "type": "string"}], "locale": "fr_FR"}
+
+    compiled = get_compiled_schema(schema)
+    registry.get("it_IT")
+
+    assert get_compiled_schema(schema) is not compiled
@@ -0,0 +1,39 @@
+import pytest
+
+import generation_engine
+from generation_engine import generate_records, iter_record_batches
+
+SCHEMA = {"fields": [{"name": "name", "type": "string"}, {"name": "age", "type": "integer"}]}
+
+
+@pytest.fixture
+def process_pool(monkeypatch):
+    monkeypatch.setattr(generation_engine, "GENERATION_WORKERS", 2)
+    yield
+    generation_engine.shutdown_generation_pool()
+
+
+def test_iter_record_batches_in_process(monkeypatch):
+    monkeypatch.setattr(generation_engine, "GENERATION_WORKERS", 1)
+
+    batches = list(iter_record_batches(SCHEMA, 25, batch_size=10))
+
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+
+
+def test_generate_records_process_pool(process_pool):
+    generation_engine.start_generation_pool()
+
+    data = generate_records(SCHEMA, 2500, batch_size=1000)
+
+    assert len(data) == 2500
+    assert all(set(record) == {"name", "age"} for record in data)
+    # The pool is reused across calls
+    assert generation_engine.get_generation_pool() is generation_engine.get_generation_pool()
+
+
+def test_generate_records_seeded_independent_of_sharding(process_pool):
+    expected = generate_records(SCHEMA, 50, batch_size=50, seed=7)
+
+    assert generate_records(SCHEMA, 50, batch_size=7, seed=7) == expected
+    assert generate_records(SCHEMA, 10, batch_size=3, seed=7, start=20) == expected[20:30]
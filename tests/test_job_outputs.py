@@ -0,0 +1,153 @@
+import gzip
+import json
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import generation_engine
+import jobs
+from job_outputs import OutputFile, apply_retention, get_content_encodings, parse_accept_encoding, select_output_variant
+from jobs import JobManager
+from state_backend import MemoryStateBackend
+
+SCHEMA = {"fields": [{"name": "name", "type": "string"}, {"name": "age", "type": "integer"}]}
+
+
+@pytest.fixture
+def job_manager(monkeypatch, tmp_path):
+    monkeypatch.setattr(generation_engine, "GENERATION_WORKERS", 1)
+    monkeypatch.setattr(jobs, "GENERATION_BATCH_SIZE", 100)
+    manager = JobManager(output_dir=str(tmp_path), backend=MemoryStateBackend(), precompress=["gzip"])
+    monkeypatch.setattr(api, "job_manager", manager)
+    yield manager
+    manager.shutdown()
+
+
+def wait_for(job, timeout=10.0):
+    deadline = time.time() + timeout
+    while job.status in ("queued", "in_progress") and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def write_output(path, size, mtime):
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    os.utime(path, (mtime, mtime))
+
+
+def test_output_file_writes_compressed_copies_atomically(tmp_path):
+    path = str(tmp_path / "output_a.json")
+    output = OutputFile(path, get_content_encodings(["gzip"]))
+    output.write(b'[{"a": 1}')
+    output.write(b"]")
+
+    assert sorted(os.listdir(tmp_path)) == ["output_a.json.gz.part", "output_a.json.part"]
+    output.commit()
+    assert sorted(os.listdir(tmp_path)) == ["output_a.json", "output_a.json.gz"]
+    with gzip.open(path + ".gz") as f:
+        assert f.read() == b'[{"a": 1}]'
+
+    discarded = OutputFile(str(tmp_path / "output_b.json"), get_content_encodings(["gzip"]))
+    discarded.discard()
+    assert sorted(os.listdir(tmp_path)) == ["output_a.json", "output_a.json.gz"]
+
+
+def test_unknown_encodings_are_rejected():
+    with pytest.raises(ValueError, match="Unknown content encoding 'brotli'"):
+        get_content_encodings(["brotli"])
+
+
+def test_output_variant_follows_accept_encoding(tmp_path):
+    path = str(tmp_path / "output_a.json")
+    write_output(path, 10, time.time())
+    write_output(path + ".gz", 5, time.time())
+
+    assert parse_accept_encoding("gzip;q=0.5, br, identity;q=0") == {"gzip": 0.5, "br": 1.0, "identity": 0.0}
+    assert select_output_variant(path, "gzip, deflate") == (path + ".gz", "gzip")
+    assert select_output_variant(path, "*") == (path + ".gz", "gzip")
+    assert select_output_variant(path, "zstd, gzip;q=0") == (path, None)
+    assert select_output_variant(path, None) == (path, None)
+
+
+def test_retention_deletes_expired_outputs_and_keeps_the_budget(tmp_path):
+    now = time.time()
+    write_output(tmp_path / "output_old.json", 100, now - 1000)
+    write_output(tmp_path / "output_old.json.gz", 10, now - 1000)
+    write_output(tmp_path / "output_middle.csv", 100, now - 50)
+    write_output(tmp_path / "output_new.json", 100, now - 10)
+    write_output(tmp_path / "output_running.json.part", 500, now - 1000)
+    write_output(tmp_path / "notes.txt", 500, now - 1000)
+
+    removed = apply_retention(str(tmp_path), max_age=500, max_bytes=0, now=now)
+    assert sorted(os.path.basename(path) for path in removed) == ["output_old.json", "output_old.json.gz"]
+
+    removed = apply_retention(str(tmp_path), max_age=0, max_bytes=150, now=now)
+    assert [os.path.basename(path) for path in removed] == ["output_middle.csv"]
+
+    assert (
+        apply_retention(str(tmp_path), max_age=0, max_bytes=1, now=now, keep=[str(tmp_path / "output_new.json")]) == []
+    )
+    assert sorted(os.listdir(tmp_path)) == ["notes.txt", "output_new.json", "output_running.json.part"]
+
+
+def test_running_app_sweeps_outputs_that_expire_between_jobs(monkeypatch, tmp_path):
+    manager = JobManager(output_dir=str(tmp_path), backend=MemoryStateBackend(), max_output_age=500)
+    monkeypatch.setattr(api, "job_manager", manager)
+    monkeypatch.setattr(api, "OUTPUT_SWEEP_INTERVAL", 0.01)
+    with TestClient(api.app):
+        # Written after the startup sweep, and no job completes afterwards
+        write_output(tmp_path / "output_old.json", 100, time.time() - 1000)
+        write_output(tmp_path / "output_new.json", 100, time.time())
+        deadline = time.time() + 10
+        while (tmp_path / "output_old.json").exists() and time.time() < deadline:
+            time.sleep(0.01)
+
+    assert sorted(os.listdir(tmp_path)) == ["output_new.json"]
+
+
+def test_completed_job_output_is_downloadable_with_ranges(job_manager):
+    api.limiter.reset()
+    with TestClient(api.app) as client:
+        response = client.post("/generate-batch", params={"num_records": 1500, "seed": 1}, json=SCHEMA)
+        task_id = response.json()["task_id"]
+        while job_manager.status(task_id)["status"] in ("queued", "in_progress"):
+            time.sleep(0.01)
+
+        full = client.get(f"/task-output/{task_id}", headers={"Accept-Encoding": "identity"})
+        first = client.get(f"/task-output/{task_id}", headers={"Accept-Encoding": "identity", "Range": "bytes=0-99"})
+        rest = client.get(f"/task-output/{task_id}", headers={"Accept-Encoding": "identity", "Range": "bytes=100-"})
+        compressed = client.get(f"/task-output/{task_id}", headers={"Accept-Encoding": "gzip"})
+        missing = client.get("/task-output/missing")
+
+    assert response.json()["download_url"] == f"/task-output/{task_id}"
+    assert full.status_code == 200
+    assert full.headers["content-type"] == "application/json"
+    assert full.headers["accept-ranges"] == "bytes"
+    assert len(json.loads(full.content)) == 1500
+    assert first.status_code == rest.status_code == 206
+    assert first.headers["content-range"] == f"bytes 0-99/{len(full.content)}"
+    assert first.content + rest.content == full.content
+    assert compressed.headers["content-encoding"] == "gzip"
+    # The test client decodes the body like any HTTP client
+    assert compressed.content == full.content
+    assert missing.status_code == 404
+
+
+def test_unfinished_and_deleted_outputs_are_not_served(job_manager):
+    running = job_manager.submit(SCHEMA, 10**9)
+    with TestClient(api.app) as client:
+        pending = client.get(f"/task-output/{running.task_id}")
+        job_manager.cancel(running.task_id)
+        wait_for(running)
+
+        done = wait_for(job_manager.submit(SCHEMA, 10))
+        os.remove(done.output_file)
+        os.remove(done.output_file + ".gz")
+        deleted = client.get(f"/task-output/{done.task_id}")
+
+    assert pending.status_code == 409
+    assert deleted.status_code == 410
@@ -0,0 +1,130 @@
+import json
+import time
+
+import pytest
+
+import generation_engine
+import jobs
+from jobs import JobManager, JobQueueFullError
+from serialization import OUTPUT_FORMATS
+from state_backend import MemoryStateBackend, SQLiteStateBackend
+
+SCHEMA = {"fields": [{"name": "name", "type": "string"}, {"name": "age", "type": "integer"}]}
+
+
+@pytest.fixture
+def job_manager(monkeypatch, tmp_path):
+    monkeypatch.setattr(generation_engine, "GENERATION_WORKERS", 1)
+    monkeypatch.setattr(jobs, "GENERATION_BATCH_SIZE", 100)
+    manager = JobManager(max_concurrent=1, max_queued=1, output_dir=str(tmp_path), backend=MemoryStateBackend())
+    yield manager
+    manager.shutdown()
+
+
+def wait_for(job, timeout=10.0):
+    deadline = time.time() + timeout
+    while job.status in ("queued", "in_progress") and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+@pytest.mark.parametrize("stream_format", ["json", "ndjson"])
+def test_job_writes_output_in_chunks(job_manager, stream_format):
+    job = wait_for(job_manager.submit(SCHEMA, 1050, OUTPUT_FORMATS[stream_format]))
+
+    assert job.status == "completed"
+    with open(job.output_file, encoding="utf-8") as f:
+        content = f.read()
+    records = json.loads(content) if stream_format == "json" else [json.loads(line) for line in content.splitlines()]
+    assert len(records) == 1050
+    status = job.to_dict()
+    assert status["records_generated"] == 1050
+    assert status["progress"] == 1.0
+
+
+def test_finished_jobs_are_dropped_from_memory(job_manager):
+    job = wait_for(job_manager.submit(SCHEMA, 10))
+    deadline = time.time() + 10
+    while job_manager.get(job.task_id) is not None and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert job_manager.get(job.task_id) is None
+    assert job_manager.status(job.task_id)["status"] == "completed"
+    assert job_manager.status(job.task_id)["records_generated"] == 10
+
+
+def test_job_cancel_queued(job_manager):
+    running = job_manager.submit(SCHEMA, 10**9)
+    queued = job_manager.submit(SCHEMA, 10)
+
+    with pytest.raises(JobQueueFullError):
+        job_manager.submit(SCHEMA, 10)
+
+    assert job_manager.cancel(queued.task_id).status == "cancelled"
+    job_manager.cancel(running.task_id)
+    assert wait_for(running).status == "cancelled"
+    assert running.records_generated < running.num_records
+    assert job_manager.cancel("missing") is None
+
+
+def test_job_rejects_unsupported_format_early(job_manager):
+    nested = {"fields": [{"name": "address", "type": "object", "children": [{"name": "city", "type": "city"}]}]}
+
+    with pytest.raises(ValueError, match="flat schema"):
+        job_manager.submit(nested, 10, OUTPUT_FORMATS["csv"])
+
+
+def test_job_status_and_cancel_are_shared_between_workers(monkeypatch, tmp_path):
+    monkeypatch.setattr(generation_engine, "GENERATION_WORKERS", 1)
+    monkeypatch.setattr(jobs, "GENERATION_BATCH_SIZE", 100)
+    monkeypatch.setattr(jobs, "PROGRESS_INTERVAL", 0.0)
+    path = str(tmp_path / "state.db")
+    owner = JobManager(max_concurrent=1, output_dir=str(tmp_path), backend=SQLiteStateBackend(path))
+    other = JobManager(max_concurrent=1, output_dir=str(tmp_path), backend=SQLiteStateBackend(path))
+    try:
+        running = owner.submit(SCHEMA, 10**9)
+        queued = owner.submit(SCHEMA, 10)
+
+        assert other.get(running.task_id) is None
+        assert other.status(queued.task_id)["status"] == "queued"
+        assert other.request_cancel(queued.task_id)["status"] == "cancelled"
+        assert owner.status(queued.task_id)["status"] == "cancelled"
+        assert other.request_cancel("missing") is None
+
+        other.request_cancel(running.task_id)
+        assert wait_for(running).status == "cancelled"
+        assert other.status(running.task_id)["status"] == "cancelled"
+        assert other.running_count() == 0
+    finally:
+        owner.shutdown()
+        other.shutdown()
+
+
+def test_queued_jobs_start_round_robin_by_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(generation_engine, "GENERATION_WORKERS", 1)
+    manager = JobManager(max_concurrent=1, max_queued=10, output_dir=str(tmp_path), backend=MemoryStateBackend())
+    try:
+        running = manager.submit(SCHEMA, 10**9, client="a")
+        while running.status == "queued":
+            time.sleep(0.01)
+        first, second = manager.submit(SCHEMA, 10, client="a"), manager.submit(SCHEMA, 10, client="a")
+        other = manager.submit(SCHEMA, 10, client="b")
+
+        positions = [manager.status(job.task_id)["queue_position"] for job in (first, second, other)]
+        status = manager.status(other.task_id)
+
+        assert positions == [2, 3, 1]
+        assert status["estimated_start_seconds"] > 0
+        assert status["estimated_cost_seconds"] >= 0
+        assert "queue_position" not in manager.status(running.task_id)
+    finally:
+        for job in (running, first, second, other):
+            manager.cancel(job.task_id)
+        manager.shutdown()
+
+
+def test_estimate_start_delay():
+    # Two slots: the job starts once the shorter running job has finished, sharing 2 workers
+    assert jobs.estimate_start_delay([1.0, 3.0], [], slots=2, parallelism=2) == pytest.approx(1.0)
+    assert jobs.estimate_start_delay([1.0, 3.0], [0.5], slots=2, parallelism=2) == pytest.approx(1.5)
+    assert jobs.estimate_start_delay([1.0], [], slots=2, parallelism=2) == 0.0
@@ -0,0 +1,95 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import generation_engine
+import metrics
+from columnar import ColumnBatch
+from faker_data_generation_service import get_compiled_schema
+
+SCHEMA = {"fields": [{"name": "age", "type": "integer"}, {"name": "email", "type": "email"}]}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(generation_engine, "GENERATION_WORKERS", 1)
+    api.limiter.reset()
+    with TestClient(api.app) as test_client:
+        yield test_client
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_seconds", "Test histogram.", ["source"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, source="a")
+    histogram.observe(0.5, source="a")
+    histogram.observe(5.0, source="a")
+
+    lines = histogram.render()
+
+    assert "# TYPE test_seconds histogram" in lines
+    assert 'test_seconds_bucket{source="a",le="0.1"} 1.0' in lines
+    assert 'test_seconds_bucket{source="a",le="1.0"} 2.0' in lines
+    assert 'test_seconds_bucket{source="a",le="+Inf"} 3.0' in lines
+    assert 'test_seconds_count{source="a"} 3.0' in lines
+    assert histogram.sum(source="a") == pytest.approx(5.55)
+
+
+def test_metric_rejects_missing_labels():
+    counter = metrics.Counter("test_total", "Test counter.", ["type"])
+
+    with pytest.raises(ValueError, match="expects labels: type"):
+        counter.inc()
+
+
+def test_gauge_reads_function_on_render():
+    values = iter([3, 7])
+    gauge = metrics.Gauge("test_depth", "Test gauge.")
+    gauge.set_function(lambda: next(values))
+
+    assert gauge.render()[-1] == "test_depth 3.0"
+    assert gauge.get() == 7.0
+
+
+def test_record_batch_collects_field_timings(monkeypatch):
+    monkeypatch.setattr("faker_data_generation_service.FIELD_TIMING_INTERVAL", 1)
+    integer_seconds = metrics.FIELD_GENERATION_SECONDS.get(type="integer")
+    email_values = metrics.FIELD_VALUES_TIMED.get(type="email")
+    records = metrics.RECORDS_GENERATED.get()
+
+    batch = get_compiled_schema(SCHEMA).generate_batch(20)
+    metrics.record_batch(batch)
+
+    assert isinstance(batch, ColumnBatch)
+    assert set(batch.timings) == {"integer", "email"}
+    assert metrics.FIELD_GENERATION_SECONDS.get(type="integer") > integer_seconds
+    assert metrics.FIELD_VALUES_TIMED.get(type="email") == email_values + 20
+    assert metrics.RECORDS_GENERATED.get() == records + 20
+
+
+def test_metrics_endpoint_reports_request_latency_by_route(client):
+    client.post("/generate-batch", params={"num_records": 5}, json=SCHEMA)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'fakeit_http_request_duration_seconds_count{method="POST",route="/generate-batch",status="200"}' in (
+        response.text
+    )
+    assert 'fakeit_batch_serialization_seconds_count{source="stream"}' in response.text
+    assert "fakeit_job_slots_total 5.0" in response.text
+
+
+def test_profile_hook_receives_samples_for_profiled_requests(client, monkeypatch):
+    profiles = []
+    monkeypatch.setattr(metrics, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(metrics, "PROFILE_INTERVAL", 0.001)
+    monkeypatch.setattr(metrics, "profile_hook", lambda method, path, stacks: profiles.append((method, path, stacks)))
+
+    client.post("/generate-batch", params={"num_records": 200}, json=SCHEMA, headers={"X-Profile": "1"})
+    client.post("/generate-batch", params={"num_records": 5}, json=SCHEMA)
+
+    assert len(profiles) == 1
+    method, path, stacks = profiles[0]
+    assert (method, path) == ("POST", "/generate-batch")
+    assert stacks and all(isinstance(count, int) for count in stacks.values())
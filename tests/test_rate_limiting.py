@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from rate_limiting import RateLimiter, parse_rate
+from state_backend import MemoryStateBackend, SQLiteStateBackend
+
+
+@pytest.mark.parametrize(
+    "rate, expected", [("5/minute", (5, 60.0)), ("10/second", (10, 1.0)), ("2/hours", (2, 3600.0))]
+)
+def test_parse_rate(rate, expected):
+    assert parse_rate(rate) == expected
+
+
+@pytest.mark.parametrize("rate", ["five/minute", "0/minute", "5/fortnight", "5"])
+def test_parse_rate_rejects_invalid_rates(rate):
+    with pytest.raises(ValueError, match="Invalid rate limit"):
+        parse_rate(rate)
+
+
+@pytest.fixture
+def limited_app():
+    limiter = RateLimiter(MemoryStateBackend())
+    app = FastAPI()
+
+    @app.get("/limited", dependencies=[Depends(limiter.limit("2/minute"))])
+    async def limited():
+        return {"ok": True}
+
+    @app.get("/other", dependencies=[Depends(limiter.limit("2/minute"))])
+    async def other():
+        return {"ok": True}
+
+    return app, limiter
+
+
+def test_limit_returns_429_with_retry_after(limited_app):
+    app, _ = limited_app
+    client = TestClient(app)
+
+    assert [client.get("/limited").status_code for _ in range(2)] == [200, 200]
+    response = client.get("/limited")
+
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["retry-after"]) <= 30
+    assert client.get("/other").status_code == 200
+
+
+def test_limiter_can_be_reset_and_disabled(limited_app):
+    app, limiter = limited_app
+    client = TestClient(app)
+    for _ in range(3):
+        client.get("/limited")
+
+    limiter.reset()
+    assert client.get("/limited").status_code == 200
+
+    limiter.enabled = False
+    assert all(client.get("/limited").status_code == 200 for _ in range(5))
+
+
+def test_blocking_backends_are_checked_off_the_event_loop(tmp_path):
+    backend = SQLiteStateBackend(str(tmp_path / "state.db"))
+    limiter = RateLimiter(backend)
+    threads = []
+    consume_token = backend.consume_token
+
+    def record_thread(*args):
+        threads.append(threading.current_thread())
+        return consume_token(*args)
+
+    backend.consume_token = record_thread
+    app = FastAPI()
+
+    @app.get("/limited", dependencies=[Depends(limiter.limit("1/minute"))])
+    async def limited():
+        return {"thread": threading.current_thread().name}
+
+    client = TestClient(app)
+    response = client.get("/limited")
+
+    assert response.status_code == 200
+    assert client.get("/limited").status_code == 429
+    assert threads[0].name != response.json()["thread"]
@@ -0,0 +1,158 @@
+import json
+from collections import Counter
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import cli
+import generation_engine
+from relational import DatasetGenerator, compile_dataset, expected_records
+
+DATASET = {
+    "entities": [
+        {
+            "name": "line_items",
+            "per": {"entity": "orders", "min": 1, "max": 3},
+            "fields": [
+                {"name": "order_id", "type": "reference", "entity": "orders"},
+                {"name": "quantity", "type": "integer", "max": 5},
+            ],
+        },
+        {
+            "name": "users",
+            "count": 20,
+            "fields": [{"name": "name", "type": "string"}, {"name": "email", "type": "email", "unique": True}],
+        },
+        {
+            "name": "orders",
+            "per": {"entity": "users", "max": 4},
+            "fields": [
+                {"name": "user_id", "type": "reference", "entity": "users"},
+                {"name": "total", "type": "float"},
+            ],
+        },
+        {
+            "name": "reviews",
+            "count": 30,
+            "fields": [
+                {"name": "user_id", "type": "reference", "entity": "users"},
+                {"name": "line_item_id", "type": "reference", "entity": "line_items"},
+            ],
+        },
+    ]
+}
+
+
+@pytest.fixture(autouse=True)
+def in_process(monkeypatch):
+    monkeypatch.setattr(generation_engine, "GENERATION_WORKERS", 1)
+
+
+def generate(schema, seed=None, batch_size=7):
+    generator = DatasetGenerator(schema, seed, batch_size)
+    return {entity.name: [record for batch in batches for record in batch] for entity, batches in generator}
+
+
+def test_entities_are_generated_after_the_entities_they_refer_to():
+    assert [entity.name for entity in compile_dataset(DATASET)] == ["users", "orders", "line_items", "reviews"]
+    assert expected_records(compile_dataset(DATASET)) == 20 + 40 + 80 + 30
+
+
+@pytest.mark.parametrize("seed", [None, 11])
+def test_references_are_valid_and_follow_cardinality_rules(seed):
+    dataset = generate(DATASET, seed)
+
+    users, orders, line_items = dataset["users"], dataset["orders"], dataset["line_items"]
+    assert [user["id"] for user in users] == list(range(1, 21))
+    assert [order["id"] for order in orders] == list(range(1, len(orders) + 1))
+    assert all(1 <= order["user_id"] <= 20 for order in orders)
+    # Children are grouped by parent, within the per-parent limits
+    assert [order["user_id"] for order in orders] == sorted(order["user_id"] for order in orders)
+    assert max(Counter(order["user_id"] for order in orders).values()) <= 4
+    items_per_order = Counter(item["order_id"] for item in line_items)
+    assert set(items_per_order) == {order["id"] for order in orders}
+    assert set(items_per_order.values()) <= {1, 2, 3}
+    assert all(1 <= review["line_item_id"] <= len(line_items) for review in dataset["reviews"])
+    assert len({user["email"] for user in users}) == 20
+
+
+def test_seeded_datasets_do_not_depend_on_batch_size():
+    assert generate(DATASET, seed=5, batch_size=3) == generate(DATASET, seed=5, batch_size=50)
+    assert generate(DATASET, seed=5) != generate(DATASET, seed=6)
+
+
+@pytest.mark.parametrize(
+    "entities, message",
+    [
+        ([{"name": "a", "count": 1, "fields": [{"name": "b_id", "type": "reference", "entity": "b"}]}], "unknown"),
+        (
+            [
+                {"name": "a", "count": 1, "fields": [{"name": "b_id", "type": "reference", "entity": "b"}]},
+                {"name": "b", "count": 1, "fields": [{"name": "a_id", "type": "reference", "entity": "a"}]},
+            ],
+            "Circular",
+        ),
+        ([{"name": "a", "fields": []}], "either count or per"),
+        ([{"name": "a", "count": 1, "fields": [{"name": "id", "type": "integer"}]}], "primary key"),
+        (
+            [
+                {"name": "a", "count": 1, "fields": []},
+                {"name": "b", "per": {"entity": "a", "max": 2}, "fields": []},
+            ],
+            "reference field to its parent",
+        ),
+    ],
+)
+def test_invalid_datasets_are_rejected(entities, message):
+    with pytest.raises(ValueError, match=message):
+        compile_dataset({"entities": entities})
+
+
+def test_seeded_references_depend_on_the_seed_and_the_entity():
+    schema = {
+        "entities": [
+            {"name": "users", "count": 1000, "fields": []},
+            {"name": "orders", "count": 50, "fields": [{"name": "user_id", "type": "reference", "entity": "users"}]},
+            {"name": "visits", "count": 50, "fields": [{"name": "user_id", "type": "reference", "entity": "users"}]},
+        ]
+    }
+
+    def references(seed):
+        dataset = generate(schema, seed=seed)
+        return [[record["user_id"] for record in dataset[name]] for name in ("orders", "visits")]
+
+    orders, visits = references(1)
+
+    assert references(1) == [orders, visits]
+    assert orders != visits
+    assert references(2)[0] != orders
+    assert len(set(orders)) > 40
+
+
+def test_api_streams_dataset_per_entity():
+    api.limiter.reset()
+    with TestClient(api.app) as client:
+        response = client.post("/generate-dataset", params={"seed": 1}, json=DATASET)
+        too_large = client.post("/generate-dataset", json={"entities": [{"name": "a", "count": 10**6, "fields": []}]})
+
+    body = json.loads(response.text)
+    assert response.status_code == 200
+    assert list(body) == ["users", "orders", "line_items", "reviews"]
+    assert body == json.loads(json.dumps(generate(DATASET, seed=1), default=str))
+    assert too_large.status_code == 400
+
+
+def test_cli_writes_one_file_per_entity(tmp_path):
+    schema_file = tmp_path / "dataset.json"
+    schema_file.write_text(json.dumps(DATASET))
+    output_dir = tmp_path / "out"
+
+    exit_code = cli.main([str(schema_file), "-o", str(output_dir), "-f", "csv", "--seed", "3", "--manifest"])
+
+    manifest = json.loads((output_dir / "manifest.json").read_text())
+    assert exit_code == 0
+    assert [entry["entity"] for entry in manifest["entities"]] == ["users", "orders", "line_items", "reviews"]
+    assert (output_dir / "orders.csv").read_text().splitlines()[0] == "id,user_id,total"
+    assert manifest["records"] == sum(entry["records"] for entry in manifest["entities"])
+    assert cli.main([str(schema_file), "-n", "10", "-o", str(output_dir)]) == 1
@@ -0,0 +1,127 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import generation_engine
+from response_cache import ResponseCache, etag_for, etag_matches, response_key
+
+SCHEMA = {"fields": [{"name": "name", "type": "string"}, {"name": "age", "type": "integer"}]}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    response_cache = ResponseCache(max_bytes=1024 * 1024)
+    monkeypatch.setattr(api, "response_cache", response_cache)
+    return response_cache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(generation_engine, "GENERATION_WORKERS", 1)
+    api.limiter.reset()
+    with TestClient(api.app) as test_client:
+        yield test_client
+
+
+def test_cache_evicts_least_recently_used_entries_above_budget():
+    cache = ResponseCache(max_bytes=10, max_entry_bytes=10)
+    cache.put("a", b"aaaa", "text/plain")
+    cache.put("b", b"bbbb", "text/plain")
+    cache.get("a")
+    cache.put("c", b"cccc", "text/plain")
+
+    assert cache.get("b") is None
+    assert cache.get("a").body == b"aaaa"
+    assert cache.nbytes == 8
+
+
+def test_cache_skips_entries_above_entry_limit():
+    cache = ResponseCache(max_bytes=100, max_entry_bytes=4)
+
+    assert not cache.put("a", b"too large", "text/plain")
+    assert len(cache) == 0
+
+
+def test_response_key_ignores_parameter_order():
+    first = response_key("batch", SCHEMA, 1, num_records=10, format="json")
+    second = response_key("batch", dict(reversed(list(SCHEMA.items()))), 1, format="json", num_records=10)
+
+    assert first == second
+    assert etag_for(first) != etag_for(response_key("batch", SCHEMA, 2, num_records=10, format="json"))
+
+
+def test_etag_matches_lists_weak_tags_and_wildcard():
+    etag = etag_for("key")
+
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_seeded_batch_sends_etag_and_answers_if_none_match(client):
+    params = {"num_records": 20, "seed": 7}
+    response = client.post("/generate-batch", params=params, json=SCHEMA)
+    repeated = client.post("/generate-batch", params=params, json=SCHEMA)
+    not_modified = client.post(
+        "/generate-batch", params=params, json=SCHEMA, headers={"If-None-Match": response.headers["etag"]}
+    )
+
+    assert len(json.loads(response.text)) == 20
+    assert repeated.text == response.text
+    assert repeated.headers["etag"] == response.headers["etag"]
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+
+def test_unseeded_batch_has_no_etag(client):
+    response = client.post("/generate-batch", params={"num_records": 5}, json=SCHEMA)
+
+    assert "etag" not in response.headers
+
+
+def test_seeded_batch_is_served_from_cache(client, cache):
+    params = {"num_records": 20, "seed": 7, "format": "ndjson"}
+    response = client.post("/generate-batch", params=params, json=SCHEMA)
+
+    assert len(cache) == 1
+    cache.put(next(iter(cache._entries)), b"cached\n", "application/x-ndjson")
+    cached = client.post("/generate-batch", params=params, json=SCHEMA)
+
+    assert len(response.text.splitlines()) == 20
+    assert cached.text == "cached\n"
+    assert cached.headers["etag"] == response.headers["etag"]
+    assert cached.headers["content-type"] == "application/x-ndjson"
+
+
+def test_seeded_single_is_reproducible_and_cached(client, cache):
+    first = client.post("/generate-single", params={"seed": 3}, json=SCHEMA)
+    second = client.post("/generate-single", params={"seed": 3}, json=SCHEMA)
+    other = client.post("/generate-single", params={"seed": 4}, json=SCHEMA)
+
+    assert first.json() == second.json()
+    assert set(first.json()["data"]) == {"name", "age"}
+    assert other.headers["etag"] != first.headers["etag"]
+    assert len(cache) == 2
+
+
+def test_seeded_page_answers_if_none_match(client, cache):
+    params = {"page": 2, "page_size": 10, "seed": 5}
+    response = client.request("GET", "/generate-paginated", params=params, json=SCHEMA)
+    not_modified = client.request(
+        "GET", "/generate-paginated", params=params, json=SCHEMA, headers={"If-None-Match": response.headers["etag"]}
+    )
+
+    assert response.json()["page"] == 2
+    assert len(response.json()["data"]) == 10
+    assert not_modified.status_code == 304
+
+
+def test_pooled_schema_is_not_cached(client, cache):
+    response = client.post("/generate-batch", params={"num_records": 5, "seed": 1}, json={**SCHEMA, "pooled": True})
+
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    assert len(cache) == 0
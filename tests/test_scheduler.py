@@ -0,0 +1,179 @@
+import asyncio
+import threading
+
+import anyio
+import httpx
+import pytest
+
+import api
+import generation_engine
+import scheduler as scheduler_module
+from scheduler import Scheduler, SchedulerFullError, record_cost
+
+
+def test_record_cost_sums_fields_including_nested_ones():
+    schema = {
+        "fields": [
+            {"name": "age", "type": "integer"},
+            {"name": "address", "type": "object", "children": [{"name": "city", "type": "city"}]},
+            {"name": "custom", "type": "unknown"},
+        ]
+    }
+
+    costs = [scheduler_module.field_cost("integer"), scheduler_module.field_cost("city")]
+    assert record_cost(schema) == pytest.approx(sum(costs) + scheduler_module.DEFAULT_FIELD_COST)
+
+
+def test_record_cost_of_pooled_fields():
+    schema = {"fields": [{"name": "city", "type": "city"}], "pooled": True}
+
+    assert record_cost(schema) == scheduler_module.POOLED_FIELD_COST
+
+
+def test_work_waits_until_budget_is_released():
+    scheduler = Scheduler(budget=1.0, parallelism=1)
+    first = scheduler.submit(0.6, "a")
+    second = scheduler.submit(0.6, "a")
+
+    assert first.future.done()
+    assert not second.future.done()
+    assert scheduler.queued_count() == 1
+    assert scheduler.estimated_wait() == pytest.approx(1.2)
+
+    scheduler.release(first)
+
+    assert second.future.done()
+    assert scheduler.in_use == pytest.approx(0.6)
+
+
+def test_work_larger_than_budget_runs_alone():
+    scheduler = Scheduler(budget=1.0, parallelism=1)
+    small = scheduler.submit(0.1, "a")
+    large = scheduler.submit(5.0, "a")
+
+    assert not large.future.done()
+    scheduler.release(small)
+    assert large.future.done()
+    assert scheduler.in_use == pytest.approx(1.0)
+
+
+def test_clients_share_the_budget_fairly():
+    scheduler = Scheduler(budget=1.0, parallelism=1)
+    blocker = scheduler.submit(1.0, "blocker")
+    heavy = [scheduler.submit(1.0, "heavy") for _ in range(5)]
+    light = scheduler.submit(1.0, "light")
+
+    admitted = []
+    scheduler.release(blocker)
+    for _ in range(3):
+        ticket = next(ticket for ticket in [*heavy, light] if ticket.state == "admitted")
+        admitted.append("light" if ticket is light else "heavy")
+        scheduler.release(ticket)
+
+    assert "light" in admitted[:2]
+
+
+def test_interactive_work_overtakes_background_work():
+    scheduler = Scheduler(budget=1.0, parallelism=1)
+    blocker = scheduler.submit(1.0, "a", "background")
+    background = [scheduler.submit(1.0, "a", "background") for _ in range(3)]
+    interactive = scheduler.submit(1.0, "a", "interactive")
+
+    scheduler.release(blocker)
+
+    assert interactive.future.done()
+    assert not any(ticket.future.done() for ticket in background)
+
+
+def test_queue_is_bounded():
+    scheduler = Scheduler(budget=1.0, parallelism=1, max_queued=1)
+    scheduler.submit(1.0, "a")
+    scheduler.submit(1.0, "a")
+
+    with pytest.raises(SchedulerFullError):
+        scheduler.submit(1.0, "a")
+
+
+def test_unknown_priority_is_rejected():
+    with pytest.raises(ValueError, match="Unknown priority 'urgent'"):
+        Scheduler().submit(1.0, "a", "urgent")
+
+
+def test_wait_gives_up_when_cancelled():
+    scheduler = Scheduler(budget=1.0, parallelism=1)
+    scheduler.submit(1.0, "a")
+    waiting = scheduler.submit(1.0, "a")
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    assert not scheduler.wait(waiting, cancel_event)
+    assert scheduler.queued_count() == 0
+
+
+def test_batch_admission_stops_generation_when_cancelled():
+    scheduler = Scheduler(budget=1e-9, parallelism=1)
+    blocker = scheduler.submit(1.0, "a")
+    cancel_event = threading.Event()
+    cancel_event.set()
+    admit = scheduler.batch_admission({"fields": [{"name": "age", "type": "integer"}]}, "a", "background", cancel_event)
+
+    assert admit(10) is None
+    scheduler.release(blocker)
+    assert scheduler.in_use == 0
+
+
+def test_admitted_async_releases_budget_after_cancellation():
+    scheduler = Scheduler(budget=1.0, parallelism=1)
+
+    async def run():
+        blocker = scheduler.submit(1.0, "a")
+
+        async def wait_for_budget():
+            async with scheduler.admitted_async(1.0, "b", "interactive"):
+                pass
+
+        task = asyncio.create_task(wait_for_budget())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        scheduler.release(blocker)
+
+        async with scheduler.admitted_async(1.0, "b", "interactive"):
+            assert scheduler.in_use == pytest.approx(1.0)
+
+    asyncio.run(run())
+
+    assert scheduler.in_use == 0
+    assert scheduler.queued_count() == 0
+
+
+def test_waiting_streams_do_not_starve_paginated_requests(monkeypatch):
+    # Every unit of work takes the whole budget, so streams and pages are admitted one at a time
+    scheduler = Scheduler(budget=1e-9, parallelism=1)
+    monkeypatch.setattr(api, "scheduler", scheduler)
+    monkeypatch.setattr(generation_engine, "GENERATION_WORKERS", 1)
+    monkeypatch.setattr(api.limiter, "enabled", False)
+    schema = {"fields": [{"name": "age", "type": "integer"}]}
+
+    async def run():
+        anyio.to_thread.current_default_thread_limiter().total_tokens = 2
+        blocker = scheduler.submit(1.0, "other", "background")
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            streams = [
+                asyncio.create_task(client.post("/generate-batch", params={"num_records": 10}, json=schema))
+                for _ in range(4)
+            ]
+            await asyncio.sleep(0.1)
+            page = asyncio.create_task(client.request("GET", "/generate-paginated", json=schema))
+            await asyncio.sleep(0.1)
+            scheduler.release(blocker)
+            return await asyncio.wait_for(asyncio.gather(page, *streams), timeout=10)
+
+    page, *streams = asyncio.run(run())
+
+    assert page.status_code == 200
+    assert len(page.json()["data"]) == 100
+    assert all(len(stream.json()) == 10 for stream in streams)
+    assert scheduler.in_use == 0
@@ -0,0 +1,148 @@
+import json
+import pickle
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import app
+import generation_engine
+import websocket_handler
+from faker_data_generation_service import schema_hash
+from schema_registry import SchemaNotFoundError, SchemaRegistry
+
+SCHEMA = {"fields": [{"name": "name", "type": "string"}, {"name": "age", "type": "integer", "min": 18}]}
+
+YAML_SCHEMA = """
+fields:
+  - name: name
+    type: string
+  - name: address
+    type: object
+    children:
+      - name: city
+        type: city
+"""
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    schema_registry = SchemaRegistry(str(tmp_path))
+    monkeypatch.setattr(api, "schema_registry", schema_registry)
+    monkeypatch.setattr(websocket_handler, "schema_registry", schema_registry)
+    return schema_registry
+
+
+@pytest.fixture
+def client(monkeypatch, registry):
+    monkeypatch.setattr(generation_engine, "GENERATION_WORKERS", 1)
+    api.limiter.reset()
+    with TestClient(api.app) as test_client:
+        yield test_client
+
+
+def test_register_returns_content_hash_independent_of_key_order(registry):
+    first = registry.register(SCHEMA)
+    second = registry.register({"fields": [dict(reversed(list(field.items()))) for field in SCHEMA["fields"]]})
+
+    assert first.schema_id == second.schema_id
+    assert first.schema_id == schema_hash({**SCHEMA, "pooled": False, "locale": None})
+    assert first == {**SCHEMA, "pooled": False, "locale": None}
+
+
+def test_registered_schemas_are_shared_through_the_directory(registry, tmp_path):
+    schema_id = registry.register(SCHEMA).schema_id
+
+    other_worker = SchemaRegistry(str(tmp_path))
+
+    assert other_worker.get(schema_id) == registry.get(schema_id)
+    assert other_worker.get(schema_id).schema_id == schema_id
+
+
+@pytest.mark.parametrize("schema_id", ["0" * 64, "../secrets", ""])
+def test_unknown_schema_ids_are_not_found(registry, schema_id):
+    with pytest.raises(SchemaNotFoundError):
+        registry.get(schema_id)
+
+
+@pytest.mark.parametrize(
+    "schema",
+    [
+        {"fields": "name"},
+        {"fields": [{"name": "name"}]},
+        {"fields": [{"name": "plan", "type": "choice"}]},
+    ],
+)
+def test_invalid_schemas_are_rejected(registry, schema):
+    with pytest.raises(ValueError):
+        registry.register(schema)
+
+
+def test_registered_schema_keeps_its_id_across_processes(registry):
+    registered = registry.register(SCHEMA)
+
+    copy = pickle.loads(pickle.dumps(registered))
+
+    assert copy == registered
+    assert schema_hash(copy) == registered.schema_id
+
+
+def test_upload_yaml_and_generate_by_id(client):
+    response = client.post("/schemas", files={"file": ("schema.yaml", YAML_SCHEMA, "application/yaml")})
+    schema_id = response.json()["schema_id"]
+
+    batch = client.post("/generate-batch", params={"num_records": 5, "schema_id": schema_id})
+    single = client.post("/generate-single", params={"schema_id": schema_id})
+    page = client.request("GET", "/generate-paginated", params={"page_size": 3, "schema_id": schema_id})
+
+    assert response.status_code == 201
+    assert response.json()["fields"] == 2
+    assert client.get(f"/schemas/{schema_id}").json()["fields"][1]["children"] == [{"name": "city", "type": "city"}]
+    assert [set(record) for record in json.loads(batch.text)] == [{"name", "address"}] * 5
+    assert set(single.json()["data"]["address"]) == {"city"}
+    assert len(page.json()["data"]) == 3
+
+
+def test_generate_by_id_matches_inline_schema(client):
+    schema_id = client.post("/schemas", files={"file": ("schema.json", json.dumps(SCHEMA))}).json()["schema_id"]
+    params = {"num_records": 10, "seed": 3}
+
+    inline = client.post("/generate-batch", params=params, json=SCHEMA)
+    by_id = client.post("/generate-batch", params={**params, "schema_id": schema_id})
+
+    assert by_id.text == inline.text
+    assert by_id.headers["etag"] == inline.headers["etag"]
+
+
+def test_schema_errors(client):
+    invalid = client.post("/schemas", files={"file": ("schema.yaml", "fields: [")})
+    unknown = client.post("/generate-batch", params={"schema_id": "0" * 64})
+    missing = client.post("/generate-batch")
+
+    assert invalid.status_code == 400
+    assert unknown.status_code == 404
+    assert client.get(f"/schemas/{'0' * 64}").status_code == 404
+    assert missing.status_code == 400
+
+
+def test_generate_from_uploaded_yaml_file(client):
+    response = client.post(
+        "/generate-from-file", params={"num_records": 4}, files={"file": ("schema.yml", YAML_SCHEMA)}
+    )
+
+    assert response.status_code == 200
+    assert len(json.loads(response.text)) == 4
+
+
+def test_websocket_subscribes_by_schema_id(registry):
+    schema_id = registry.register(SCHEMA).schema_id
+
+    with TestClient(app.app) as client, client.websocket_connect("/ws") as websocket:
+        websocket.send_json({"action": "subscribe", "schema_id": schema_id, "rate": 10000, "batch_size": 5})
+        assert websocket.receive_json()["type"] == "subscribed"
+        assert set(json.loads(websocket.receive_text())["records"][0]) == {"name", "age"}
+
+        websocket.send_json({"action": "subscribe", "schema_id": "unknown"})
+        while (message := websocket.receive_json())["type"] == "batch":
+            pass
+        assert message == {"type": "error", "detail": "Schema 'unknown' not found"}
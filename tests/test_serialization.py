@@ -0,0 +1,161 @@
+import csv
+import datetime
+import io
+import json
+
+import pytest
+
+import faker_data_generation_service
+from faker_data_generation_service import ArrayStream, get_compiled_schema
+from serialization import OUTPUT_FORMATS, EnhancedJSONEncoder, RecordEncoder, get_output_format
+
+SCHEMA = {
+    "fields": [
+        {"name": "name", "type": "string"},
+        {"name": "age", "type": "integer"},
+        {"name": "joined", "type": "date", "start": "2024-01-01", "end": "2024-12-31"},
+    ]
+}
+
+
+def encode(format_name, batches, schema=SCHEMA):
+    writer = OUTPUT_FORMATS[format_name].writer(schema)
+    return writer.begin() + b"".join(writer.write(batch) for batch in batches) + writer.end()
+
+
+def make_batches():
+    compiled = get_compiled_schema(SCHEMA)
+    # Mix columnar and row batches, the two shapes produced by the generation engine
+    return [compiled.generate_batch(3), compiled.generate(2), compiled.generate_batch(0)]
+
+
+def test_get_output_format():
+    assert get_output_format().name == "json"
+    assert get_output_format("csv").name == "csv"
+    assert get_output_format(accept="text/html, application/x-ndjson;q=0.9").name == "ndjson"
+    with pytest.raises(ValueError, match="Unsupported format"):
+        get_output_format("xml")
+
+
+@pytest.mark.parametrize("format_name", ["json", "ndjson", "csv"])
+def test_text_formats(format_name):
+    data = encode(format_name, make_batches()).decode("utf-8")
+
+    if format_name == "json":
+        records = json.loads(data)
+    elif format_name == "ndjson":
+        records = [json.loads(line) for line in data.splitlines()]
+    else:
+        records = list(csv.DictReader(io.StringIO(data)))
+    assert len(records) == 5
+    assert all(set(record) == {"name", "age", "joined"} for record in records)
+    assert all(datetime.date.fromisoformat(record["joined"]) for record in records)
+
+
+def test_csv_requires_flat_schema():
+    with pytest.raises(ValueError, match="flat schema"):
+        OUTPUT_FORMATS["csv"].writer({"fields": [{"name": "a", "type": "object", "children": []}]})
+
+
+def test_msgpack():
+    msgpack = pytest.importorskip("msgpack")
+
+    records = list(msgpack.Unpacker(io.BytesIO(encode("msgpack", make_batches()))))
+
+    assert len(records) == 5
+    assert all(set(record) == {"name", "age", "joined"} for record in records)
+
+
+def test_arrow():
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.ipc  # noqa: F401
+
+    table = pyarrow.ipc.open_stream(encode("arrow", make_batches())).read_all()
+
+    assert table.num_rows == 5
+    assert table.column_names == ["name", "age", "joined"]
+
+
+def test_streamed_arrays_are_encoded_like_lists(monkeypatch):
+    monkeypatch.setattr(faker_data_generation_service, "ARRAY_STREAM_THRESHOLD", 5)
+    schema = {
+        "fields": [
+            {"name": "id", "type": "integer"},
+            {
+                "name": "items",
+                "type": "array",
+                "length": 12,
+                "items": {
+                    "type": "object",
+                    "children": [
+                        {"name": "day", "type": "date"},
+                        {"name": "codes", "type": "array", "length": 8, "items": {"type": "zipcode"}},
+                    ],
+                },
+            },
+        ]
+    }
+    compiled = get_compiled_schema(schema)
+    batch = compiled.generate_batch(4)
+    expected = [json.loads(json.dumps(record, cls=EnhancedJSONEncoder)) for record in batch]
+
+    assert isinstance(batch.columns[1][0], ArrayStream)
+    assert json.loads(encode("json", [batch], schema)) == expected
+    assert [json.loads(line) for line in encode("ndjson", [batch], schema).splitlines()] == expected
+    assert [len(record["items"][0]["codes"]) for record in expected] == [8] * 4
+
+
+def test_csv_rejects_array_fields():
+    with pytest.raises(ValueError, match="flat schema; nested fields: tags"):
+        OUTPUT_FORMATS["csv"].writer({"fields": [{"name": "tags", "type": "array", "items": {"type": "city"}}]})
+
+
+ALL_TYPES = {
+    "locale": "de_DE",
+    "fields": [
+        {"name": 'say "100%"', "type": "string"},
+        {"name": "email", "type": "email"},
+        {"name": "age", "type": "integer", "min": -5},
+        {"name": "score", "type": "float", "precision": 3},
+        {"name": "active", "type": "boolean"},
+        {"name": "plan", "type": "choice", "elements": ["gold", "ü", None, 1, True, 2.5]},
+        {"name": "shape", "type": "choice", "elements": [[1, 2], {"a": 1}]},
+        {"name": "joined", "type": "date"},
+        {
+            "name": "address",
+            "type": "object",
+            "children": [
+                {"name": "city", "type": "city"},
+                {"name": "geo", "type": "object", "children": [{"name": "zip", "type": "zipcode"}]},
+            ],
+        },
+        {"name": "tags", "type": "array", "items": {"type": "date"}},
+        {
+            "name": "visits",
+            "type": "array",
+            "max_length": 3,
+            "items": {
+                "type": "object",
+                "children": [
+                    {"name": "on", "type": "date"},
+                    {"name": "pages", "type": "integer"},
+                ],
+            },
+        },
+        {"name": "empty", "type": "object"},
+    ],
+}
+
+
+@pytest.mark.parametrize("seed", [None, 7])
+def test_record_encoder_matches_json_dumps(seed):
+    encoder = RecordEncoder(ALL_TYPES["fields"])
+    batch = get_compiled_schema(ALL_TYPES).generate_batch(200, seed)
+    records = list(batch)
+    expected = [json.dumps(record, cls=EnhancedJSONEncoder) for record in records]
+
+    assert encoder.encode_batch(batch) == expected
+    assert encoder.encode_batch(records) == expected
+    # Records that do not follow the schema fall back to the generic encoder
+    assert encoder.encode_batch([{"other": datetime.date(2024, 1, 2)}]) == ['{"other": "2024-01-02"}']
+    assert RecordEncoder([]).encode_batch(get_compiled_schema({"fields": []}).generate_batch(2)) == ["{}", "{}"]
@@ -0,0 +1,146 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import state_backend
+from state_backend import MemoryStateBackend, SQLiteStateBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStateBackend()
+    return SQLiteStateBackend(str(tmp_path / "state.db"))
+
+
+@pytest.fixture
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def job_state(task_id, status="queued"):
+    return {"task_id": task_id, "status": status, "records_generated": 0}
+
+
+def test_add_job_enforces_pending_limit(backend):
+    assert backend.add_job("a", job_state("a"), max_pending=2)
+    assert backend.add_job("b", job_state("b"), max_pending=2)
+    assert not backend.add_job("c", job_state("c"), max_pending=2)
+
+    backend.put_job("a", job_state("a", "completed"))
+
+    assert backend.add_job("c", job_state("c"), max_pending=2)
+    assert backend.count_jobs(["queued"]) == 2
+    assert backend.get_job("a")["status"] == "completed"
+    assert backend.get_job("missing") is None
+
+
+def test_finished_jobs_expire_after_the_status_ttl(backend, monkeypatch):
+    backend.add_job("done", job_state("done"), max_pending=5)
+    backend.put_job("done", job_state("done", "completed"))
+    backend.add_job("running", job_state("running"), max_pending=5)
+    monkeypatch.setattr(state_backend, "JOB_STATUS_TTL", -1.0)
+
+    backend.add_job("new", job_state("new"), max_pending=5)
+
+    assert backend.get_job("done") is None
+    assert backend.get_job("running")["status"] == "queued"
+
+
+def test_jobs_of_exited_workers_are_reported_as_failed(backend, monkeypatch, dead_pid):
+    monkeypatch.setattr(state_backend.os, "getpid", lambda: dead_pid)
+    backend.put_job("a", job_state("a", "in_progress"))
+    monkeypatch.undo()
+
+    assert backend.get_job("a")["status"] == "failed"
+    assert backend.count_jobs(["in_progress"]) == 0
+    assert backend.add_job("b", job_state("b"), max_pending=1)
+
+
+def test_request_cancel_cancels_queued_jobs_and_flags_running_ones(backend):
+    backend.add_job("queued", job_state("queued"), max_pending=10)
+    backend.add_job("running", job_state("running", "in_progress"), max_pending=10)
+    backend.add_job("done", job_state("done", "completed"), max_pending=10)
+
+    assert backend.request_cancel("queued")["status"] == "cancelled"
+    assert backend.request_cancel("running")["status"] == "in_progress"
+    assert backend.is_cancel_requested("running")
+    assert backend.request_cancel("done")["status"] == "completed"
+    assert not backend.is_cancel_requested("done")
+    assert backend.request_cancel("missing") is None
+
+
+def test_slots_enforce_limit_and_reclaim_exited_holders(backend, monkeypatch, dead_pid):
+    assert backend.acquire_slot("jobs", "a", limit=2)
+    assert backend.acquire_slot("jobs", "a", limit=2)
+    assert backend.acquire_slot("jobs", "b", limit=2)
+    assert not backend.acquire_slot("jobs", "c", limit=2)
+    assert backend.count_slots("jobs") == 2
+
+    backend.release_slot("jobs", "a")
+    monkeypatch.setattr(state_backend.os, "getpid", lambda: dead_pid)
+    assert backend.acquire_slot("jobs", "c", limit=2)
+    monkeypatch.undo()
+
+    assert backend.acquire_slot("jobs", "d", limit=2)
+
+
+@pytest.mark.skipif(state_backend._process_started(os.getpid()) is None, reason="needs /proc process start times")
+def test_entries_of_a_previous_process_with_a_reused_pid_are_reclaimed(backend, monkeypatch):
+    # The PID is alive, but it belongs to a process that started after the entries were written
+    monkeypatch.setattr(state_backend, "_current_owner", lambda: (os.getpid(), "previous-boot:1"))
+    backend.put_job("a", job_state("a", "in_progress"))
+    assert backend.acquire_slot("jobs", "a", limit=1)
+    monkeypatch.undo()
+
+    assert backend.get_job("a")["status"] == "failed"
+    assert backend.count_jobs(["in_progress"]) == 0
+    assert backend.acquire_slot("jobs", "b", limit=1)
+    assert backend.count_slots("jobs") == 1
+
+
+def test_token_bucket_allows_bursts_then_reports_wait(backend):
+    assert backend.consume_token("client", capacity=2, refill_rate=1.0) == 0.0
+    assert backend.consume_token("client", capacity=2, refill_rate=1.0) == 0.0
+    assert 0.0 < backend.consume_token("client", capacity=2, refill_rate=1.0) <= 1.0
+    assert backend.consume_token("other", capacity=2, refill_rate=1.0) == 0.0
+
+    backend.reset_rate_limits()
+
+    assert backend.consume_token("client", capacity=2, refill_rate=1.0) == 0.0
+
+
+def test_sqlite_state_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "state.db")
+    first, second = SQLiteStateBackend(path), SQLiteStateBackend(path)
+
+    first.add_job("a", job_state("a"), max_pending=1)
+    first.acquire_slot("jobs", "a", limit=1)
+    first.consume_token("client", capacity=1, refill_rate=0.001)
+
+    assert second.get_job("a")["status"] == "queued"
+    assert not second.add_job("b", job_state("b"), max_pending=1)
+    assert not second.acquire_slot("jobs", "b", limit=1)
+    assert second.consume_token("client", capacity=1, refill_rate=0.001) > 0
+
+
+def test_unknown_state_backend_is_rejected(monkeypatch):
+    monkeypatch.setattr(state_backend, "STATE_BACKEND", "redis")
+    monkeypatch.setattr(state_backend, "_state_backend", None)
+
+    with pytest.raises(ValueError, match="Unknown state backend 'redis'"):
+        state_backend.get_state_backend()
+
+
+def test_blocking_backends_are_called_from_a_worker_thread(tmp_path):
+    async def thread_of(backend):
+        return await backend.call(threading.current_thread)
+
+    assert asyncio.run(thread_of(MemoryStateBackend())) is threading.main_thread()
+    assert asyncio.run(thread_of(SQLiteStateBackend(str(tmp_path / "state.db")))) is not threading.main_thread()
@@ -0,0 +1,230 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import cli
+import generation_engine
+import uniqueness
+from columnar import ColumnBatch
+from generation_engine import generate_records, iter_record_batches
+from uniqueness import BitsetTracker, BloomTracker, FingerprintTracker, UniqueFilter, create_tracker
+
+SCHEMA = {
+    "fields": [
+        {"name": "id", "type": "integer", "min": 1, "max": 300, "unique": True},
+        {"name": "email", "type": "email", "unique": True},
+        {"name": "name", "type": "string"},
+    ]
+}
+
+
+@pytest.fixture
+def in_process(monkeypatch):
+    monkeypatch.setattr(generation_engine, "GENERATION_WORKERS", 1)
+
+
+@pytest.fixture
+def process_pool(monkeypatch):
+    monkeypatch.setattr(generation_engine, "GENERATION_WORKERS", 2)
+    yield
+    generation_engine.shutdown_generation_pool()
+
+
+def assert_unique(records, *names):
+    for name in names:
+        assert len({record[name] for record in records}) == len(records)
+
+
+@pytest.mark.parametrize("seed", [None, 5])
+def test_unique_fields_hold_across_batches(in_process, seed):
+    records = generate_records(SCHEMA, 300, batch_size=40, seed=seed)
+
+    assert len(records) == 300
+    assert sorted(record["id"] for record in records) == list(range(1, 301))
+    assert_unique(records, "email")
+
+
+def test_unique_fields_hold_across_workers(process_pool):
+    records = generate_records(SCHEMA, 300, batch_size=25)
+
+    assert sorted(record["id"] for record in records) == list(range(1, 301))
+
+
+def test_seeded_unique_output_is_reproducible(in_process):
+    assert generate_records(SCHEMA, 100, batch_size=30, seed=3) == generate_records(SCHEMA, 100, batch_size=30, seed=3)
+
+
+@pytest.mark.parametrize(
+    "field, num_records",
+    [
+        ({"name": "id", "type": "integer", "min": 1, "max": 10}, 11),
+        ({"name": "active", "type": "boolean"}, 3),
+        ({"name": "plan", "type": "choice", "elements": ["a", "b", "c"], "weights": [1, 1, 0]}, 3),
+        ({"name": "day", "type": "date", "start": "2024-01-01", "end": "2024-01-31"}, 32),
+        ({"name": "price", "type": "float", "min": 0, "max": 1, "precision": 1}, 12),
+    ],
+)
+def test_too_few_values_fail_before_generating(field, num_records):
+    schema = {"fields": [{**field, "unique": True}]}
+
+    with pytest.raises(ValueError, match="unique values exist"):
+        iter_record_batches(schema, num_records)
+
+
+@pytest.mark.parametrize(
+    "schema, message",
+    [
+        ({"fields": [{"name": "a", "type": "object", "unique": True, "children": []}]}, "cannot be unique"),
+        (
+            {"fields": [{"name": "a", "type": "object", "children": [{"name": "b", "type": "city", "unique": True}]}]},
+            "only top-level",
+        ),
+    ],
+)
+def test_untrackable_fields_are_rejected(schema, message):
+    with pytest.raises(ValueError, match=message):
+        iter_record_batches(schema, 10)
+
+
+def test_exhausted_unbounded_field_raises(monkeypatch):
+    monkeypatch.setattr(uniqueness, "UNIQUE_MAX_REJECTIONS", 5)
+    unique_filter = UniqueFilter([{"name": "code", "type": "zipcode"}], 10)
+
+    assert unique_filter.select([{"code": "a"}, {"code": "b"}, {"code": "a"}]) == [0, 1]
+    with pytest.raises(ValueError, match="Field 'code': ran out of unique values after 2"):
+        unique_filter.select([{"code": "b"}] * 5)
+
+
+def test_filter_keeps_values_of_rejected_rows_available():
+    unique_filter = UniqueFilter([{"name": "a", "type": "string"}, {"name": "b", "type": "string"}], 10)
+    batch = ColumnBatch(("a", "b"), [["x", "x", "y"], ["1", "2", "2"]], 3)
+
+    accepted = unique_filter.select(batch)
+
+    # The second row repeats "x"; its "2" was not taken, so the third row keeps it
+    assert accepted == [0, 2]
+    assert list(batch.take(accepted)) == [{"a": "x", "b": "1"}, {"a": "y", "b": "2"}]
+
+
+def test_seeded_replacements_come_from_a_separate_stream(monkeypatch):
+    monkeypatch.setattr(uniqueness, "UNIQUE_MAX_REJECTIONS", 250)
+    calls = []
+
+    def generate(count, start, seed):
+        calls.append((count, start, seed))
+        yield [{"code": "a"}] * count
+
+    unique_filter = UniqueFilter([{"name": "code", "type": "string"}], 3)
+    batches = unique_filter.apply(generate, 3, start=50, seed=7)
+    with pytest.raises(ValueError, match="ran out of unique values"):
+        list(batches)
+
+    assert calls[0] == (3, 50, 7)
+    assert calls[1][:2] == (100, 50)
+    assert calls[1][2] not in (None, 7)
+    assert calls[2] == (100, 150, calls[1][2])
+
+
+def test_saturated_bounded_fields_draw_free_values():
+    unique_filter = UniqueFilter([{"name": "id", "type": "integer", "min": 1, "max": 1000}], 1000)
+    unique_filter.select([{"id": value} for value in range(1, 601)])
+
+    batch = ColumnBatch(("id",), [[1] * 400], 400)
+    accepted = unique_filter.select(batch)
+
+    assert accepted == list(range(400))
+    assert sorted(batch.columns[0]) == list(range(601, 1001))
+    assert unique_filter.select([{"id": 5}]) == []
+
+
+def test_filling_a_range_needs_few_extra_candidates(in_process, monkeypatch):
+    schema = {"fields": [{"name": "id", "type": "integer", "min": 1, "max": 5000, "unique": True}]}
+    generated = []
+    generate_batch = generation_engine._generate_batch
+
+    def count_records(schema, num_records, seed, start):
+        generated.append(num_records)
+        return generate_batch(schema, num_records, seed, start)
+
+    monkeypatch.setattr(generation_engine, "_generate_batch", count_records)
+    records = generate_records(schema, 5000, batch_size=500, seed=1)
+
+    assert sorted(record["id"] for record in records) == list(range(1, 5001))
+    # Rejection sampling alone would need about 5000 * ln(5000), over 40000 candidates
+    assert sum(generated) < 10000
+
+
+def test_bitset_draws_are_uniform_over_free_values():
+    tracker = BitsetTracker(0, 2999)
+    for value in range(0, 3000, 2):
+        tracker.insert(value)
+    rng = uniqueness.random.Random(0)
+
+    draws = [tracker.draw(rng) for _ in range(30000)]
+
+    assert all(value % 2 == 1 for value in draws)
+    assert len(set(draws)) == 1500
+    assert max(draws.count(value) for value in set(draws)) < 60
+    for value in sorted(set(draws)):
+        tracker.insert(value)
+    assert tracker.count == tracker.cardinality and not tracker.saturated
+
+
+@pytest.mark.parametrize(
+    "tracker",
+    [BitsetTracker(-5, 1000), BloomTracker(1000, 0.01), FingerprintTracker()],
+    ids=["bitset", "bloom", "fingerprints"],
+)
+def test_trackers_remember_added_values(tracker):
+    for value in range(-5, 1000, 3):
+        tracker.insert(tracker.key(value))
+
+    assert all(tracker.has(tracker.key(value)) for value in range(-5, 1000, 3))
+    assert tracker.count == 335
+
+
+def test_bloom_filter_false_positive_rate():
+    tracker = BloomTracker(10000, 0.01)
+    for value in range(10000):
+        tracker.insert(tracker.key(f"value-{value}"))
+
+    false_positives = sum(tracker.has(tracker.key(f"other-{value}")) for value in range(10000))
+
+    assert false_positives < 200
+
+
+def test_large_ranges_use_a_bloom_filter(monkeypatch):
+    monkeypatch.setattr(uniqueness, "UNIQUE_BITSET_MAX_BYTES", 1024)
+
+    small = create_tracker({"name": "id", "type": "integer", "max": 8192}, 100)
+    large = create_tracker({"name": "id", "type": "integer", "max": 10**12}, 100)
+
+    assert isinstance(small, BitsetTracker)
+    assert isinstance(large, BloomTracker)
+    assert large.cardinality == 10**12
+
+
+def test_api_rejects_impossible_unique_fields(in_process):
+    api.limiter.reset()
+    schema = {"fields": [{"name": "id", "type": "integer", "max": 5, "unique": True}]}
+
+    with TestClient(api.app) as client:
+        response = client.post("/generate-batch", params={"num_records": 6}, json=schema)
+        ok = client.post("/generate-batch", params={"num_records": 5}, json=schema)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Field 'id': only 5 unique values exist, but 6 records were requested"
+    assert sorted(record["id"] for record in json.loads(ok.text)) == [1, 2, 3, 4, 5]
+
+
+def test_cli_keeps_unique_fields_unique_across_shards(in_process, tmp_path):
+    schema = {"fields": [{"name": "id", "type": "integer", "max": 50, "unique": True}]}
+    output_dir = tmp_path / "out"
+
+    shards = cli.generate_shards(schema, 50, str(output_dir), shards=3, workers=2, batch_size=8)
+
+    records = [json.loads(line) for shard in shards for line in (output_dir / shard["file"]).read_text().splitlines()]
+    assert [shard["records"] for shard in shards] == [17, 17, 16]
+    assert sorted(record["id"] for record in records) == list(range(1, 51))
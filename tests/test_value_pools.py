@@ -0,0 +1,58 @@
+import random
+
+from faker_data_generation_service import get_compiled_schema
+from value_pools import ValuePoolRegistry, value_pools
+
+
+def make_registry(**kwargs):
+    options = {"pool_size": 20, "initial_size": 5, "refresh_interval": 3600, "refresh_fraction": 0.5}
+    options.update(kwargs)
+    return ValuePoolRegistry(**options)
+
+
+def test_pool_is_prefilled_and_grown_in_refresh():
+    registry = make_registry()
+    pool = registry.get_pool("first_name", modules=["faker.providers.person"])
+
+    assert len(pool.values) == 5
+    registry.refresh()
+    assert len(pool.values) == 20
+    assert pool.sample(random.Random(0)) in pool.values
+    assert all(value in pool.values for value in pool.sample_column(random.Random(0), 50))
+    registry.stop()
+
+
+def test_sampled_pools_are_refreshed():
+    registry = make_registry(initial_size=20)
+    pool = registry.get_pool("city", modules=["faker.providers.person", "faker.providers.address"])
+    before = list(pool.values)
+
+    pool.sample(random.Random(0))
+    registry.refresh()
+
+    assert len(pool.values) == 20
+    assert pool.values[10:] == before[10:]
+    registry.stop()
+
+
+def test_least_recently_used_pool_is_evicted():
+    registry = make_registry(initial_size=20, memory_limit=1)
+    city = registry.get_pool("city", modules=["faker.providers.person", "faker.providers.address"])
+    registry.get_pool("first_name", modules=["faker.providers.person"])
+
+    registry.evict()
+
+    assert city.values == []
+    # Sampling an evicted pool transparently refills it
+    assert isinstance(city.sample(random.Random(0)), str)
+    assert len(city.values) == 20
+    registry.stop()
+
+
+def test_pooled_schema_samples_from_pools():
+    schema = {"fields": [{"name": "name", "type": "string"}, {"name": "age", "type": "integer"}], "pooled": True}
+    compiled = get_compiled_schema(schema)
+    names = value_pools.get_pool("first_name").values
+
+    assert all(record["name"] in names for record in compiled.generate(20))
+    assert all(record["name"] in names for record in compiled.generate_batch(20))
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import websocket_handler
+from app import app
+
+SCHEMA = {"fields": [{"name": "name", "type": "string"}, {"name": "age", "type": "integer"}]}
+
+
+def test_subscribe_pushes_batches_until_stopped():
+    with TestClient(app) as client, client.websocket_connect("/ws") as websocket:
+        websocket.send_json({"action": "subscribe", "schema": SCHEMA, "rate": 10000, "batch_size": 50})
+        assert websocket.receive_json() == {"type": "subscribed", "rate": 10000.0, "batch_size": 50}
+
+        frames = [json.loads(websocket.receive_text()) for _ in range(3)]
+        assert [frame["sequence"] for frame in frames] == [0, 1, 2]
+        assert all(len(frame["records"]) == 50 for frame in frames)
+        assert set(frames[0]["records"][0]) == {"name", "age"}
+
+        websocket.send_json({"action": "stop"})
+        while (message := websocket.receive_json())["type"] == "batch":
+            frames.append(message)
+        assert message["type"] == "stopped"
+        # Every frame queued before the stop request is delivered and counted
+        assert message["records_sent"] == 50 * len(frames)
+
+
+def test_subscribe_rejects_invalid_messages():
+    with TestClient(app) as client, client.websocket_connect("/ws") as websocket:
+        websocket.send_json({"action": "subscribe", "schema": SCHEMA, "rate": -1})
+        assert websocket.receive_json()["type"] == "error"
+
+        unique_schema = {"fields": [{"name": "id", "type": "integer", "unique": True}]}
+        websocket.send_json({"action": "subscribe", "schema": unique_schema})
+        assert websocket.receive_json() == {
+            "type": "error",
+            "detail": "Unique fields are not supported in subscriptions",
+        }
+
+        websocket.send_text("generate")
+        assert websocket.receive_json() == {"type": "error", "detail": "Unknown command: generate"}
+
+        websocket.send_json({"action": "stop"})
+        assert websocket.receive_json() == {"type": "stopped", "records_sent": 0}
+
+
+def test_generation_errors_close_the_socket_with_an_error(monkeypatch):
+    def fail(self, sequence):
+        raise RuntimeError("generator exploded")
+
+    monkeypatch.setattr(websocket_handler.Subscription, "_encode_frame", fail)
+    with TestClient(app) as client, client.websocket_connect("/ws") as websocket:
+        websocket.send_json({"action": "subscribe", "schema": SCHEMA})
+        assert websocket.receive_json()["type"] == "subscribed"
+        assert websocket.receive_json() == {"type": "error", "detail": "generator exploded"}
+        with pytest.raises(WebSocketDisconnect) as disconnect:
+            websocket.receive_json()
+        assert disconnect.value.code == 1011
@@ -0,0 +1,505 @@
+import datetime
+import hashlib
+import math
+import os
+import random
+from typing import Any, Callable, Dict, Generator, Iterator, List, Optional, Sequence, Set, Union
+
+from columnar import (
+    ColumnBatch,
+    boolean_probability,
+    choice_elements,
+    date_range,
+    float_range,
+    integer_range,
+    take_rows,
+)
+
+# Largest bitset, in bytes, used to track a bounded integer, float or date field; larger value
+# spaces are tracked with a Bloom filter
+UNIQUE_BITSET_MAX_BYTES = int(os.environ.get("FAKEIT_UNIQUE_BITSET_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Probability that the Bloom filter of an unbounded field takes a new value for a duplicate. Such
+# values are regenerated, so duplicates are never emitted. 0 tracks exact fingerprints instead,
+# which takes about ten times the memory.
+UNIQUE_FALSE_POSITIVE_RATE = float(os.environ.get("FAKEIT_UNIQUE_FALSE_POSITIVE_RATE", "0.001"))
+
+# Consecutive candidate records without a new value after which an unbounded field counts as exhausted
+UNIQUE_MAX_REJECTIONS = int(os.environ.get("FAKEIT_UNIQUE_MAX_REJECTIONS", "10000"))
+
+# Smallest number of candidate records generated at a time to replace rejected ones
+MIN_REFILL_RECORDS = 100
+
+# Fill ratio of a bitset tracked field above which a repeated value is replaced by one drawn from
+# the values not taken yet, instead of regenerating the whole record
+UNIQUE_DRAW_FILL_RATIO = 0.5
+
+# Number of bitset bytes per block of the index used to draw values that are not taken yet
+DRAW_BLOCK_BYTES = 64
+
+# Smallest number of values a Bloom filter is sized for
+MIN_BLOOM_CAPACITY = 1024
+
+# Field types whose values cannot be tracked
+UNTRACKABLE_TYPES = ("object", "array")
+
+Batch = Sequence[Dict[str, Any]]
+
+
+class BitsetTracker:
+    """
+    Tracks values of a bounded integer range with one bit per possible value.
+
+    Once most values are taken, picking a value that is still free is much cheaper than generating
+    records until one comes up. ``draw`` then picks uniformly among the free values, using a
+    Fenwick tree of the free values per block of the bitset that is built on first use.
+    """
+
+    def __init__(self, low: int, high: int, key: Callable[[Any], int] = int, value: Callable[[int], Any] = int) -> None:
+        self.low = low
+        self.cardinality = high - low + 1
+        self.to_int = key
+        self.from_int = value
+        self.bits = bytearray((self.cardinality + 7) // 8)
+        self.count = 0
+        self._free_blocks: Optional[List[int]] = None
+
+    def key(self, value: Any) -> int:
+        return self.to_int(value) - self.low
+
+    def value(self, offset: int) -> Any:
+        return self.from_int(offset + self.low)
+
+    def has(self, offset: int) -> bool:
+        return bool(self.bits[offset >> 3] & (1 << (offset & 7)))
+
+    def insert(self, offset: int) -> None:
+        self.bits[offset >> 3] |= 1 << (offset & 7)
+        self.count += 1
+        if self._free_blocks is not None:
+            self._add_free(offset // (DRAW_BLOCK_BYTES * 8), -1)
+
+    @property
+    def saturated(self) -> bool:
+        # A full range has nothing left to draw; its repeated values are rejected
+        return self.cardinality * UNIQUE_DRAW_FILL_RATIO <= self.count < self.cardinality
+
+    def draw(self, rng: random.Random) -> int:
+        """
+        Pick one of the values that are not taken yet, uniformly, without taking it.
+
+        Returns:
+            int: The offset of the value, see ``key``.
+        """
+        if self._free_blocks is None:
+            self._build_free_blocks()
+        tree = self._free_blocks
+        assert tree is not None
+        # Descend the Fenwick tree to the block that holds the rank-th free value
+        rank = rng.randrange(self.cardinality - self.count)
+        block = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            if block + step < len(tree) and tree[block + step] <= rank:
+                block += step
+                rank -= tree[block]
+            step >>= 1
+        offset = block * DRAW_BLOCK_BYTES * 8
+        while True:
+            free = ~self.bits[offset >> 3] & 0xFF
+            if rank < free.bit_count():
+                while rank or not free & 1:
+                    rank -= free & 1
+                    free >>= 1
+                    offset += 1
+                return offset
+            rank -= free.bit_count()
+            offset += 8
+
+    def _build_free_blocks(self) -> None:
+        block_bits = DRAW_BLOCK_BYTES * 8
+        blocks = (len(self.bits) + DRAW_BLOCK_BYTES - 1) // DRAW_BLOCK_BYTES
+        # Fenwick trees are indexed from 1; the padding bits after the last value count as taken
+        tree = [0] * (blocks + 1)
+        for block in range(blocks):
+            chunk = self.bits[block * DRAW_BLOCK_BYTES : (block + 1) * DRAW_BLOCK_BYTES]
+            size = min(block_bits, self.cardinality - block * block_bits)
+            tree[block + 1] = size - int.from_bytes(chunk, "little").bit_count()
+        for index in range(1, blocks + 1):
+            parent = index + (index & -index)
+            if parent <= blocks:
+                tree[parent] += tree[index]
+        self._free_blocks = tree
+
+    def _add_free(self, block: int, delta: int) -> None:
+        tree = self._free_blocks
+        assert tree is not None
+        index = block + 1
+        while index < len(tree):
+            tree[index] += delta
+            index += index & -index
+
+
+class SetTracker:
+    """Tracks the values of a field with a small, known set of values."""
+
+    def __init__(self, cardinality: int) -> None:
+        self.cardinality = cardinality
+        self.values: Set[str] = set()
+        self.count = 0
+
+    def key(self, value: Any) -> str:
+        # Choice elements may be unhashable lists or objects
+        return repr(value)
+
+    def has(self, key: str) -> bool:
+        return key in self.values
+
+    def insert(self, key: str) -> None:
+        self.values.add(key)
+        self.count += 1
+
+
+def _fingerprint(value: Any) -> bytes:
+    return hashlib.blake2b(repr(value).encode(), digest_size=16).digest()
+
+
+class BloomTracker:
+    """
+    Tracks values of an unbounded field in a Bloom filter.
+
+    The filter is sized for ``capacity`` values at the given false positive rate. A false positive
+    rejects a new value, so it costs a regenerated record but never lets a duplicate through.
+    """
+
+    cardinality: Optional[int] = None
+
+    def __init__(self, capacity: int, false_positive_rate: float) -> None:
+        capacity = max(capacity, MIN_BLOOM_CAPACITY)
+        self.size = max(64, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def key(self, value: Any) -> List[int]:
+        # Double hashing: the bit positions are derived from the two halves of one digest
+        digest = _fingerprint(value)
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return [(first + i * second) % size for i in range(self.hashes)]
+
+    def has(self, positions: List[int]) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in positions)
+
+    def insert(self, positions: List[int]) -> None:
+        bits = self.bits
+        for position in positions:
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+
+class FingerprintTracker:
+    """Tracks values of an unbounded field exactly, by a 64-bit fingerprint of each value."""
+
+    cardinality: Optional[int] = None
+
+    def __init__(self) -> None:
+        self.fingerprints: Set[int] = set()
+        self.count = 0
+
+    def key(self, value: Any) -> int:
+        return int.from_bytes(_fingerprint(value)[:8], "little")
+
+    def has(self, fingerprint: int) -> bool:
+        return fingerprint in self.fingerprints
+
+    def insert(self, fingerprint: int) -> None:
+        self.fingerprints.add(fingerprint)
+        self.count += 1
+
+
+Tracker = Union[BitsetTracker, SetTracker, BloomTracker, FingerprintTracker]
+
+
+def _bounded_tracker(
+    low: int, high: int, key: Callable[[Any], int], value: Callable[[int], Any], capacity: int
+) -> Tracker:
+    if (high - low + 1) // 8 <= UNIQUE_BITSET_MAX_BYTES:
+        return BitsetTracker(low, high, key, value)
+    tracker = _unbounded_tracker(capacity)
+    # The value space is still known, so running out of it is detected before generating
+    tracker.cardinality = high - low + 1
+    return tracker
+
+
+def _unbounded_tracker(capacity: int) -> Tracker:
+    if UNIQUE_FALSE_POSITIVE_RATE <= 0:
+        return FingerprintTracker()
+    return BloomTracker(capacity, UNIQUE_FALSE_POSITIVE_RATE)
+
+
+def create_tracker(field: Dict[str, Any], capacity: int) -> Tracker:
+    """
+    Create the tracker for the values of a unique field.
+
+    Args:
+        field (Dict[str, Any]): The field definition.
+        capacity (int): The number of values the tracker has to hold.
+
+    Returns:
+        Tracker: An exact tracker for bounded value spaces, a Bloom filter or fingerprint set otherwise.
+
+    Raises:
+        ValueError: If the field options are invalid or its values cannot be unique.
+    """
+    field_type = field.get("type")
+    if field_type == "integer":
+        low, high = integer_range(field)
+        return _bounded_tracker(low, high, int, int, capacity)
+    if field_type == "float":
+        minimum, maximum, precision = float_range(field)
+        scale = 10**precision
+        return _bounded_tracker(
+            round(minimum * scale),
+            round(maximum * scale),
+            lambda value: round(value * scale),
+            lambda scaled: round(scaled / scale, precision),
+            capacity,
+        )
+    if field_type == "date":
+        start, end = date_range(field)
+        return _bounded_tracker(
+            start.toordinal(), end.toordinal(), datetime.date.toordinal, datetime.date.fromordinal, capacity
+        )
+    if field_type == "boolean":
+        probability = boolean_probability(field)
+        return SetTracker(2 if 0.0 < probability < 1.0 else 1)
+    if field_type == "choice":
+        elements, weights = choice_elements(field)
+        if weights is not None:
+            elements = tuple(element for element, weight in zip(elements, weights) if weight > 0)
+        return SetTracker(len({repr(element) for element in elements}))
+    if field_type in UNTRACKABLE_TYPES or field.get("children"):
+        raise ValueError(f"Field '{field.get('name')}': fields of type '{field_type}' cannot be unique")
+    return _unbounded_tracker(capacity)
+
+
+def unique_fields(schema: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Return the top-level fields of a schema that are marked ``unique``.
+
+    Raises:
+        ValueError: If a nested field is marked unique.
+    """
+
+    def check_nested(fields: List[Dict[str, Any]]) -> None:
+        for field in fields:
+            if field.get("unique"):
+                raise ValueError(f"Field '{field.get('name')}': only top-level fields can be unique")
+            check_nested(field.get("children") or [])
+
+    fields = schema.get("fields") or []
+    for field in fields:
+        check_nested(field.get("children") or [])
+    return [field for field in fields if field.get("unique")]
+
+
+def check_unique_fields(schema: Dict[str, Any], num_records: int) -> None:
+    """
+    Check that enough unique values exist for the unique fields of a schema.
+
+    This only inspects the field options, so it is cheap enough to call before accepting a request.
+
+    Args:
+        schema (Dict[str, Any]): The schema definition as a dictionary.
+        num_records (int): The number of records to generate.
+
+    Raises:
+        ValueError: If a unique field cannot be tracked or has fewer possible values than records.
+    """
+    for field in unique_fields(schema):
+        cardinality = _cardinality(field)
+        if cardinality is not None and num_records > cardinality:
+            raise ValueError(
+                f"Field '{field['name']}': only {cardinality} unique values exist, "
+                f"but {num_records} records were requested"
+            )
+
+
+def _cardinality(field: Dict[str, Any]) -> Optional[int]:
+    field_type = field.get("type")
+    if field_type == "integer":
+        low, high = integer_range(field)
+        return high - low + 1
+    if field_type == "float":
+        minimum, maximum, precision = float_range(field)
+        return round(maximum * 10**precision) - round(minimum * 10**precision) + 1
+    if field_type == "date":
+        start, end = date_range(field)
+        return (end - start).days + 1
+    # Other trackers are cheap to create empty, and raise for fields that cannot be unique
+    return create_tracker(field, 0).cardinality
+
+
+class UniqueFilter:
+    """
+    Drops generated records that repeat a value of a unique field.
+
+    The filter runs where batches are consumed, so it sees the output of every worker process
+    and uniqueness holds across all batches of one request or job. Rejected records are replaced
+    by generating more candidates. Seeded candidates come from a separate stream derived from the
+    seed, so they never repeat records of the same dataset at other indices, and seeded output
+    stays reproducible.
+
+    Once a field tracked by a bitset is mostly taken, a repeated value is replaced in place by a
+    value drawn from the ones still free, so filling a range completely takes no more candidates
+    than it has values.
+    """
+
+    def __init__(self, fields: List[Dict[str, Any]], num_records: int) -> None:
+        self.names = [field["name"] for field in fields]
+        self.trackers = [create_tracker(field, num_records) for field in fields]
+        self.rejections = 0
+        self.random = random.Random()
+
+    def select(self, batch: Batch) -> List[int]:
+        """
+        Track the values of a batch and return the indices of the rows with only new values.
+
+        Repeated values of saturated bitset fields are replaced in the batch by free values.
+
+        Args:
+            batch (Batch): A column batch or a list of records.
+
+        Returns:
+            List[int]: The indices of the accepted rows, in order.
+
+        Raises:
+            ValueError: If an unbounded field produced no new value for ``UNIQUE_MAX_REJECTIONS`` records.
+        """
+        columns = [self._column(batch, name) for name in self.names]
+        trackers = self.trackers
+        accepted = []
+        for index, values in enumerate(zip(*columns)):
+            keys: List[Any] = [tracker.key(value) for tracker, value in zip(trackers, values)]
+            taken = [position for position, (tracker, key) in enumerate(zip(trackers, keys)) if tracker.has(key)]
+            drawn = []
+            for position in taken:
+                tracker = trackers[position]
+                if isinstance(tracker, BitsetTracker) and tracker.saturated:
+                    keys[position] = tracker.draw(self.random)
+                    drawn.append(position)
+            if len(drawn) == len(taken):
+                for tracker, key in zip(trackers, keys):
+                    tracker.insert(key)
+                for position in drawn:
+                    tracker = trackers[position]
+                    assert isinstance(tracker, BitsetTracker)
+                    self._set_value(batch, self.names[position], index, tracker.value(keys[position]))
+                accepted.append(index)
+                self.rejections = 0
+            elif any(trackers[position].cardinality is None for position in taken):
+                # Bounded fields always find their remaining values eventually, unbounded ones may not
+                self.rejections += 1
+                if self.rejections >= UNIQUE_MAX_REJECTIONS:
+                    position = next(position for position in taken if trackers[position].cardinality is None)
+                    raise ValueError(
+                        f"Field '{self.names[position]}': ran out of unique values after {trackers[position].count}; "
+                        f"the last {self.rejections} generated values were all duplicates"
+                    )
+        return accepted
+
+    def apply(
+        self,
+        generate: Callable[[int, int, Optional[int]], Iterator[Batch]],
+        num_records: int,
+        start: int = 0,
+        seed: Optional[int] = None,
+    ) -> Generator[Batch, None, None]:
+        """
+        Filter generated batches until ``num_records`` records with unique values were yielded.
+
+        Args:
+            generate (Callable[[int, int, Optional[int]], Iterator[Batch]]): Generates a number of
+                records from a start index with a seed.
+            num_records (int): The number of records to yield.
+            start (int): The index of the first record.
+            seed (Optional[int]): The dataset seed, or None for unseeded output.
+
+        Yields:
+            Batch: The filtered batches, without empty ones.
+        """
+        replacement_seed = None
+        if seed is not None:
+            replacement_seed = _derived_seed(seed, "replacements")
+            self.random = random.Random(_derived_seed(seed, f"draws:{start}"))
+        missing = num_records
+        # Replacements are numbered from the start of the request in their own stream
+        next_start = start
+        batches = generate(num_records, start, seed)
+        while True:
+            try:
+                for batch in batches:
+                    accepted = self.select(batch)
+                    if len(accepted) > missing:
+                        accepted = accepted[:missing]
+                    if not accepted:
+                        continue
+                    missing -= len(accepted)
+                    yield batch if len(accepted) == len(batch) else take_rows(batch, accepted)
+                    if missing == 0:
+                        return
+            finally:
+                close = getattr(batches, "close", None)
+                if close is not None:
+                    close()
+            if missing == 0:
+                return
+            count = max(missing, MIN_REFILL_RECORDS)
+            batches = generate(count, next_start, replacement_seed)
+            next_start += count
+
+    @staticmethod
+    def _set_value(batch: Batch, name: str, row: int, value: Any) -> None:
+        if isinstance(batch, ColumnBatch):
+            # Generated columns are lists
+            column = batch.columns[batch.names.index(name)]
+            assert isinstance(column, list)
+            column[row] = value
+        else:
+            batch[row][name] = value
+
+    @staticmethod
+    def _column(batch: Batch, name: str) -> Sequence[Any]:
+        if isinstance(batch, ColumnBatch):
+            return batch.columns[batch.names.index(name)]
+        return [record[name] for record in batch]
+
+
+def _derived_seed(seed: int, stream: str) -> int:
+    # A 64-bit seed for a separate stream of random values that depends on the dataset seed
+    digest = hashlib.blake2b(f"{seed}:{stream}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def unique_filter(schema: Dict[str, Any], num_records: int) -> Optional[UniqueFilter]:
+    """
+    Create the filter that keeps the unique fields of a schema unique.
+
+    Args:
+        schema (Dict[str, Any]): The schema definition as a dictionary.
+        num_records (int): The number of records to generate.
+
+    Returns:
+        Optional[UniqueFilter]: The filter, or None if the schema has no unique fields.
+
+    Raises:
+        ValueError: If a unique field cannot be tracked or has fewer possible values than records.
+    """
+    check_unique_fields(schema, num_records)
+    fields = unique_fields(schema)
+    if not fields:
+        return None
+    return UniqueFilter(fields, num_records)
@@ -0,0 +1,210 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from itertools import repeat
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from faker_registry import DEFAULT_LOCALE, create_faker, ensure_providers
+
+if TYPE_CHECKING:  # pragma: no cover
+    from faker import Faker
+
+# Number of values kept per provider once a pool is fully grown
+POOL_SIZE = int(os.environ.get("FAKEIT_POOL_SIZE", "10000"))
+
+# Number of values generated synchronously when a pool is first used
+POOL_INITIAL_SIZE = int(os.environ.get("FAKEIT_POOL_INITIAL_SIZE", "256"))
+
+# Seconds between background passes that grow and refresh pools
+POOL_REFRESH_INTERVAL = float(os.environ.get("FAKEIT_POOL_REFRESH_INTERVAL", "1.0"))
+
+# Fraction of a pool replaced with fresh values on each pass, for pools sampled since the last pass
+POOL_REFRESH_FRACTION = float(os.environ.get("FAKEIT_POOL_REFRESH_FRACTION", "0.05"))
+
+# Maximum total size of all pools in bytes; least recently used pools are evicted above it
+POOL_MEMORY_LIMIT = int(os.environ.get("FAKEIT_POOL_MEMORY_LIMIT", str(64 * 1024 * 1024)))
+
+# Number of values generated per provider call batch by the background thread
+_REFILL_CHUNK = 500
+
+
+class ValuePool:
+    """
+    A pool of pre-generated values for one Faker provider.
+
+    Values are sampled by index, which is far cheaper than calling the provider. The list is
+    only ever grown or updated in place, so sampling is safe while the background thread
+    refreshes it.
+    """
+
+    def __init__(self, registry: "ValuePoolRegistry", provider: str, locale: str, modules: Tuple[str, ...]) -> None:
+        self.registry = registry
+        self.provider = provider
+        self.locale = locale
+        self.modules = modules
+        self.values: List[Any] = []
+        self.nbytes = 0
+        self.sampled = False
+        self._cursor = 0
+
+    def sample(self, rng: Any) -> Any:
+        values = self.values
+        if not values:
+            values = self.registry.restore(self)
+        self.sampled = True
+        return values[int(rng.random() * len(values))]
+
+    def sample_column(self, rng: Any, num_records: int) -> List[Any]:
+        values = self.values
+        if not values:
+            values = self.registry.restore(self)
+        self.sampled = True
+        return rng.choices(values, k=num_records)
+
+    def extend(self, new_values: List[Any]) -> None:
+        self.values.extend(new_values)
+        self.nbytes += sum(map(sys.getsizeof, new_values))
+
+    def replace(self, new_values: List[Any]) -> None:
+        # Overwrite the oldest values in a round-robin fashion
+        values = self.values
+        for value in new_values:
+            index = self._cursor % len(values)
+            self.nbytes += sys.getsizeof(value) - sys.getsizeof(values[index])
+            values[index] = value
+            self._cursor += 1
+
+    def clear(self) -> None:
+        self.values = []
+        self.nbytes = 0
+        self._cursor = 0
+
+
+class ValuePoolRegistry:
+    """
+    Keeps one value pool per provider and refreshes them in a background thread.
+
+    Pools are kept per locale and filled from dedicated Faker instances so that background
+    refills never touch the random state used by request handlers.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = POOL_SIZE,
+        initial_size: int = POOL_INITIAL_SIZE,
+        refresh_interval: float = POOL_REFRESH_INTERVAL,
+        refresh_fraction: float = POOL_REFRESH_FRACTION,
+        memory_limit: int = POOL_MEMORY_LIMIT,
+    ) -> None:
+        self.pool_size = pool_size
+        self.initial_size = min(initial_size, pool_size)
+        self.refresh_interval = refresh_interval
+        self.refresh_fraction = refresh_fraction
+        self.memory_limit = memory_limit
+        self._fakers: Dict[str, "Faker"] = {}
+        # Pool objects are kept for the life of the registry so compiled plans can hold on to
+        # them; only their values are dropped when they are evicted from the active set.
+        self._all_pools: Dict[Tuple[str, str], ValuePool] = {}
+        self._pools: "OrderedDict[Tuple[str, str], ValuePool]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._stop = threading.Event()
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(pool.nbytes for pool in self._pools.values())
+
+    def get_pool(self, provider: str, locale: Optional[str] = None, modules: Iterable[str] = ()) -> ValuePool:
+        """
+        Return the pool for a provider, creating and pre-filling it on first use.
+
+        Args:
+            provider (str): The name of the Faker provider method, e.g. "first_name".
+            locale (Optional[str]): The locale of the generated values.
+            modules (Iterable[str]): The Faker provider modules the method needs.
+
+        Returns:
+            ValuePool: The pool for the provider.
+        """
+        key = (locale or DEFAULT_LOCALE, provider)
+        with self._lock:
+            pool = self._all_pools.get(key)
+            if pool is None:
+                pool = self._all_pools[key] = ValuePool(self, provider, key[0], tuple(modules))
+            self._pools[key] = pool
+            self._pools.move_to_end(key)
+            if not pool.values:
+                pool.extend(self._generate(pool, self.initial_size))
+        self._ensure_thread()
+        return pool
+
+    def restore(self, pool: ValuePool) -> List[Any]:
+        # Called when a compiled plan samples a pool whose values were evicted
+        return self.get_pool(pool.provider, pool.locale, pool.modules).values
+
+    def refresh(self) -> None:
+        """
+        Run one refresh pass: grow pools towards their full size, replace a fraction of the
+        values of recently sampled pools and evict pools above the memory limit.
+        """
+        with self._lock:
+            pools = list(self._pools.values())
+            # Sampling does not take the lock, so recency is tracked once per pass
+            for pool in pools:
+                if pool.sampled:
+                    self._pools.move_to_end((pool.locale, pool.provider))
+        for pool in pools:
+            if len(pool.values) < self.pool_size:
+                new_values = self._generate(pool, min(_REFILL_CHUNK, self.pool_size - len(pool.values)))
+                with self._lock:
+                    if self._pools.get((pool.locale, pool.provider)) is pool:
+                        pool.extend(new_values)
+            elif pool.sampled:
+                pool.sampled = False
+                new_values = self._generate(pool, max(1, int(self.pool_size * self.refresh_fraction)))
+                with self._lock:
+                    if self._pools.get((pool.locale, pool.provider)) is pool:
+                        pool.replace(new_values)
+        self.evict()
+
+    def evict(self) -> None:
+        with self._lock:
+            total = sum(pool.nbytes for pool in self._pools.values())
+            while total > self.memory_limit and len(self._pools) > 1:
+                _, pool = self._pools.popitem(last=False)
+                total -= pool.nbytes
+                pool.clear()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _generate(self, pool: ValuePool, count: int) -> List[Any]:
+        with self._lock:
+            faker = self._fakers.get(pool.locale)
+            if faker is None:
+                faker = self._fakers[pool.locale] = create_faker(pool.locale)
+            ensure_providers(faker, pool.modules)
+        generate = getattr(faker, pool.provider)
+        return [generate() for _ in repeat(None, count)]
+
+    def _ensure_thread(self) -> None:
+        # Threads do not survive a fork, so worker processes start their own refresher
+        if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="fakeit-value-pools", daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            self.refresh()
+
+
+value_pools = ValuePoolRegistry()
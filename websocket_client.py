@@ -1,26 +1,41 @@
 import asyncio
 import json
+import time
 
 import websockets
-from faker import Faker
 
-fake = Faker()
+SCHEMA = {
+    "fields": [
+        {"name": "name", "type": "string"},
+        {"name": "email", "type": "email"},
+        {"name": "amount", "type": "float", "min": 1, "max": 500},
+    ]
+}
 
 
-# Function to generate fake data
-def generate_single_data():
-    return {"name": fake.first_name(), "email": fake.email()}
-
-
-async def websocket_client():
+async def websocket_client(rate: int = 1000, batch_size: int = 100, duration: float = 10.0):
     uri = "ws://localhost:8000/ws"  # Make sure the URI matches the server's WebSocket endpoint
     async with websockets.connect(uri) as websocket:
-        for _ in range(20):  # Loop to run for approximately 20 iterations
-            data = generate_single_data()  # Generate data locally
-            await websocket.send(json.dumps(data))  # Send the generated data as a JSON string to the WebSocket server
-            response = await websocket.recv()  # Wait for the response from the server
-            print(f"Received: {response}")
-            await asyncio.sleep(1)  # Wait for 1 second before the next request
+        # Subscribe once; the server then pushes batches of records at the requested rate
+        await websocket.send(
+            json.dumps({"action": "subscribe", "schema": SCHEMA, "rate": rate, "batch_size": batch_size})
+        )
+        print(f"Received: {await websocket.recv()}")
+
+        frames = records = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < duration:
+            frame = json.loads(await websocket.recv())
+            frames += 1
+            records += len(frame["records"])
+
+        await websocket.send(json.dumps({"action": "stop"}))
+        # Drain frames that were already in flight until the stop acknowledgement arrives
+        while (message := json.loads(await websocket.recv()))["type"] != "stopped":
+            pass
+        elapsed = time.perf_counter() - started
+        print(f"Received {frames} frames / {records} records in {elapsed:.1f}s ({records / elapsed:.0f} records/s)")
+        print(f"Received: {message}")
 
 
 # Run the client
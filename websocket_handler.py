@@ -1,15 +1,254 @@
+import asyncio
+import json
+import time
+from typing import Any, Dict, Optional
+
 from fastapi import WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+from faker_data_generation_service import get_compiled_schema
+from metrics import BATCH_GENERATION_SECONDS, BATCH_SERIALIZATION_SECONDS, WEBSOCKET_SUBSCRIBERS, record_batch
+from scheduler import SchedulerFullError, record_cost, scheduler
+from schema_registry import SchemaNotFoundError, schema_registry
+from serialization import RecordEncoder
+from uniqueness import unique_fields
+
+# Limits for a single subscription
+MAX_RECORDS_PER_SECOND = 100000
+MAX_BATCH_SIZE = 10000
+DEFAULT_BATCH_SIZE = 100
+
+# Number of generated frames buffered per connection before the producer has to wait
+SEND_QUEUE_SIZE = 8
+
+# Seconds a frame may wait for room in the send queue before a slow client is disconnected
+SLOW_CLIENT_TIMEOUT = 5.0
+
+# Maximum number of concurrent subscriptions per worker
+MAX_SUBSCRIBERS = 1000
+
+_active_subscribers = 0
+WEBSOCKET_SUBSCRIBERS.set_function(lambda: _active_subscribers)
+
+
+class SubscriptionError(ValueError):
+    """Raised when a subscribe message is invalid."""
+
+
+class Outbox:
+    """
+    Sends all messages of one WebSocket connection from a single task.
+
+    Control replies and generated frames are put on one bounded queue in the order they should
+    arrive, and only the sender task writes to the socket, so messages never interleave. When the
+    client reads slower than messages are produced the queue fills up and producers wait.
+    """
+
+    def __init__(self, websocket: WebSocket) -> None:
+        self.websocket = websocket
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self._sender: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._sender = asyncio.create_task(self._send())
+
+    async def put(self, message: str, timeout: Optional[float] = None) -> None:
+        """
+        Queue a text message.
+
+        Raises:
+            asyncio.TimeoutError: If the queue stayed full for ``timeout`` seconds.
+        """
+        if timeout is None:
+            await self._queue.put(message)
+        else:
+            await asyncio.wait_for(self._queue.put(message), timeout=timeout)
+
+    async def put_json(self, message: Dict[str, Any]) -> None:
+        await self.put(json.dumps(message))
+
+    async def close(self, code: int, reason: str, message: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Drop the queued messages, optionally send one final message, and close the socket.
+        """
+        await self.stop()
+        try:
+            if message is not None:
+                await self.websocket.send_json(message)
+            await self.websocket.close(code=code, reason=reason)
+        except (RuntimeError, WebSocketDisconnect):
+            # The client is already gone
+            pass
+
+    async def stop(self) -> None:
+        if self._sender is not None:
+            self._sender.cancel()
+            await asyncio.gather(self._sender, return_exceptions=True)
+            self._sender = None
+
+    async def _send(self) -> None:
+        while True:
+            message = await self._queue.get()
+            await self.websocket.send_text(message)
+
+
+class Subscription:
+    """
+    Pushes batches of generated records to one WebSocket client at a target rate.
+
+    A producer task generates and encodes frames in a worker thread and puts them on the
+    connection's outbox. When the client reads slower than the target rate the outbox fills up
+    and the producer is throttled. With the "disconnect" overflow policy the client is dropped
+    instead once a frame has waited ``SLOW_CLIENT_TIMEOUT`` seconds.
+
+    Every frame is admitted by the scheduler at normal priority before it is generated. If
+    generating a frame fails, the client gets an error message and the socket is closed.
+    """
+
+    def __init__(self, outbox: Outbox, message: Dict[str, Any]) -> None:
+        schema = message.get("schema")
+        if message.get("schema_id") is not None:
+            try:
+                schema = schema_registry.get(str(message["schema_id"]))
+            except SchemaNotFoundError as error:
+                raise SubscriptionError(str(error)) from error
+        if not isinstance(schema, dict) or "fields" not in schema:
+            raise SubscriptionError("'schema' must be an object with a 'fields' list")
+        if unique_fields(schema):
+            # A stream has no end, so no value space would be large enough to keep values unique
+            raise SubscriptionError("Unique fields are not supported in subscriptions")
+        self.rate = float(message.get("rate", 10))
+        self.batch_size = int(message.get("batch_size", DEFAULT_BATCH_SIZE))
+        self.overflow = message.get("overflow", "throttle")
+        if not 0 < self.rate <= MAX_RECORDS_PER_SECOND:
+            raise SubscriptionError(f"'rate' must be between 0 and {MAX_RECORDS_PER_SECOND} records per second")
+        if not 0 < self.batch_size <= MAX_BATCH_SIZE:
+            raise SubscriptionError(f"'batch_size' must be between 1 and {MAX_BATCH_SIZE}")
+        if self.overflow not in ("throttle", "disconnect"):
+            raise SubscriptionError("'overflow' must be 'throttle' or 'disconnect'")
+
+        self.outbox = outbox
+        self.compiled = get_compiled_schema(schema)
+        self.encoder = RecordEncoder(schema["fields"])
+        self.cost = record_cost(schema) * self.batch_size
+        websocket = outbox.websocket
+        self.client = websocket.client.host if websocket.client else "unknown"
+        # Frames handed to the outbox; they reach the client before any later reply
+        self.records_sent = 0
+        self.frames_sent = 0
+        self._producer: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._producer = asyncio.create_task(self._produce())
+
+    async def stop(self) -> None:
+        if self._producer is not None:
+            self._producer.cancel()
+            await asyncio.gather(self._producer, return_exceptions=True)
+            self._producer = None
+
+    def _encode_frame(self, sequence: int) -> str:
+        started = time.perf_counter()
+        records = self.compiled.generate_batch(self.batch_size)
+        generated = time.perf_counter()
+        encoded = ",".join(self.encoder.encode_batch(records))
+        BATCH_GENERATION_SECONDS.observe(generated - started, source="websocket")
+        BATCH_SERIALIZATION_SECONDS.observe(time.perf_counter() - generated, source="websocket")
+        record_batch(records)
+        return f'{{"type":"batch","sequence":{sequence},"records":[{encoded}]}}'
+
+    async def _produce(self) -> None:
+        try:
+            await self._produce_frames()
+        except asyncio.CancelledError:
+            raise
+        except SchedulerFullError:
+            await self.outbox.close(1013, "Server is busy")
+        except asyncio.TimeoutError:
+            await self.outbox.close(1013, "Client is too slow")
+        except Exception as error:  # pylint: disable=broad-except
+            print(f"Subscription of {self.client} failed: {error!r}")
+            await self.outbox.close(1011, "Generation failed", {"type": "error", "detail": str(error)})
+
+    async def _produce_frames(self) -> None:
+        loop = asyncio.get_running_loop()
+        interval = self.batch_size / self.rate
+        next_frame_at = loop.time()
+        sequence = 0
+        timeout = SLOW_CLIENT_TIMEOUT if self.overflow == "disconnect" else None
+        while True:
+            async with scheduler.admitted_async(self.cost, self.client, "normal"):
+                frame = await run_in_threadpool(self._encode_frame, sequence)
+            await self.outbox.put(frame, timeout)
+            self.frames_sent += 1
+            self.records_sent += self.batch_size
+            sequence += 1
+
+            # Pace frames to the target rate without bursting to catch up after a stall
+            next_frame_at = max(next_frame_at + interval, loop.time())
+            await asyncio.sleep(next_frame_at - loop.time())
 
 
 async def websocket_endpoint(websocket: WebSocket):
+    """
+    Serve the generation stream protocol.
+
+    Clients send JSON messages:
+
+    - ``{"action": "subscribe", "schema": {...}, "rate": 1000, "batch_size": 100}`` starts pushing
+      ``{"type": "batch", "sequence": n, "records": [...]}`` frames. A registered schema can be
+      passed as ``"schema_id"`` instead of ``"schema"``. ``rate`` is in records per
+      second and an optional ``overflow`` of "throttle" (default) or "disconnect" selects what
+      happens to slow clients. Subscribing again replaces the current subscription.
+    - ``{"action": "stop"}`` stops the stream and replies with the number of records sent.
+    """
+    global _active_subscribers
+    if _active_subscribers >= MAX_SUBSCRIBERS:
+        await websocket.close(code=1013, reason="Too many subscribers")
+        return
+
     await websocket.accept()
+    _active_subscribers += 1
+    outbox = Outbox(websocket)
+    outbox.start()
+    subscription: Optional[Subscription] = None
     try:
         while True:
             data = await websocket.receive_text()
-            if data == "generate-single":
-                response = {"message": "Generated single data successfully"}
-                await websocket.send_json(response)
+            try:
+                payload = json.loads(data)
+            except json.JSONDecodeError:
+                # If not JSON, consider it as an unknown command
+                await outbox.put_json({"type": "error", "detail": f"Unknown command: {data}"})
+                continue
+
+            action = payload.get("action") if isinstance(payload, dict) else None
+            if action == "subscribe":
+                if subscription is not None:
+                    await subscription.stop()
+                    subscription = None
+                try:
+                    subscription = Subscription(outbox, payload)
+                except (TypeError, ValueError) as error:
+                    await outbox.put_json({"type": "error", "detail": str(error)})
+                    continue
+                await outbox.put_json(
+                    {"type": "subscribed", "rate": subscription.rate, "batch_size": subscription.batch_size}
+                )
+                subscription.start()
+            elif action == "stop":
+                records_sent = 0
+                if subscription is not None:
+                    await subscription.stop()
+                    records_sent = subscription.records_sent
+                    subscription = None
+                await outbox.put_json({"type": "stopped", "records_sent": records_sent})
             else:
-                await websocket.send_text(f"Unknown command: {data}")
+                await outbox.put_json({"type": "error", "detail": "Invalid payload structure"})
     except WebSocketDisconnect:
         print("Client disconnected")
+    finally:
+        if subscription is not None:
+            await subscription.stop()
+        await outbox.stop()
+        _active_subscribers -= 1